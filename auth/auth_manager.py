@@ -1,15 +1,21 @@
 from fastapi import FastAPI, Form, HTTPException, Depends
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.concurrency import run_in_threadpool
 from utils.ssh_client import SSHClient
+from auth.credential_cache import CredentialCache
+from auth.session_store import create_session_store
+from config.settings import CLUSTERS
 from typing import Optional
-import secrets
 
 class AuthManager:
     def __init__(self):
         self.security = HTTPBasic()
-        self._sessions = {}  
-        self.ssh_client = SSHClient()
+        self.sessions = create_session_store()
+        # Logins are checked against the first cluster, whose collector then
+        # reuses the pooled connection opened here.
+        self.ssh_client = SSHClient(next(iter(CLUSTERS.values())))
+        self.credential_cache = CredentialCache()
 
     def get_login_page(self) -> str:
         """Returns the login page HTML."""
@@ -74,9 +80,10 @@ class AuthManager:
 
     async def login(self, username: str = Form(...), password: str = Form(...)):
         """Handle login attempts and create session if successful."""
-        if self.validate_credentials(username, password):
-            session_token = secrets.token_urlsafe(32)
-            self._sessions[session_token] = {"username": username, "password": password}
+        # The check may open an SSH connection or wait for another request's
+        # check, so it runs in a worker thread rather than on the event loop.
+        if await run_in_threadpool(self.validate_credentials, username, password):
+            session_token = self.sessions.create({"username": username, "password": password})
             response = RedirectResponse(url="/dashboard", status_code=303)
             response.set_cookie(key="session", value=session_token, httponly=True)
             return response
@@ -87,14 +94,21 @@ class AuthManager:
         )
 
     def validate_credentials(self, username: str, password: str) -> bool:
-        """Validate credentials using SSH connection."""
-        return self.ssh_client.test_connection(username, password)
+        """Validate credentials using SSH connection.
+
+        Results are cached briefly, so re-logins and new tabs do not each
+        cost an SSH handshake.
+        """
+        try:
+            return self.credential_cache.verify(self.ssh_client.hostname, username, password,
+                                                self.ssh_client.authenticate)
+        except Exception as e:
+            print(f"SSH connection test error: {e}")
+            return False
 
     def get_current_user(self, session: Optional[str] = None) -> Optional[dict]:
         """Get current user from session."""
-        if session and session in self._sessions:
-            return self._sessions[session]
-        return None
+        return self.sessions.get(session)
 
     def get_login_error_page(self) -> str:
         """Returns the login error page HTML."""
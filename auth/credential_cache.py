@@ -0,0 +1,75 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from config.settings import AUTH_CACHE_TTL, AUTH_CACHE_FAILURE_TTL, AUTH_CACHE_MAX_SIZE
+
+
+class CredentialCache:
+    """Remembers the outcome of recent credential checks for a short time.
+
+    Entries are keyed by an HMAC of the host, username and password under a
+    random per-process key, so neither the password nor a hash that could be
+    checked offline is ever stored. Successful checks are kept for `ttl`
+    seconds, failed ones for `failure_ttl`, and at most `max_size` entries
+    are kept (least recently used first). Concurrent checks of the same
+    credentials wait for a single verification instead of each opening an
+    SSH connection.
+    """
+
+    def __init__(self, ttl=AUTH_CACHE_TTL, failure_ttl=AUTH_CACHE_FAILURE_TTL, max_size=AUTH_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.max_size = max_size
+        self._key = os.urandom(32)
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def verify(self, hostname, username, password, check):
+        """Returns whether the credentials are valid, calling `check(username, password)`
+        only when there is no fresh cached result."""
+        key = self._digest(hostname, username, password)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry[1] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return entry[0]
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    break
+            # Another request is checking the same credentials.
+            pending.wait()
+
+        # Errors other than a rejected login (e.g. the host is unreachable)
+        # propagate and are not cached.
+        try:
+            valid = check(username, password)
+        except Exception:
+            self._finish(key, pending)
+            raise
+        self._finish(key, pending, (valid, time.monotonic() + (self.ttl if valid else self.failure_ttl)))
+        return valid
+
+    def clear(self):
+        """Forgets every cached result."""
+        with self._lock:
+            self._entries.clear()
+
+    def _finish(self, key, pending, entry=None):
+        with self._lock:
+            if entry is not None:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            del self._pending[key]
+        pending.set()
+
+    def _digest(self, hostname, username, password):
+        message = '\0'.join([hostname or '', username or '', password or '']).encode()
+        return hmac.new(self._key, message, hashlib.sha256).digest()
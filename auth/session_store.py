@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from cryptography.fernet import Fernet, InvalidToken
+from config.settings import SESSION_BACKEND, SESSION_TTL, SESSION_MAX_SIZE, SESSION_DB, SESSION_KEY_FILE
+
+
+class SessionStore(ABC):
+    """Login sessions that expire and are evicted least recently used first.
+
+    A session expires `ttl` seconds after it was last used, and beyond
+    `max_size` sessions the least recently used are dropped. Session data is
+    kept Fernet-encrypted under `key`, and tokens only as SHA-256 hashes, so
+    the stored sessions reveal neither passwords nor valid cookies.
+    Subclasses provide the storage.
+    """
+
+    def __init__(self, key, ttl=SESSION_TTL, max_size=SESSION_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._cipher = Fernet(key)
+
+    def create(self, data):
+        """Stores a new session holding the JSON-serialisable `data` and returns its token."""
+        token = secrets.token_urlsafe(32)
+        now = time.time()
+        self._put(self._hash(token), self._cipher.encrypt(json.dumps(data).encode()), now, now + self.ttl)
+        return token
+
+    def get(self, token):
+        """Returns the session's data and extends its lifetime, or None if it is unknown or expired."""
+        if not token:
+            return None
+        now = time.time()
+        payload = self._touch(self._hash(token), now, now + self.ttl)
+        if payload is None:
+            return None
+        try:
+            return json.loads(self._cipher.decrypt(payload))
+        except InvalidToken:
+            # Written under a different key, e.g. before the key file was replaced.
+            self.delete(token)
+            return None
+
+    def delete(self, token):
+        """Ends a session."""
+        if token:
+            self._delete(self._hash(token))
+
+    def count(self):
+        """Returns the number of sessions that have not expired."""
+        return self._count(time.time())
+
+    def _hash(self, token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @abstractmethod
+    def _put(self, token_hash, payload, now, expires):
+        """Stores a session, evicting expired and least recently used ones."""
+
+    @abstractmethod
+    def _touch(self, token_hash, now, expires):
+        """Returns a live session's payload and moves its expiry to `expires`, or None."""
+
+    @abstractmethod
+    def _delete(self, token_hash):
+        """Removes a session if it exists."""
+
+    @abstractmethod
+    def _count(self, now):
+        """Returns the number of sessions expiring after `now`."""
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions held in this process, lost when it restarts."""
+
+    def __init__(self, key=None, ttl=SESSION_TTL, max_size=SESSION_MAX_SIZE):
+        super().__init__(key or Fernet.generate_key(), ttl, max_size)
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _put(self, token_hash, payload, now, expires):
+        with self._lock:
+            self._sessions[token_hash] = (payload, expires)
+            expired = [key for key, (_, until) in self._sessions.items() if until <= now]
+            for key in expired:
+                del self._sessions[key]
+            while len(self._sessions) > self.max_size:
+                self._sessions.popitem(last=False)
+
+    def _touch(self, token_hash, now, expires):
+        with self._lock:
+            entry = self._sessions.get(token_hash)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._sessions[token_hash]
+                return None
+            self._sessions[token_hash] = (entry[0], expires)
+            self._sessions.move_to_end(token_hash)
+            return entry[0]
+
+    def _delete(self, token_hash):
+        with self._lock:
+            self._sessions.pop(token_hash, None)
+
+    def _count(self, now):
+        with self._lock:
+            return sum(1 for _, expires in self._sessions.values() if expires > now)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a SQLite database, kept across restarts.
+
+    The encryption key is read from `key_file`, which the first process to
+    start creates, so every process on the host using the same files can
+    decrypt the sessions.
+    """
+
+    def __init__(self, path=SESSION_DB, key_file=SESSION_KEY_FILE, ttl=SESSION_TTL, max_size=SESSION_MAX_SIZE):
+        super().__init__(load_session_key(key_file), ttl, max_size)
+        self.path = path
+        self._local = threading.local()
+        connection = self._connection()
+        with connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    token_hash TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    expires REAL NOT NULL
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)")
+
+    def _put(self, token_hash, payload, now, expires):
+        connection = self._connection()
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                               (token_hash, payload, now, expires))
+            connection.execute("DELETE FROM sessions WHERE expires <= ?", (now,))
+            connection.execute("""
+                DELETE FROM sessions WHERE token_hash NOT IN (
+                    SELECT token_hash FROM sessions ORDER BY last_used DESC LIMIT ?
+                )
+            """, (self.max_size,))
+
+    def _touch(self, token_hash, now, expires):
+        connection = self._connection()
+        with connection:
+            row = connection.execute(
+                "SELECT payload FROM sessions WHERE token_hash = ? AND expires > ?", (token_hash, now)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE sessions SET last_used = ?, expires = ? WHERE token_hash = ?",
+                               (now, expires, token_hash))
+        return row[0]
+
+    def _delete(self, token_hash):
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM sessions WHERE token_hash = ?", (token_hash,))
+
+    def _count(self, now):
+        return self._connection().execute("SELECT COUNT(*) FROM sessions WHERE expires > ?", (now,)).fetchone()[0]
+
+    def _connection(self):
+        # One connection per thread, as in HistoryIndex.
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+
+def load_session_key(path):
+    """Returns the Fernet key stored in `path`, creating it (owner-readable only) if needed.
+
+    The key is written to a temporary file and hard-linked into place, so
+    concurrently starting processes all end up reading the same complete key.
+    """
+    if not os.path.exists(path):
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'wb') as key_file:
+            key_file.write(Fernet.generate_key())
+            key_file.flush()
+            os.fsync(key_file.fileno())
+        try:
+            os.link(temp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp_path)
+    with open(path, 'rb') as key_file:
+        return key_file.read().strip()
+
+
+def create_session_store(backend=SESSION_BACKEND):
+    """Returns the session store configured by SESSION_BACKEND ("memory" or "sqlite")."""
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    raise Exception(f"Unknown session backend: {backend}")
@@ -0,0 +1,71 @@
+"""Compares the tokenizing NodeParser with the previous per-line regex parser.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_node_parser
+"""
+import argparse
+import re
+import timeit
+import pandas as pd
+from datetime import datetime
+from benchmarks.synthetic import scontrol_text
+from node.node_parser import NodeParser
+
+
+def legacy_parse_slurm_output(output):
+    """The parser NodeParser replaced: five uncompiled regexes per line."""
+    nodes = []
+    node_blocks = output.strip().split("\n\n")
+    timestamp = datetime.now()
+
+    for block in node_blocks:
+        node = {
+            'timestamp': timestamp,
+            'CPULoad': 0.0,
+            'RealMemory': 0,
+            'FreeMem': 0,
+            'State': 'UNKNOWN'
+        }
+        for line in block.split("\n"):
+            if match := re.search(r"NodeName=(\S+)", line):
+                node["NodeName"] = match.group(1)
+            if match := re.search(r"CPULoad=(\S+)", line):
+                node["CPULoad"] = float(match.group(1))
+            if match := re.search(r"RealMemory=(\S+)", line):
+                node["RealMemory"] = int(match.group(1))
+            if match := re.search(r"FreeMem=(\S+)", line):
+                if match.group(1) == 'N/A':
+                    node["FreeMem"] = 0
+                else:
+                    node["FreeMem"] = int(match.group(1))
+            if match := re.search(r"State=(\S+)", line):
+                node["State"] = match.group(1)
+        nodes.append(node)
+    return pd.DataFrame(nodes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>8} {'legacy ms':>12} {'tokenizer ms':>14} {'oneliner ms':>13} {'speed-up':>9}")
+    for node_count in args.nodes:
+        multiline = scontrol_text(node_count)
+        oneliner = scontrol_text(node_count, oneliner=True)
+        # The legacy parser fails on CPULoad=N/A, so it gets zeros instead.
+        legacy_input = multiline.replace('CPULoad=N/A', 'CPULoad=0.00')
+        legacy = min(timeit.repeat(lambda: legacy_parse_slurm_output(legacy_input),
+                                   number=1, repeat=args.repeat))
+        current = min(timeit.repeat(lambda: NodeParser.parse_slurm_output(multiline),
+                                    number=1, repeat=args.repeat))
+        single_line = min(timeit.repeat(lambda: NodeParser.parse_slurm_output(oneliner),
+                                        number=1, repeat=args.repeat))
+        print(f"{node_count:>8} {legacy * 1000:>12.1f} {current * 1000:>14.1f} "
+              f"{single_line * 1000:>13.1f} {legacy / single_line:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
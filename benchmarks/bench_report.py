@@ -0,0 +1,50 @@
+"""Compares the ReportLab-native report renderer with the matplotlib/seaborn one.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_report
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from benchmarks.synthetic import scontrol_text
+from node.node_parser import NodeParser
+from utils.report_generator import ReportGenerator
+
+
+def render(renderer, node_data, path):
+    """Renders one report and returns (seconds, peak traced MB, file KB)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    ReportGenerator().generate_report(node_data, path, renderer=renderer)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, os.path.getsize(path) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, nargs='+', default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    # Warm imports so the first row does not include them.
+    warm_up = NodeParser.parse_slurm_output(scontrol_text(10, oneliner=True))
+    with tempfile.TemporaryDirectory() as directory:
+        for renderer in ('native', 'matplotlib'):
+            ReportGenerator().generate_report(warm_up, os.path.join(directory, 'warm.pdf'),
+                                              renderer=renderer)
+
+        print(f"{'nodes':>8} {'renderer':>11} {'seconds':>9} {'peak MB':>9} {'file KB':>9}")
+        for node_count in args.nodes:
+            node_data = NodeParser.parse_slurm_output(scontrol_text(node_count, oneliner=True))
+            for renderer in ('native', 'matplotlib'):
+                path = os.path.join(directory, f"{renderer}_{node_count}.pdf")
+                elapsed, peak, size = render(renderer, node_data, path)
+                print(f"{node_count:>8} {renderer:>11} {elapsed:>9.2f} {peak:>9.1f} {size:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""A local stand-in for a Slurm login node, served over SSH with paramiko.
+
+It answers the commands the collector runs (scontrol, sinfo, squeue, sdiag,
+sacct, and batches of them fed to `sh -s`) from a Replay of generated or
+recorded snapshots, after a configurable latency. Any username is accepted
+with the configured password. Run from the repository root:
+
+    python -m benchmarks.fake_cluster --port 2222 --nodes 1000 --speed 60
+
+and point a cluster at it, e.g. CLUSTERS = {"fake": "127.0.0.1:2222"}.
+"""
+import argparse
+import re
+import socket
+import threading
+import time
+import paramiko
+from benchmarks import synthetic
+from benchmarks.replay import Replay
+
+# A batch section as written by utils.ssh_client._batch_script
+BATCH_SECTION = re.compile(r"^echo '@@(\w+) begin (\S+)'\nerr=\$\( \{ (.*) ; \} </dev/null 2>&1 1>&3 \); status=\$\?$", re.M)
+
+
+class FakeSlurm:
+    """Answers Slurm commands from the current snapshot of `replay`.
+
+    scontrol output comes from the snapshots; sinfo, squeue, sdiag and sacct
+    output is generated to match their node count. Each Slurm command
+    sleeps `latency` seconds first, like a round trip to slurmctld.
+    Recorded snapshots are text, so `scontrol show node --json` fails as on
+    a Slurm release without JSON output.
+    """
+
+    def __init__(self, replay, latency=0.0):
+        self.replay = replay
+        self.latency = latency
+
+    def run(self, command, stdin=''):
+        """Returns (exit_status, stdout, stderr) for a command line."""
+        if command.strip() == 'sh -s':
+            return 0, self._run_batch(stdin), ''
+        time.sleep(self.latency)
+        index, snapshot = self.replay.current()
+        node_count = max(1, snapshot.count('NodeName='))
+        program = command.split()[0] if command.strip() else ''
+        if command.startswith('scontrol show node'):
+            if '--json' in command:
+                return 1, '', "scontrol: unrecognized option '--json'"
+            return 0, snapshot, ''
+        if program == 'sinfo':
+            return 0, synthetic.sinfo_text(node_count, seed=index), ''
+        if program == 'squeue':
+            return 0, synthetic.squeue_text(node_count, seed=index), ''
+        if program == 'sdiag':
+            return 0, synthetic.sdiag_text(seed=index), ''
+        if program == 'sacct':
+            return 0, synthetic.sacct_text(node_count, seed=index), ''
+        return 127, '', f"sh: {program}: command not found"
+
+    def _run_batch(self, script):
+        # Frames each section's output the way the real script would.
+        output = []
+        for token, name, command in BATCH_SECTION.findall(script):
+            status, stdout, stderr = self.run(command)
+            output.append(f"@@{token} begin {name}\n{stdout}\n@@{token} end {name} {status}\n{stderr}\n")
+        return ''.join(output)
+
+
+class FakeSSHServer:
+    """Serves a FakeSlurm over SSH on `host`:`port` (0 picks a free port)."""
+
+    def __init__(self, slurm, host='127.0.0.1', port=0, password='loadtest'):
+        self.slurm = slurm
+        self.password = password
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((host, port))
+        self._socket.listen(128)
+        self.host, self.port = self._socket.getsockname()
+        self._transports = []
+        self._stopped = threading.Event()
+
+    @property
+    def address(self):
+        """The "host:port" to put in CLUSTERS."""
+        return f"{self.host}:{self.port}"
+
+    def start(self):
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._socket.close()
+        for transport in self._transports:
+            transport.close()
+
+    def _accept(self):
+        while not self._stopped.is_set():
+            try:
+                connection, _ = self._socket.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection):
+        transport = paramiko.Transport(connection)
+        transport.add_server_key(self.host_key)
+        self._transports.append(transport)
+        interface = _ServerInterface(self)
+        try:
+            transport.start_server(server=interface)
+        except (paramiko.SSHException, EOFError):
+            return
+        while transport.is_active():
+            channel = transport.accept(timeout=1)
+            if channel is not None:
+                threading.Thread(target=self._serve_channel, args=(interface, channel), daemon=True).start()
+        self._transports.remove(transport)
+
+    def _serve_channel(self, interface, channel):
+        command = interface.wait_for_command(channel)
+        if command is None:
+            channel.close()
+            return
+        stdin = b''
+        if command.strip() == 'sh -s':
+            # The script ends when the client shuts down its side of the channel.
+            while data := channel.recv(64 * 1024):
+                stdin += data
+        try:
+            status, stdout, stderr = self.slurm.run(command, stdin.decode())
+        except Exception as e:
+            status, stdout, stderr = 1, '', f"Error in fake cluster: {e}"
+        channel.sendall(stdout.encode())
+        channel.sendall_stderr(stderr.encode())
+        channel.send_exit_status(status)
+        channel.close()
+
+
+class _ServerInterface(paramiko.ServerInterface):
+    def __init__(self, server):
+        self.server = server
+        self._commands = {}
+        self._ready = {}
+        self._lock = threading.Lock()
+
+    def check_auth_password(self, username, password):
+        if password == self.server.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        with self._lock:
+            self._commands[channel.get_id()] = command.decode()
+        self._event(channel.get_id()).set()
+        return True
+
+    def wait_for_command(self, channel, timeout=30):
+        """Returns the command the client asked `channel` to run, or None."""
+        if not self._event(channel.get_id()).wait(timeout):
+            return None
+        with self._lock:
+            del self._ready[channel.get_id()]
+            return self._commands.pop(channel.get_id())
+
+    def _event(self, channel_id):
+        with self._lock:
+            return self._ready.setdefault(channel_id, threading.Event())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2222)
+    parser.add_argument('--password', default='loadtest')
+    parser.add_argument('--nodes', type=int, default=1000, help="nodes in generated snapshots")
+    parser.add_argument('--replay', help="recording directory to replay instead of generated snapshots")
+    parser.add_argument('--speed', type=float, default=1.0, help="replay speed-up")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds each Slurm command takes")
+    args = parser.parse_args()
+
+    replay = (Replay.from_directory(args.replay, args.speed) if args.replay
+              else Replay.synthetic(args.nodes, args.speed))
+    server = FakeSSHServer(FakeSlurm(replay, args.latency), args.host, args.port, args.password).start()
+    print(f"Fake cluster listening on {server.address}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Drives the dashboard with concurrent simulated users against a fake cluster.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test --sessions 20 --duration 60 --nodes 1000
+
+It starts a FakeSSHServer replaying generated (or, with --replay, recorded)
+snapshots, points the app's only cluster at it and serves main.app with
+uvicorn on a local port, all in a scratch directory. Each session then logs
+in through AuthManager.login, loads the dashboard and, every --refresh
+seconds, fires the Dash callbacks a browser would for an interval tick,
+now and then switching to another node. Latency percentiles per request
+and the overall throughput are printed, and written as JSON with --output.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import urllib.parse
+from benchmarks.fake_cluster import FakeSSHServer, FakeSlurm
+from benchmarks.replay import Replay
+import config.settings as settings
+
+# Outputs of the report callbacks, which sessions do not trigger
+SKIPPED_OUTPUTS = ('report-', 'download-report')
+
+
+class LatencyStats:
+    """Request latencies and failures by request name, shared by all sessions."""
+
+    def __init__(self):
+        self._latencies = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, ok=True):
+        with self._lock:
+            self._latencies.setdefault(name, []).append(seconds)
+            if not ok:
+                self._errors[name] = self._errors.get(name, 0) + 1
+
+    def summary(self, duration):
+        """Returns per-request count, errors, p50/p99/mean seconds and requests per second."""
+        with self._lock:
+            latencies = {name: sorted(values) for name, values in self._latencies.items()}
+            errors = dict(self._errors)
+        return {
+            name: {
+                'count': len(values),
+                'errors': errors.get(name, 0),
+                'p50': _percentile(values, 50),
+                'p99': _percentile(values, 99),
+                'mean': statistics.fmean(values),
+                'throughput': len(values) / duration
+            }
+            for name, values in latencies.items()
+        }
+
+
+class BrowserSession:
+    """One simulated user: a keep-alive connection, a session cookie and the
+    component properties the dashboard page would hold."""
+
+    def __init__(self, host, port, username, password, stats, rng):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.stats = stats
+        self.rng = rng
+        self.cookie = None
+        self.props = {}
+        self.callbacks_by_input = {}
+        self.n_intervals = 0
+        self._connection = None
+
+    def login(self):
+        body = urllib.parse.urlencode({'username': self.username, 'password': self.password})
+        status, headers, _ = self._request('login', 'POST', '/login', body,
+                                           {'Content-Type': 'application/x-www-form-urlencoded'})
+        cookie = headers.get('set-cookie', '')
+        if status != 303 or not cookie.startswith('session='):
+            raise Exception(f"Login failed for {self.username} with status {status}")
+        self.cookie = cookie.split(';', 1)[0]
+
+    def open_dashboard(self):
+        """Loads the page, then fires the callbacks Dash runs on page load."""
+        self._request('page', 'GET', '/dashboard/')
+        _, _, layout = self._request('layout', 'GET', '/dashboard/_dash-layout')
+        _, _, dependencies = self._request('dependencies', 'GET', '/dashboard/_dash-dependencies')
+        self._collect_props(json.loads(layout))
+        for callback in json.loads(dependencies):
+            if callback.get('clientside_function') or callback['output'].strip('.').startswith(SKIPPED_OUTPUTS):
+                continue
+            for item in callback['inputs']:
+                self.callbacks_by_input.setdefault(f"{item['id']}.{item['property']}", []).append(callback)
+        self._fire(set(self.callbacks_by_input))
+
+    def refresh(self):
+        """One interval tick, as the dcc.Interval on the page would fire it."""
+        self.n_intervals += 1
+        self.props['interval-component.n_intervals'] = self.n_intervals
+        self._fire({'interval-component.n_intervals'})
+
+    def select_node(self):
+        options = self.props.get('node-dropdown.options') or []
+        if options:
+            self.props['node-dropdown.value'] = self.rng.choice(options)['value']
+            self._fire({'node-dropdown.value'})
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _fire(self, changed):
+        # Like the Dash renderer: call every callback with a changed input,
+        # then the callbacks whose inputs those changed, and so on.
+        for _ in range(5):
+            callbacks = {}
+            for prop in changed:
+                for callback in self.callbacks_by_input.get(prop, []):
+                    callbacks.setdefault(callback['output'], (callback, []))[1].append(prop)
+            if not callbacks:
+                return
+            changed = set()
+            for callback, triggered in callbacks.values():
+                changed |= self._call(callback, triggered)
+
+    def _call(self, callback, triggered):
+        outputs = [part.rsplit('.', 1) for part in
+                   (callback['output'][2:-2].split('...') if callback['output'].startswith('..')
+                    else [callback['output']])]
+        output_specs = [{'id': id_, 'property': prop.split('@')[0]} for id_, prop in outputs]
+        body = json.dumps({
+            'output': callback['output'],
+            'outputs': output_specs if callback['output'].startswith('..') else output_specs[0],
+            'inputs': [self._value(item) for item in callback['inputs']],
+            'state': [self._value(item) for item in callback['state']],
+            'changedPropIds': triggered
+        })
+        status, _, response = self._request(f"callback {output_specs[0]['id']}", 'POST',
+                                            '/dashboard/_dash-update-component', body,
+                                            {'Content-Type': 'application/json'})
+        if status != 200:
+            return set()
+        changed = set()
+        for id_, values in json.loads(response).get('response', {}).items():
+            for prop, value in values.items():
+                # Patches are not applied; the browser's copy only matters as State.
+                if not (isinstance(value, dict) and '__dash_patch_update' in value):
+                    self.props[f"{id_}.{prop}"] = value
+                changed.add(f"{id_}.{prop}")
+        return changed
+
+    def _value(self, item):
+        return {'id': item['id'], 'property': item['property'],
+                'value': self.props.get(f"{item['id']}.{item['property']}")}
+
+    def _collect_props(self, component):
+        if isinstance(component, list):
+            for child in component:
+                self._collect_props(child)
+        elif isinstance(component, dict) and 'props' in component:
+            props = component['props']
+            if 'id' in props:
+                for prop, value in props.items():
+                    if prop != 'children':
+                        self.props[f"{props['id']}.{prop}"] = value
+            self._collect_props(props.get('children'))
+
+    def _request(self, name, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        start = time.perf_counter()
+        try:
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            self._connection.request(method, path, body, headers)
+            response = self._connection.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException):
+            self.stats.record(name, time.perf_counter() - start, ok=False)
+            self.close()
+            return None, {}, b''
+        self.stats.record(name, time.perf_counter() - start, ok=response.status < 400)
+        return response.status, {key.lower(): value for key, value in response.getheaders()}, payload
+
+
+def run_session(index, args, port, stats, deadline):
+    rng = random.Random(args.seed + index)
+    session = BrowserSession('127.0.0.1', port, f"user{index % args.users:03d}", args.password, stats, rng)
+    try:
+        session.login()
+        session.open_dashboard()
+        session.select_node()
+        while time.monotonic() < deadline:
+            # Spread the sessions' ticks like independently opened tabs.
+            time.sleep(rng.uniform(0.5, 1.5) * args.refresh)
+            session.refresh()
+            if rng.random() < args.node_switch:
+                session.select_node()
+    except Exception as e:
+        print(f"Error in session {index}: {e}")
+        stats.record('session', 0, ok=False)
+    finally:
+        session.close()
+
+
+def start_app(address, poll_interval):
+    """Points the only cluster at `address` and serves main.app on a free local port."""
+    # Settings are read when the app's modules are imported, so they are
+    # overridden before main is imported.
+    settings.CLUSTERS = {'fake': address}
+    settings.UPDATE_INTERVAL = int(poll_interval * 1000)
+    import uvicorn
+    import main
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host='127.0.0.1', port=0, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, server.servers[0].sockets[0].getsockname()[1]
+
+
+def stop_app(server):
+    """Stops the collector, so it writes no more history, and then the server."""
+    import main
+    if main.dash_initialized:
+        main.dashboard.collector.stop()
+    server.should_exit = True
+
+
+def _percentile(values, percent):
+    # Nearest rank on sorted values.
+    return values[max(0, -(-len(values) * percent // 100) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=10, help="concurrent simulated users")
+    parser.add_argument('--users', type=int, default=10, help="distinct usernames the sessions log in as")
+    parser.add_argument('--duration', type=float, default=60, help="seconds to keep refreshing")
+    parser.add_argument('--refresh', type=float, default=5, help="seconds between a session's ticks")
+    parser.add_argument('--node-switch', type=float, default=0.2, help="chance a tick also switches node")
+    parser.add_argument('--nodes', type=int, default=1000, help="nodes in generated snapshots")
+    parser.add_argument('--replay', help="recording directory to replay instead of generated snapshots")
+    parser.add_argument('--speed', type=float, default=60, help="replay speed-up")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds each Slurm command takes")
+    parser.add_argument('--poll-interval', type=float, default=5, help="seconds between collector polls")
+    parser.add_argument('--password', default='loadtest')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the results to this JSON file")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    replay = (Replay.from_directory(os.path.abspath(args.replay), args.speed) if args.replay
+              else Replay.synthetic(args.nodes, args.speed))
+    fake_cluster = FakeSSHServer(FakeSlurm(replay, args.latency), password=args.password).start()
+    previous_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        # History, sessions and reports go to the scratch directory.
+        os.chdir(directory)
+        server = None
+        try:
+            server, port = start_app(fake_cluster.address, args.poll_interval)
+            stats = LatencyStats()
+            start = time.monotonic()
+            deadline = start + args.duration
+            sessions = [threading.Thread(target=run_session, args=(i, args, port, stats, deadline))
+                        for i in range(args.sessions)]
+            for session in sessions:
+                session.start()
+            for session in sessions:
+                session.join()
+            elapsed = time.monotonic() - start
+        finally:
+            if server is not None:
+                stop_app(server)
+            os.chdir(previous_directory)
+            fake_cluster.stop()
+
+    summary = stats.summary(elapsed)
+    total = sum(result['count'] for result in summary.values())
+    print(f"{args.sessions} sessions, {elapsed:.0f} s, {total / elapsed:.1f} requests/s")
+    print(f"{'request':<32} {'count':>7} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9} {'per s':>7}")
+    for name, result in sorted(summary.items()):
+        print(f"{name:<32} {result['count']:>7} {result['errors']:>7} {result['p50'] * 1000:>9.1f} "
+              f"{result['p99'] * 1000:>9.1f} {result['throughput']:>7.2f}")
+
+    if output:
+        # Imported late: benchmarks.run imports the app's modules, which must
+        # only happen once start_app has overridden the settings.
+        from benchmarks.run import environment
+        with open(output, 'w') as results_file:
+            json.dump({'environment': environment(), 'parameters': vars(args), 'duration': elapsed,
+                       'throughput': total / elapsed, 'requests': summary}, results_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
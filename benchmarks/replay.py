@@ -0,0 +1,132 @@
+"""Records `scontrol show node` snapshots and plays them back at accelerated speed.
+
+A recording is a directory holding one snapshot per file, named after the
+time it was taken (e.g. 20250103T144049.txt). Run from the repository root:
+
+    python -m benchmarks.replay record recording --username me --count 288
+    python -m benchmarks.replay generate recording --nodes 1000
+
+and serve it with `python -m benchmarks.fake_cluster --replay recording`.
+"""
+import argparse
+import bisect
+import getpass
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from benchmarks import synthetic
+from config.settings import HOSTNAME, UPDATE_INTERVAL
+from utils.ssh_client import SSHClient
+
+SNAPSHOT_TIME_FORMAT = '%Y%m%dT%H%M%S'
+
+
+class Replay:
+    """Plays snapshots back in a loop, `speed` times faster than they were taken.
+
+    `offsets` are the snapshots' times in seconds from the first one, and
+    `load(i)` returns the text of snapshot i. Only the current snapshot is
+    kept in memory.
+    """
+
+    def __init__(self, offsets, load, speed=1.0):
+        if not offsets:
+            raise Exception("No snapshots to replay")
+        self.offsets = offsets
+        self.load = load
+        self.speed = speed
+        # The last snapshot lasts as long as the gap before it.
+        self.duration = offsets[-1] + (offsets[-1] - offsets[-2] if len(offsets) > 1 else 1)
+        self._start = time.monotonic()
+        self._current = (None, None)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_directory(cls, directory, speed=1.0):
+        """Replays a recording made by `record` or `generate`."""
+        names = sorted(name for name in os.listdir(directory) if name.endswith('.txt'))
+        times = [datetime.strptime(name[:-4], SNAPSHOT_TIME_FORMAT) for name in names]
+        if not times:
+            raise Exception(f"No snapshots in {directory}")
+
+        def load(index):
+            with open(os.path.join(directory, names[index])) as snapshot:
+                return snapshot.read()
+        return cls([(taken - times[0]).total_seconds() for taken in times], load, speed)
+
+    @classmethod
+    def synthetic(cls, node_count, speed=1.0, days=1, interval=UPDATE_INTERVAL / 1000):
+        """Replays `days` of generated snapshots, one every `interval` seconds."""
+        count = int(days * 24 * 60 * 60 // interval)
+        return cls([i * interval for i in range(count)],
+                   lambda index: synthetic.scontrol_text(node_count, oneliner=True, seed=index), speed)
+
+    def index(self):
+        """Returns the position of the snapshot that is current now."""
+        elapsed = (time.monotonic() - self._start) * self.speed % self.duration
+        return bisect.bisect_right(self.offsets, elapsed) - 1
+
+    def current(self):
+        """Returns (index, text) of the current snapshot."""
+        index = self.index()
+        with self._lock:
+            if self._current[0] != index:
+                self._current = (index, self.load(index))
+            return self._current
+
+
+def record(directory, username, password, count, interval=UPDATE_INTERVAL / 1000, hostname=HOSTNAME):
+    """Saves `count` snapshots from a real cluster, one every `interval` seconds."""
+    os.makedirs(directory, exist_ok=True)
+    ssh_client = SSHClient(hostname)
+    for i in range(count):
+        started = time.monotonic()
+        output = ssh_client.get_node_info(username, password)
+        if output:
+            _write(directory, datetime.now(), output)
+        else:
+            print(f"Error recording snapshot {i}: no output")
+        if i < count - 1:
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def generate(directory, node_count, days=1, interval=UPDATE_INTERVAL / 1000, end=None):
+    """Writes a synthetic recording of `days` of snapshots, one every `interval` seconds."""
+    os.makedirs(directory, exist_ok=True)
+    count = int(days * 24 * 60 * 60 // interval)
+    first = (end or datetime.now()) - timedelta(seconds=interval * (count - 1))
+    for i in range(count):
+        _write(directory, first + timedelta(seconds=interval * i),
+               synthetic.scontrol_text(node_count, oneliner=True, seed=i))
+
+
+def _write(directory, taken, output):
+    with open(os.path.join(directory, f"{taken.strftime(SNAPSHOT_TIME_FORMAT)}.txt"), 'w') as snapshot:
+        snapshot.write(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_parser = commands.add_parser('record', help="record snapshots from a cluster")
+    record_parser.add_argument('directory')
+    record_parser.add_argument('--hostname', default=HOSTNAME)
+    record_parser.add_argument('--username', required=True)
+    record_parser.add_argument('--count', type=int, default=24 * 60 * 60 * 1000 // UPDATE_INTERVAL)
+    record_parser.add_argument('--interval', type=float, default=UPDATE_INTERVAL / 1000)
+    generate_parser = commands.add_parser('generate', help="write a synthetic recording")
+    generate_parser.add_argument('directory')
+    generate_parser.add_argument('--nodes', type=int, default=1000)
+    generate_parser.add_argument('--days', type=float, default=1)
+    generate_parser.add_argument('--interval', type=float, default=UPDATE_INTERVAL / 1000)
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.directory, args.username, getpass.getpass(), args.count, args.interval, args.hostname)
+    else:
+        generate(args.directory, args.nodes, args.days, args.interval)
+
+
+if __name__ == "__main__":
+    main()
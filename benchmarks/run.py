@@ -0,0 +1,223 @@
+"""Runs the hot-path benchmarks on synthetic data and writes the timings as JSON.
+
+Run from the repository root:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare results.json
+
+Every benchmark is timed `--repeat` times after a warm-up call, on data
+generated from a fixed seed, so runs on the same machine are comparable.
+History benchmarks run in a scratch directory and leave the project's
+history untouched.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import pandas as pd
+from datetime import datetime
+from benchmarks import synthetic
+from config.settings import (CLUSTERS, HISTORY_DIR, HISTORY_GRAPH_MAX_POINTS, HEATMAP_ROWS, HEATMAP_COLUMNS,
+                             TOP_NODES)
+from data.data_manager import DataManager
+from node.node_controller import NodeController
+from node.node_parser import NodeParser
+from utils.report_generator import ReportGenerator
+from visualization.aggregation import partition_summary, state_summary, top_nodes
+from visualization.graphs import GraphGenerator
+
+# The node whose history the history benchmarks read
+NODE = 'node00000'
+
+
+def parse_text(node_count, days, directory):
+    output = synthetic.scontrol_text(node_count, oneliner=True)
+    return lambda: NodeParser.parse_slurm_output(output)
+
+
+def parse_json(node_count, days, directory):
+    chunks = synthetic.chunked(synthetic.scontrol_json(node_count))
+    return lambda: NodeParser.parse_slurm_json(chunks)
+
+
+def update_historical_data(node_count, days, directory):
+    """Appends one more snapshot to `days` of history."""
+    history = synthetic.history(node_count, days)
+    data_manager = DataManager(history_dir=os.path.join(directory, 'history'), import_legacy=False)
+    data_manager.update_historical_data(history)
+    snapshot = history[history['timestamp'] == history['timestamp'].max()]
+    step = [snapshot['timestamp'].iloc[0]]
+
+    def run():
+        step[0] += pd.Timedelta(minutes=5)
+        data_manager.update_historical_data(snapshot.assign(timestamp=step[0]))
+    return run
+
+
+def node_history(node_count, days, directory):
+    """A node's history from the ring buffer, as the dashboard reads it."""
+    node_controller = _node_controller(node_count, days, directory)
+    return lambda: node_controller.get_node_history(NODE)
+
+
+def node_history_index(node_count, days, directory):
+    """A node's history from the SQLite index, the fallback when it is not buffered."""
+    data_manager = _node_controller(node_count, days, directory).data_manager
+    return lambda: data_manager.load_node_history(NODE)
+
+
+def node_history_graph(node_count, days, directory):
+    node_controller = _node_controller(node_count, days, directory)
+    history = node_controller.get_node_history(NODE)
+    daily_stats = node_controller.get_node_rollups(NODE, 'daily')
+    return lambda: GraphGenerator.create_node_history_graph(history, daily_stats,
+                                                            max_points=HISTORY_GRAPH_MAX_POINTS)
+
+
+def cpu_heatmap(node_count, days, directory):
+    """One more snapshot in the ring buffer and the cluster heatmap binned from it, as after each poll."""
+    node_controller = _node_controller(node_count, days, directory)
+    history = synthetic.history(node_count, 1)
+    snapshot = history[history['timestamp'] == history['timestamp'].max()]
+    step = [snapshot['timestamp'].iloc[0]]
+
+    def run():
+        step[0] += pd.Timedelta(minutes=5)
+        node_controller.ring_buffer.append(snapshot.assign(timestamp=step[0]))
+        return GraphGenerator.create_cpu_heatmap(*node_controller.get_cpu_heatmap(HEATMAP_ROWS, HEATMAP_COLUMNS))
+    return run
+
+
+def cluster_aggregates(node_count, days, directory):
+    """The partition and state group-bys and top nodes shown for large clusters."""
+    node_data = NodeParser.parse_slurm_output(synthetic.scontrol_text(node_count, oneliner=True))
+
+    def run():
+        GraphGenerator.create_partition_graph(partition_summary(node_data))
+        state_summary(node_data)
+        top_nodes(node_data, TOP_NODES, 'CPULoad')
+        top_nodes(node_data, TOP_NODES, 'MemoryUsage')
+    return run
+
+
+def generate_report(node_count, days, directory):
+    node_data = NodeParser.parse_slurm_output(synthetic.scontrol_text(node_count, oneliner=True))
+    path = os.path.join(directory, 'report.pdf')
+    return lambda: ReportGenerator().generate_report(node_data, path)
+
+
+def _node_controller(node_count, days, directory):
+    # NodeController keeps the first cluster's history in HISTORY_DIR,
+    # relative to the working directory (see run_benchmark).
+    data_manager = DataManager(history_dir=HISTORY_DIR, cluster=next(iter(CLUSTERS)), import_legacy=False)
+    data_manager.update_historical_data(synthetic.history(node_count, days))
+    data_manager.close()
+    return NodeController()
+
+
+# name -> (setup, takes history); setup(node_count, days, directory) returns the callable to time
+BENCHMARKS = {
+    'parse_text': (parse_text, False),
+    'parse_json': (parse_json, False),
+    'update_historical_data': (update_historical_data, True),
+    'node_history': (node_history, True),
+    'node_history_index': (node_history_index, True),
+    'node_history_graph': (node_history_graph, True),
+    'cpu_heatmap': (cpu_heatmap, True),
+    'cluster_aggregates': (cluster_aggregates, False),
+    'generate_report': (generate_report, False),
+}
+
+
+def run_benchmark(name, node_count, days, repeat):
+    """Times one benchmark and returns its result record."""
+    setup, _ = BENCHMARKS[name]
+    with tempfile.TemporaryDirectory() as directory, _working_directory(directory):
+        function = setup(node_count, days, directory)
+        function()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+    return {
+        'benchmark': name,
+        'nodes': node_count,
+        'days': days,
+        'repeat': repeat,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'max': max(timings)
+    }
+
+
+def environment():
+    """Describes the machine and revision the results were measured on."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count()
+    }
+
+
+@contextlib.contextmanager
+def _working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--nodes', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--history-nodes', type=int, nargs='+', default=[100, 1000],
+                        help="node counts for the history benchmarks")
+    parser.add_argument('--days', type=int, default=2, help="days of history behind the history benchmarks")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="print the change in median against an earlier results file")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as results_file:
+            for result in json.load(results_file)['results']:
+                baseline[result['benchmark'], result['nodes'], result['days']] = result['median']
+
+    results = []
+    print(f"{'benchmark':<24} {'nodes':>7} {'median ms':>10} {'min ms':>9} {'change':>8}")
+    for name in args.benchmarks:
+        takes_history = BENCHMARKS[name][1]
+        for node_count in args.history_nodes if takes_history else args.nodes:
+            result = run_benchmark(name, node_count, args.days if takes_history else 0, args.repeat)
+            results.append(result)
+            previous = baseline.get((name, node_count, result['days']))
+            change = f"{(result['median'] / previous - 1) * 100:+.0f}%" if previous else ''
+            print(f"{name:<24} {node_count:>7} {result['median'] * 1000:>10.1f} "
+                  f"{result['min'] * 1000:>9.1f} {change:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as results_file:
+            json.dump({'environment': environment(), 'results': results}, results_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Synthetic Slurm output and node history for the benchmarks.
+
+Everything is generated from a seed, so the same arguments always give the
+same text. Run from the repository root to print a sample, e.g.:
+
+    python -m benchmarks.synthetic --nodes 1000 --format json > nodes.json
+"""
+import argparse
+import json
+import random
+import sys
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from config.settings import UPDATE_INTERVAL
+
+# (state, weight); includes the flag suffixes and combined states real clusters report
+STATES = [
+    ('IDLE', 30), ('ALLOCATED', 25), ('MIXED', 25), ('IDLE+DRAIN', 4), ('MIXED+DRAIN', 2),
+    ('ALLOCATED+COMPLETING', 3), ('DOWN+NOT_RESPONDING', 3), ('DOWN*+DRAIN', 2), ('IDLE*', 2),
+    ('RESERVED', 2), ('FUTURE', 1), ('IDLE+POWERED_DOWN', 1)
+]
+# (CPUs, RealMemory in MB, Gres, Features, Partitions)
+NODE_TYPES = [
+    (64, 385000, 'gpu:a100:4', 'ib,avx512,a100', 'gpu,long'),
+    (128, 514000, '(null)', 'ib,avx512', 'compute,long'),
+    (48, 191000, '(null)', 'avx2', 'compute'),
+    (32, 1540000, '(null)', 'ib,bigmem', 'bigmem')
+]
+REASONS = ['Not responding', 'Kill task failed', 'hardware: DIMM B2 ECC errors', 'maintenance 2025-01 [rack 4]']
+
+
+def nodes(node_count, seed=0):
+    """Yields `node_count` synthetic node records as dicts.
+
+    Down nodes report N/A for CPULoad and FreeMem, a few nodes come from an
+    older slurmd without CPUEfctv, and loads above the CPU count and free
+    memory above RealMemory occur, as they do on real clusters.
+    """
+    rng = random.Random(seed)
+    state_names = [state for state, _ in STATES]
+    weights = [weight for _, weight in STATES]
+    start = datetime(2025, 1, 1)
+    for i in range(node_count):
+        cpus, real_memory, gres, features, partitions = NODE_TYPES[i * len(NODE_TYPES) // node_count]
+        state = rng.choices(state_names, weights)[0]
+        down = state.startswith('DOWN') or '*' in state
+        busy = state.startswith(('ALLOCATED', 'MIXED'))
+        cpu_alloc = cpus if state.startswith('ALLOCATED') else rng.randint(1, cpus - 1) if busy else 0
+        cpu_load = None if down else round(rng.uniform(0, cpu_alloc * 1.2 + 0.5), 2)
+        free_mem = None if down else min(int(real_memory * rng.uniform(0.02, 1.02)), real_memory + 4096)
+        boot = start + timedelta(days=rng.randint(0, 30), seconds=rng.randint(0, 86399))
+        yield {
+            'name': f"node{i:05d}",
+            'cpus': cpus,
+            'effective_cpus': None if i % 50 == 7 else cpus,
+            'alloc_cpus': cpu_alloc,
+            'cpu_load': cpu_load,
+            'real_memory': real_memory,
+            'free_mem': free_mem,
+            'alloc_memory': rng.randint(0, real_memory) if busy else 0,
+            'state': state,
+            'gres': gres,
+            'features': features,
+            'partitions': partitions,
+            'reason': (f"{rng.choice(REASONS)} [slurm@{boot:%Y-%m-%dT%H:%M:%S}]"
+                       if 'DRAIN' in state or down else None),
+            'boot_time': boot,
+            'last_busy': boot + timedelta(hours=rng.randint(1, 200))
+        }
+
+
+def scontrol_text(node_count, oneliner=False, seed=0):
+    """Returns `scontrol show node` text, multi-line or `--oneliner`."""
+    separator = " " if oneliner else "\n   "
+    blocks = []
+    for node in nodes(node_count, seed):
+        name = node['name']
+        cpu_load = 'N/A' if node['cpu_load'] is None else f"{node['cpu_load']:.2f}"
+        free_mem = 'N/A' if node['free_mem'] is None else node['free_mem']
+        efctv = '' if node['effective_cpus'] is None else f"CPUEfctv={node['effective_cpus']} "
+        fields = [
+            f"NodeName={name} Arch=x86_64 CoresPerSocket={node['cpus'] // 2}",
+            f"CPUAlloc={node['alloc_cpus']} {efctv}CPUTot={node['cpus']} CPULoad={cpu_load}",
+            f"AvailableFeatures={node['features']} ActiveFeatures={node['features']}",
+            f"Gres={node['gres']}",
+            f"NodeAddr={name} NodeHostName={name} Version=23.02.4",
+            "OS=Linux 4.18.0-477.el8.x86_64 #1 SMP Wed May 3 2023",
+            f"RealMemory={node['real_memory']} AllocMem={node['alloc_memory']} FreeMem={free_mem} "
+            f"Sockets=2 Boards=1",
+            f"State={node['state']} ThreadsPerCore=1 TmpDisk=0 Weight=1 Owner=N/A MCS_label=N/A",
+            f"Partitions={node['partitions']}",
+            f"BootTime={node['boot_time']:%Y-%m-%dT%H:%M:%S} SlurmdStartTime={node['boot_time']:%Y-%m-%dT%H:%M:%S}",
+            f"LastBusyTime={node['last_busy']:%Y-%m-%dT%H:%M:%S} ResumeAfterTime=None",
+            f"CfgTRES=cpu={node['cpus']},mem={node['real_memory']}M,billing={node['cpus']}",
+            f"AllocTRES=cpu={node['alloc_cpus']}",
+            "CapWatts=n/a CurrentWatts=0 AveWatts=0",
+        ]
+        if node['reason']:
+            fields.append(f"Reason={node['reason']}")
+        blocks.append(separator.join(fields))
+    return ("\n" if oneliner else "\n\n").join(blocks) + "\n"
+
+
+def scontrol_json(node_count, seed=0):
+    """Returns `scontrol show node --json` text in the Slurm 23.02 layout."""
+    def number(value):
+        return {'set': value is not None, 'infinite': False, 'number': value or 0}
+
+    return json.dumps({
+        'meta': {'plugin': {'type': 'openapi/v0.0.39'}, 'Slurm': {'release': '23.02.4'}},
+        'nodes': [{
+            'name': node['name'],
+            'architecture': 'x86_64',
+            'cpus': node['cpus'],
+            'effective_cpus': node['effective_cpus'],
+            'alloc_cpus': node['alloc_cpus'],
+            'cpu_load': None if node['cpu_load'] is None else round(node['cpu_load'] * 100),
+            'real_memory': node['real_memory'],
+            'free_mem': number(node['free_mem']),
+            'alloc_memory': node['alloc_memory'],
+            'state': node['state'].replace('*', '').split('+'),
+            'gres': '' if node['gres'] == '(null)' else node['gres'],
+            'features': node['features'].split(','),
+            'partitions': node['partitions'].split(','),
+            'reason': node['reason'] or '',
+            'boot_time': number(int(node['boot_time'].timestamp())),
+            'last_busy': number(int(node['last_busy'].timestamp()))
+        } for node in nodes(node_count, seed)],
+        'errors': [],
+        'warnings': []
+    }, indent=2)
+
+
+def sinfo_text(node_count, seed=0):
+    """Returns `sinfo --format='%R|%a|%D|%C'` output for the nodes' partitions."""
+    rng = random.Random(seed)
+    lines = []
+    for t, (cpus, _, _, _, partitions) in enumerate(NODE_TYPES):
+        count = (t + 1) * node_count // len(NODE_TYPES) - t * node_count // len(NODE_TYPES)
+        total = count * cpus
+        allocated = rng.randint(0, total)
+        other = rng.randint(0, (total - allocated) // 10)
+        for partition in partitions.split(','):
+            lines.append(f"{partition}|up|{count}|{allocated}/{total - allocated - other}/{other}/{total}")
+    return "\n".join(lines) + "\n"
+
+
+def squeue_text(node_count, seed=0):
+    """Returns `squeue --format='%i|%u|%P|%T|%M|%D|%N'` output with running and pending jobs."""
+    rng = random.Random(seed)
+    lines = []
+    node = 0
+    for job in range(max(1, node_count // 2)):
+        partition = NODE_TYPES[min(node, node_count - 1) * len(NODE_TYPES) // node_count][4].split(',')[0]
+        size = rng.choice([1, 1, 1, 2, 4, 8])
+        if node + size <= node_count and rng.random() < 0.7:
+            hostlist = f"node{node:05d}" if size == 1 else f"node[{node:05d}-{node + size - 1:05d}]"
+            elapsed = f"{rng.randint(0, 23)}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+            lines.append(f"{100000 + job}|user{rng.randint(0, 40):02d}|{partition}|RUNNING|{elapsed}|{size}|{hostlist}")
+            node += size
+        else:
+            lines.append(f"{100000 + job}|user{rng.randint(0, 40):02d}|{partition}|PENDING|0:00|{size}|")
+    return "\n".join(lines) + "\n"
+
+
+def sacct_text(node_count, end=None, hours=24, seed=0):
+    """Returns `sacct --parsable2` output for jobs that finished within `hours` before `end`."""
+    rng = random.Random(seed)
+    end = end or datetime.now()
+    states = ['COMPLETED'] * 6 + ['FAILED', 'TIMEOUT', 'CANCELLED by 1234', 'OUT_OF_MEMORY', 'NODE_FAIL']
+    lines = []
+    for job in range(max(1, node_count // 4)):
+        finished = end - timedelta(seconds=rng.randint(0, hours * 3600))
+        elapsed = timedelta(seconds=rng.randint(30, 12 * 3600))
+        node = rng.randrange(node_count)
+        state = rng.choice(states)
+        hostlist = 'None assigned' if state.startswith('CANCELLED') and rng.random() < 0.5 else f"node{node:05d}"
+        partition = NODE_TYPES[node * len(NODE_TYPES) // node_count][4].split(',')[0]
+        lines.append(f"{90000 + job}|user{rng.randint(0, 40):02d}|{partition}|{state}|"
+                     f"{finished - elapsed:%Y-%m-%dT%H:%M:%S}|{finished:%Y-%m-%dT%H:%M:%S}|"
+                     f"{str(elapsed).rjust(8, '0')}|{hostlist}|{0 if state == 'COMPLETED' else 1}:0")
+    return "\n".join(lines) + "\n"
+
+
+def sdiag_text(seed=0):
+    """Returns `sdiag` output with main and backfill scheduler statistics."""
+    rng = random.Random(seed)
+    return (
+        "*******************************************************\n"
+        f"sdiag output at {datetime.now():%a %b %d %H:%M:%S %Y}\n"
+        "Data since      Thu Jan 02 00:00:00 2025 (1735776000)\n"
+        "*******************************************************\n"
+        f"Server thread count:  {rng.randint(1, 8)}\n"
+        f"Agent queue size:     {rng.randint(0, 20)}\n"
+        "Agent count:          0\n"
+        f"DBD Agent queue size: {rng.randint(0, 5)}\n\n"
+        f"Jobs submitted: {rng.randint(1000, 5000)}\n"
+        f"Jobs started:   {rng.randint(800, 4000)}\n"
+        f"Jobs completed: {rng.randint(700, 3500)}\n"
+        f"Jobs failed:    {rng.randint(0, 50)}\n"
+        f"Jobs pending:   {rng.randint(0, 500)}\n"
+        f"Jobs running:   {rng.randint(0, 800)}\n\n"
+        "Main schedule statistics (microseconds):\n"
+        f"\tLast cycle:   {rng.randint(100, 50000)}\n"
+        f"\tMax cycle:    {rng.randint(50000, 900000)}\n"
+        f"\tTotal cycles: {rng.randint(1000, 90000)}\n"
+        f"\tMean cycle:   {rng.randint(100, 20000)}\n"
+        f"\tLast queue length: {rng.randint(0, 500)}\n\n"
+        "Backfilling stats\n"
+        f"\tTotal backfilled jobs (since last slurm start): {rng.randint(0, 3000)}\n"
+        f"\tLast cycle: {rng.randint(1000, 900000)}\n"
+        f"\tMax cycle:  {rng.randint(900000, 9000000)}\n"
+        f"\tLast depth cycle: {rng.randint(0, 500)}\n"
+    )
+
+
+def chunked(text, size=64 * 1024):
+    """Splits `text` into chunks, as it would arrive over SSH."""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def history(node_count, days, interval_minutes=UPDATE_INTERVAL // 60000, end=None, seed=0):
+    """Returns `days` of node history (HISTORY_COLUMNS) sampled every `interval_minutes`, ending at `end`.
+
+    CPU load follows a daily cycle with noise, memory use tracks it, and
+    some nodes go down for a few hours at a time.
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end or datetime.now()).floor(f"{interval_minutes}min")
+    timestamps = pd.date_range(end=end, periods=days * 24 * 60 // interval_minutes,
+                               freq=f"{interval_minutes}min")
+    samples = len(timestamps)
+
+    node_types = np.arange(node_count) * len(NODE_TYPES) // node_count
+    cpus = np.array([node_type[0] for node_type in NODE_TYPES])[node_types]
+    real_memory = np.array([node_type[1] for node_type in NODE_TYPES])[node_types]
+    hours = (timestamps.hour + timestamps.minute / 60).to_numpy()
+    cycle = 0.55 + 0.35 * np.sin((hours - 9) / 24 * 2 * np.pi)
+    usage = np.clip(cycle[:, None] * rng.uniform(0.3, 1.1, node_count)
+                    + rng.normal(0, 0.08, (samples, node_count)), 0, 1.15)
+
+    states = np.where(usage > 0.9, 'ALLOCATED', np.where(usage > 0.15, 'MIXED', 'IDLE')).astype(object)
+    down = np.zeros((samples, node_count), dtype=bool)
+    for node in rng.choice(node_count, size=max(1, node_count // 50), replace=False):
+        start = rng.integers(0, samples)
+        down[start:start + rng.integers(6, 48), node] = True
+    states[down] = 'DOWN+NOT_RESPONDING'
+    cpu_load = np.where(down, 0, usage * cpus).round(2)
+    free_mem = np.where(down, 0, real_memory * (1 - np.clip(usage * 0.9, 0, 0.98))).astype('int64')
+
+    return pd.DataFrame({
+        'timestamp': np.repeat(timestamps.to_numpy(), node_count),
+        'CPULoad': cpu_load.ravel(),
+        'RealMemory': np.tile(real_memory, samples),
+        'FreeMem': free_mem.ravel(),
+        'State': pd.Categorical(states.ravel()),
+        'NodeName': np.tile(np.array([f"node{i:05d}" for i in range(node_count)], dtype=object), samples)
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=100)
+    parser.add_argument('--format', choices=['text', 'oneliner', 'json'], default='oneliner')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.format == 'json':
+        sys.stdout.write(scontrol_json(args.nodes, args.seed))
+    else:
+        sys.stdout.write(scontrol_text(args.nodes, args.format == 'oneliner', args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,93 @@
 HOSTNAME = "simlab-cluster.um6p.ma"
 CSV_FILENAME = "node_report.csv"
 UPDATE_INTERVAL = 5 * 60 * 1000 
+SSH_CONNECT_TIMEOUT = 10
+SSH_COMMAND_TIMEOUT = 60
+SSH_KEEPALIVE_INTERVAL = 30
+SSH_POOL_MAX_SIZE = 8
+SSH_POOL_IDLE_TIMEOUT = 15 * 60
+# Login checks are cached this many seconds (failures for AUTH_CACHE_FAILURE_TTL)
+AUTH_CACHE_TTL = 5 * 60
+AUTH_CACHE_FAILURE_TTL = 30
+AUTH_CACHE_MAX_SIZE = 256
+# "memory" keeps sessions in this process. "sqlite" is opt-in: it keeps them
+# across restarts in SESSION_DB, with each user's SSH password encrypted
+# under the key in SESSION_KEY_FILE, so both files must be kept private
+SESSION_BACKEND = "memory"
+SESSION_DB = "sessions.db"
+SESSION_KEY_FILE = "session.key"
+# Sessions expire after this many idle seconds; beyond SESSION_MAX_SIZE the
+# least recently used are dropped
+SESSION_TTL = 8 * 60 * 60
+SESSION_MAX_SIZE = 1024
+# "batch" runs SLURM_BATCH_COMMANDS as one framed script per poll; "auto"
+# tries `scontrol show node --json` and falls back to text on older Slurm;
+# "json" and "text" force one scontrol format. Only "batch" collects
+# partitions, jobs and scheduler stats.
+SLURM_INGEST_MODE = "batch"
+# Section name -> command, run in order over a single SSH channel
+SLURM_BATCH_COMMANDS = {
+    "nodes": "scontrol show node --oneliner",
+    "partitions": "sinfo --noheader --format='%R|%a|%D|%C'",
+    "jobs": "squeue --noheader --format='%i|%u|%P|%T|%M|%D|%N'",
+    "scheduler": "sdiag"
+}
+# sacct query for jobs that finished since {since}, added to each batch poll.
+# The first query covers JOB_HISTORY_RETENTION_HOURS; later ones start where
+# the previous one ended, less JOB_ACCOUNTING_OVERLAP seconds for clock skew.
+SLURM_ACCOUNTING_COMMAND = (
+    "sacct --allusers --allocations --noheader --parsable2 "
+    "--state=CD,F,CA,TO,OOM,NF,PR,DL --starttime={since} --endtime=now "
+    "--format=JobID,User,Partition,State,Start,End,Elapsed,NodeList,ExitCode"
+)
+JOB_ACCOUNTING_OVERLAP = 60
+# Finished jobs are kept in memory (and listed per node) for this long
+JOB_HISTORY_RETENTION_HOURS = 24
+HISTORY_DIR = "history"
+HISTORY_RETENTION_DAYS = 7
+RING_BUFFER_SLOTS = HISTORY_RETENTION_DAYS * 24 * 60 * 60 * 1000 // UPDATE_INTERVAL
+ROLLUP_RETENTION_DAYS = {"hourly": 90, "daily": 365}
+HISTORY_GRAPH_MAX_POINTS = 1000
+# Clusters with more nodes than this get a node x time CPU heatmap, partition
+# and state aggregates and the TOP_NODES busiest nodes instead of one bar per
+# node. The heatmap has at most HEATMAP_ROWS node groups by HEATMAP_COLUMNS
+# time bins, about one cell per few pixels of a full-width figure, so its
+# size does not grow with the cluster
+CLUSTER_BAR_NODE_LIMIT = 200
+HEATMAP_ROWS = 100
+HEATMAP_COLUMNS = 400
+TOP_NODES = 10
+REPORT_WORKERS = 2
+REPORT_CACHE_SIZE = 16
+# Report period -> days of history, summarised from hourly rollups
+REPORT_PERIODS = {"daily": 1, "weekly": 7}
+REPORT_TABLE_ROWS = 35
+# Recent snapshots kept so dashboard updates can be sent as diffs
+SNAPSHOT_HISTORY_SIZE = 12
+# Server-sent events: how often (seconds) streams check for a new snapshot,
+# and how long they may stay silent before sending a keep-alive comment
+EVENTS_POLL_INTERVAL = 1
+EVENTS_KEEPALIVE_INTERVAL = 15
+# Per-tick snapshot diffs ignore metric moves up to these amounts
+# (CPULoad in %, memory in MB); State changes are always reported
+DIFF_TOLERANCES = {"CPULoad": 0.5, "FreeMem": 256}
+# Slurm clusters to monitor: name -> login host ("host:port" for a non-standard
+# SSH port). Logins are checked against the first one, which also keeps its
+# history directly in HISTORY_DIR.
+CLUSTERS = {"simlab": HOSTNAME}
+# Each poll waits at most this many seconds per cluster, polling up to
+# CLUSTER_POLL_CONCURRENCY clusters at once
+CLUSTER_POLL_TIMEOUT = 120
+CLUSTER_POLL_CONCURRENCY = 4
+# Opt-in Dash callback profiling (also switchable at /admin/profiles): every
+# callback's wall and CPU time and allocated bytes are recorded, and calls
+# slower than PROFILE_THRESHOLD seconds get their stack sampled every
+# PROFILE_SAMPLE_INTERVAL seconds and a tracemalloc diff; the last
+# PROFILE_RING_SIZE such profiles are kept in PROFILE_DIR
+PROFILE_CALLBACKS = False
+PROFILE_THRESHOLD = 1.0
+PROFILE_SAMPLE_INTERVAL = 0.01
+PROFILE_DIR = "profiles"
+PROFILE_RING_SIZE = 50
+# Users who may open the /admin pages; none by default
+ADMIN_USERS = []
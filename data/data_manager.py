@@ -1,26 +1,250 @@
+import io
+import json
+import os
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
 import pandas as pd
 from datetime import datetime, timedelta
+from config.settings import HISTORY_DIR, HISTORY_RETENTION_DAYS, ROLLUP_RETENTION_DAYS
+from data.history_index import HistoryIndex
+from utils.metrics import REGISTRY
+
+# Only these columns are kept in the history; the rest of a snapshot is live-only.
+HISTORY_COLUMNS = ['timestamp', 'CPULoad', 'RealMemory', 'FreeMem', 'State', 'NodeName']
+LEGACY_HISTORY_FILE = 'historical_data.csv'
+MANIFEST_FILE = 'manifest.json'
+INDEX_FILE = 'history.db'
+LOCK_FILE = '.lock'
+
+HISTORY_WRITE_SECONDS = REGISTRY.histogram('history_write_seconds', 'Time to append a snapshot to the history',
+                                           ['cluster'])
+HISTORY_ROWS_WRITTEN = REGISTRY.counter('history_rows_written', 'Rows appended to the history', ['cluster'])
 
 class DataManager:
-    @staticmethod
-    def update_historical_data(new_data):
-        """Updates the historical data CSV with new readings."""
+    """Append-only node history, partitioned into one CSV segment per day.
+
+    Each snapshot is appended to its day's segment and fsynced, then the
+    manifest recording every segment's committed length is atomically
+    replaced. Readers only look at committed bytes, and anything past them
+    (a torn append after a crash) is truncated on startup. Retention drops
+    whole expired segments, so a write costs O(new rows). Committed rows are
+    also written to a HistoryIndex for fast per-node queries.
+
+    Each cluster has its own store; rows read back are labelled with
+    `cluster` in the Cluster column. A store has a single writer: it holds
+    a lock on its directory until `close`, and opening it again, from this
+    or another process, raises.
+    """
+
+    def __init__(self, history_dir=HISTORY_DIR, retention_days=HISTORY_RETENTION_DAYS, cluster=None,
+                 import_legacy=True):
+        self.history_dir = history_dir
+        self.retention_days = retention_days
+        self.cluster = cluster
+        os.makedirs(self.history_dir, exist_ok=True)
+        self._lock_file = _lock_directory(self.history_dir)
+        self._partitions = {}
+        self._last_timestamp = None
+        self._rollups_pruned = None
+        self._load_manifest()
+        self._recover()
+        self.index = HistoryIndex(os.path.join(self.history_dir, INDEX_FILE))
+        if import_legacy and not self._partitions and os.path.exists(LEGACY_HISTORY_FILE):
+            self._import_legacy_history()
+        self._catch_up_index()
+
+    def update_historical_data(self, new_data):
+        """Appends a snapshot to the history and returns the rows written."""
+        with HISTORY_WRITE_SECONDS.time(cluster=self.cluster):
+            rows = new_data[HISTORY_COLUMNS].copy()
+            rows['timestamp'] = pd.to_datetime(rows['timestamp'])
+            if self._last_timestamp is not None:
+                rows = rows[rows['timestamp'] > self._last_timestamp]
+
+            self._append(rows)
+            self.apply_retention()
+        HISTORY_ROWS_WRITTEN.inc(len(rows), cluster=self.cluster)
+        return rows
+
+    def close(self):
+        """Releases the directory lock, so another DataManager may open the store."""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def load_history(self, since=None):
+        """Loads committed history rows newer than `since` (default: the retention window)."""
+        cutoff = since or datetime.now() - timedelta(days=self.retention_days)
+        first_partition = cutoff.strftime('%Y-%m-%d')
+        frames = [
+            self._read_partition(partition)
+            for partition in sorted(self._partitions)
+            if partition >= first_partition
+        ]
+        if not frames:
+            return pd.DataFrame(columns=HISTORY_COLUMNS + ['Cluster'])
+        history = pd.concat(frames, ignore_index=True)
+        history = history[history['timestamp'] > cutoff].reset_index(drop=True)
+        history['Cluster'] = self.cluster
+        return history
+
+    def load_node_history(self, node_name):
+        """Loads the committed history of a single node."""
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+        node_history = self.index.query_node(node_name, cutoff)
+        node_history['Cluster'] = self.cluster
+        return node_history
+
+    def load_node_rollups(self, node_name, tier, since=None):
+        """Loads a node's hourly or daily rollups, by default over the tier's full retention."""
+        since = since or datetime.now() - timedelta(days=ROLLUP_RETENTION_DAYS[tier])
+        return self.index.query_rollups(node_name, tier, since)
+
+    def load_period_summary(self, since, until, tier='hourly'):
+        """Loads per-node and cluster-wide aggregates for a report period."""
+        return self.index.query_period(tier, since, until)
+
+    def apply_retention(self):
+        """Drops partitions that fall entirely outside the retention window,
+        along with expired raw samples and rollups in the index."""
+        today = datetime.now().date()
+        if self._rollups_pruned != today:
+            # Rollups have their own retention, checked once a day whether
+            # or not a partition expired.
+            for tier, days in ROLLUP_RETENTION_DAYS.items():
+                self.index.delete_rollups_before(tier, datetime.now() - timedelta(days=days))
+            self._rollups_pruned = today
+
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime('%Y-%m-%d')
+        expired = [partition for partition in self._partitions if partition < cutoff]
+        if not expired:
+            return
+        for partition in expired:
+            del self._partitions[partition]
+        self._commit()
+        for partition in expired:
+            self._remove(self._segment_path(partition))
+        self.index.delete_before(pd.Timestamp(cutoff))
+
+    def _append(self, rows):
+        if rows.empty:
+            return
+        days = rows['timestamp'].dt.strftime('%Y-%m-%d')
+        for partition, day_rows in rows.groupby(days, sort=True):
+            is_new = partition not in self._partitions
+            payload = day_rows.to_csv(header=is_new, index=False).encode()
+            path = self._segment_path(partition)
+            with open(path, 'ab') as segment:
+                segment.write(payload)
+                segment.flush()
+                os.fsync(segment.fileno())
+            self._partitions[partition] = self._partitions.get(partition, 0) + len(payload)
+        self._last_timestamp = rows['timestamp'].max()
+        self._commit()
+        self.index.insert(rows)
+
+    def _read_partition(self, partition):
+        with open(self._segment_path(partition), 'rb') as segment:
+            payload = segment.read(self._partitions[partition])
+        return pd.read_csv(io.BytesIO(payload), parse_dates=['timestamp'])
+
+    def _load_manifest(self):
         try:
-            historical_data = pd.read_csv('historical_data.csv')
-            historical_data['timestamp'] = pd.to_datetime(historical_data['timestamp'])
+            with open(os.path.join(self.history_dir, MANIFEST_FILE)) as manifest:
+                state = json.load(manifest)
         except FileNotFoundError:
-            historical_data = pd.DataFrame()
-        
-        new_data['timestamp'] = pd.to_datetime(new_data['timestamp'])
-        updated_data = pd.concat([historical_data, new_data], ignore_index=True)
-        
-        cutoff_date = datetime.now() - timedelta(days=7)
-        updated_data = updated_data[updated_data['timestamp'] > cutoff_date]
-        
-        updated_data = updated_data.sort_values('timestamp').drop_duplicates(
-            subset=['NodeName', 'timestamp'], 
+            return
+        self._partitions = state.get('partitions', {})
+        if state.get('last_timestamp'):
+            self._last_timestamp = pd.Timestamp(state['last_timestamp'])
+
+    def _commit(self):
+        """Atomically replaces the manifest with the current committed state."""
+        state = {
+            'partitions': self._partitions,
+            'last_timestamp': self._last_timestamp.isoformat() if self._last_timestamp is not None else None
+        }
+        path = os.path.join(self.history_dir, MANIFEST_FILE)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as manifest:
+            json.dump(state, manifest)
+            manifest.flush()
+            os.fsync(manifest.fileno())
+        os.replace(temp_path, path)
+        self._fsync_directory()
+
+    def _recover(self):
+        """Truncates torn appends and removes segments that were never committed."""
+        for name in os.listdir(self.history_dir):
+            if not name.endswith('.csv'):
+                continue
+            partition = name[:-len('.csv')]
+            path = self._segment_path(partition)
+            if partition not in self._partitions:
+                self._remove(path)
+            elif os.path.getsize(path) > self._partitions[partition]:
+                with open(path, 'r+b') as segment:
+                    segment.truncate(self._partitions[partition])
+        for partition in [p for p in self._partitions if not os.path.exists(self._segment_path(p))]:
+            del self._partitions[partition]
+
+    def _catch_up_index(self):
+        """Indexes committed rows the index missed, e.g. after a crash between
+        committing a segment and indexing it."""
+        indexed_until = self.index.last_timestamp()
+        if indexed_until is not None and (self._last_timestamp is None
+                                          or indexed_until >= self._last_timestamp):
+            return
+        self.index.insert(self.load_history(since=indexed_until))
+
+    def _import_legacy_history(self):
+        """Moves the old single-file CSV history into daily partitions."""
+        try:
+            legacy = pd.read_csv(LEGACY_HISTORY_FILE, parse_dates=['timestamp'])
+        except Exception as e:
+            print(f"Could not import {LEGACY_HISTORY_FILE}: {e}")
+            return
+        legacy = legacy.sort_values('timestamp').drop_duplicates(
+            subset=['NodeName', 'timestamp'],
             keep='last'
         )
-        
-        updated_data.to_csv('historical_data.csv', index=False)
-        return updated_data
\ No newline at end of file
+        self._append(legacy[HISTORY_COLUMNS])
+        self.apply_retention()
+
+    def _segment_path(self, partition):
+        return os.path.join(self.history_dir, f"{partition}.csv")
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _fsync_directory(self):
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        descriptor = os.open(self.history_dir, os.O_DIRECTORY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+
+def _lock_directory(directory):
+    """Takes an exclusive, non-blocking lock on a history directory, released
+    when the returned file is closed or the process exits."""
+    lock_file = open(os.path.join(directory, LOCK_FILE), 'a+')
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        raise Exception(f"History in {directory} is already open in another DataManager or process; "
+                        f"only one collector may write it")
+    return lock_file
@@ -0,0 +1,261 @@
+import sqlite3
+import threading
+import pandas as pd
+
+# Rollup tier -> bucket width in nanoseconds
+ROLLUP_TIERS = {
+    'hourly': 60 * 60 * 10**9,
+    'daily': 24 * 60 * 60 * 10**9
+}
+
+class HistoryIndex:
+    """SQLite index over the node history, clustered on (NodeName, timestamp).
+
+    The daily segments written by DataManager stay the source of truth; this
+    index is derived from them so that one node's series can be read without
+    scanning every other node's rows. It runs in WAL mode so dashboard
+    readers never block the collector's writes.
+
+    Hourly and daily rollups (min/mean/max/last per node) are maintained
+    incrementally in the same transaction as each insert, so graphs and
+    reports read precomputed aggregates that outlive the raw samples. Only
+    samples not indexed yet are added to them, so replaying rows (legacy
+    import, crash recovery) never counts a sample twice.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS samples (
+                NodeName TEXT NOT NULL,
+                timestamp INTEGER NOT NULL,
+                CPULoad REAL,
+                RealMemory INTEGER,
+                FreeMem INTEGER,
+                State TEXT,
+                PRIMARY KEY (NodeName, timestamp)
+            ) WITHOUT ROWID
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS samples_timestamp ON samples (timestamp)")
+        for tier in ROLLUP_TIERS:
+            connection.execute(f"""
+                CREATE TABLE IF NOT EXISTS rollups_{tier} (
+                    NodeName TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    samples INTEGER NOT NULL,
+                    first_timestamp INTEGER NOT NULL,
+                    last_timestamp INTEGER NOT NULL,
+                    cpu_min REAL, cpu_sum REAL, cpu_max REAL, cpu_last REAL,
+                    free_mem_min INTEGER, free_mem_sum INTEGER, free_mem_max INTEGER, free_mem_last INTEGER,
+                    real_memory_first INTEGER, real_memory_last INTEGER,
+                    PRIMARY KEY (NodeName, bucket)
+                ) WITHOUT ROWID
+            """)
+        connection.commit()
+        self._backfill_rollups()
+
+    def insert(self, rows):
+        """Indexes history rows (timestamp, CPULoad, RealMemory, FreeMem, State, NodeName).
+
+        Rows for a (NodeName, timestamp) that is already indexed are skipped
+        and the first value kept. Returns the number of rows added.
+        """
+        if rows.empty:
+            return 0
+        samples = self._samples_frame(rows).drop_duplicates(['NodeName', 'timestamp'], keep='last')
+        connection = self._connection()
+        with connection:
+            # Taking the write lock first keeps another writer from indexing
+            # the same rows between the check and the insert.
+            connection.execute("BEGIN IMMEDIATE")
+            existing = connection.execute(
+                "SELECT NodeName, timestamp FROM samples WHERE timestamp BETWEEN ? AND ?",
+                (int(samples['timestamp'].min()), int(samples['timestamp'].max()))
+            ).fetchall()
+            if existing:
+                keys = pd.MultiIndex.from_frame(samples[['NodeName', 'timestamp']])
+                samples = samples[~keys.isin(pd.MultiIndex.from_tuples(existing))]
+            if samples.empty:
+                return 0
+            connection.executemany(
+                "INSERT OR IGNORE INTO samples VALUES (?, ?, ?, ?, ?, ?)",
+                samples[['NodeName', 'timestamp', 'cpu', 'real_memory', 'free_mem', 'State']]
+                .itertuples(index=False, name=None)
+            )
+            self._update_rollups(connection, samples)
+        return len(samples)
+
+    def query_node(self, node_name, since):
+        """Returns one node's samples newer than `since`, ordered by time."""
+        node_history = pd.read_sql_query(
+            "SELECT timestamp, CPULoad, RealMemory, FreeMem, State, NodeName FROM samples "
+            "WHERE NodeName = ? AND timestamp > ? ORDER BY timestamp",
+            self._connection(),
+            params=(node_name, pd.Timestamp(since).value)
+        )
+        node_history['timestamp'] = pd.to_datetime(node_history['timestamp'])
+        return node_history
+
+    def query_rollups(self, node_name, tier, since):
+        """Returns one node's rollup buckets for `tier` ('hourly' or 'daily') newer than `since`."""
+        rollups = pd.read_sql_query(
+            f"SELECT bucket AS timestamp, samples, "
+            f"cpu_min AS CPULoad_min, cpu_sum / samples AS CPULoad_mean, "
+            f"cpu_max AS CPULoad_max, cpu_last AS CPULoad_last, "
+            f"free_mem_min AS FreeMem_min, CAST(free_mem_sum AS REAL) / samples AS FreeMem_mean, "
+            f"free_mem_max AS FreeMem_max, free_mem_last AS FreeMem_last, "
+            f"real_memory_first AS RealMemory_first, real_memory_last AS RealMemory_last "
+            f"FROM rollups_{tier} WHERE NodeName = ? AND bucket >= ? ORDER BY bucket",
+            self._connection(),
+            params=(node_name, self._bucket(pd.Timestamp(since).value, tier))
+        )
+        rollups['timestamp'] = pd.to_datetime(rollups['timestamp'])
+        return rollups
+
+    def query_period(self, tier, since, until):
+        """Aggregates every node's `tier` rollups between `since` and `until`.
+
+        Returns (nodes, cluster): one row per node with its period min/mean/max
+        and last known State, and one row per bucket with cluster-wide totals.
+        """
+        connection = self._connection()
+        params = (self._bucket(pd.Timestamp(since).value, tier), pd.Timestamp(until).value)
+        nodes = pd.read_sql_query(
+            f"SELECT NodeName, SUM(samples) AS samples, "
+            f"MIN(cpu_min) AS CPULoad_min, SUM(cpu_sum) / SUM(samples) AS CPULoad_mean, "
+            f"MAX(cpu_max) AS CPULoad_max, MIN(free_mem_min) AS FreeMem_min, "
+            f"CAST(SUM(free_mem_sum) AS REAL) / SUM(samples) AS FreeMem_mean, "
+            f"MAX(real_memory_last) AS RealMemory "
+            f"FROM rollups_{tier} WHERE bucket >= ? AND bucket < ? "
+            f"GROUP BY NodeName ORDER BY NodeName",
+            connection,
+            params=params
+        )
+        states = pd.read_sql_query(
+            "SELECT samples.NodeName, samples.State FROM samples JOIN ("
+            "    SELECT NodeName, MAX(timestamp) AS timestamp FROM samples"
+            "    WHERE timestamp < ? GROUP BY NodeName"
+            ") AS latest USING (NodeName, timestamp)",
+            connection,
+            params=(params[1],)
+        )
+        nodes = nodes.merge(states, on='NodeName', how='left')
+        nodes['State'] = nodes['State'].fillna('UNKNOWN')
+
+        cluster = pd.read_sql_query(
+            f"SELECT bucket AS timestamp, COUNT(*) AS nodes, "
+            f"SUM(cpu_sum) / SUM(samples) AS CPULoad_mean, MAX(cpu_max) AS CPULoad_max, "
+            f"SUM(CAST(free_mem_sum AS REAL) / samples) AS FreeMem, "
+            f"SUM(real_memory_last) AS RealMemory "
+            f"FROM rollups_{tier} WHERE bucket >= ? AND bucket < ? "
+            f"GROUP BY bucket ORDER BY bucket",
+            connection,
+            params=params
+        )
+        cluster['timestamp'] = pd.to_datetime(cluster['timestamp'])
+        return nodes, cluster
+
+    def delete_rollups_before(self, tier, cutoff):
+        """Removes `tier` rollup buckets that end before `cutoff`."""
+        connection = self._connection()
+        with connection:
+            connection.execute(f"DELETE FROM rollups_{tier} WHERE bucket < ?",
+                               (self._bucket(pd.Timestamp(cutoff).value, tier),))
+
+    def delete_before(self, cutoff):
+        """Removes samples older than `cutoff`."""
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM samples WHERE timestamp < ?", (pd.Timestamp(cutoff).value,))
+
+    def last_timestamp(self):
+        """Returns the newest indexed timestamp, or None if the index is empty."""
+        value = self._connection().execute("SELECT MAX(timestamp) FROM samples").fetchone()[0]
+        return pd.Timestamp(value) if value is not None else None
+
+    def _samples_frame(self, rows):
+        """Converts history rows to the index's column types, timestamps in nanoseconds."""
+        timestamps = pd.to_datetime(rows['timestamp']).astype('datetime64[ns]').astype('int64')
+        return pd.DataFrame({
+            'NodeName': rows['NodeName'].astype(str).to_numpy(),
+            'timestamp': timestamps.to_numpy(),
+            'cpu': rows['CPULoad'].astype(float).to_numpy(),
+            'free_mem': rows['FreeMem'].astype('int64').to_numpy(),
+            'real_memory': rows['RealMemory'].astype('int64').to_numpy(),
+            'State': rows['State'].astype(str).to_numpy() if 'State' in rows else None
+        })
+
+    def _update_rollups(self, connection, samples):
+        """Merges new samples (see _samples_frame) into every rollup tier with one
+        upsert per (node, bucket)."""
+        samples = samples.sort_values('timestamp', kind='stable')
+
+        for tier, width in ROLLUP_TIERS.items():
+            samples['bucket'] = samples['timestamp'] // width * width
+            buckets = samples.groupby(['NodeName', 'bucket'], sort=False).agg(
+                samples=('cpu', 'size'),
+                first_timestamp=('timestamp', 'first'),
+                last_timestamp=('timestamp', 'last'),
+                cpu_min=('cpu', 'min'),
+                cpu_sum=('cpu', 'sum'),
+                cpu_max=('cpu', 'max'),
+                cpu_last=('cpu', 'last'),
+                free_mem_min=('free_mem', 'min'),
+                free_mem_sum=('free_mem', 'sum'),
+                free_mem_max=('free_mem', 'max'),
+                free_mem_last=('free_mem', 'last'),
+                real_memory_first=('real_memory', 'first'),
+                real_memory_last=('real_memory', 'last')
+            ).reset_index()
+            connection.executemany(f"""
+                INSERT INTO rollups_{tier} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (NodeName, bucket) DO UPDATE SET
+                    samples = samples + excluded.samples,
+                    cpu_min = MIN(cpu_min, excluded.cpu_min),
+                    cpu_sum = cpu_sum + excluded.cpu_sum,
+                    cpu_max = MAX(cpu_max, excluded.cpu_max),
+                    free_mem_min = MIN(free_mem_min, excluded.free_mem_min),
+                    free_mem_sum = free_mem_sum + excluded.free_mem_sum,
+                    free_mem_max = MAX(free_mem_max, excluded.free_mem_max),
+                    cpu_last = CASE WHEN excluded.last_timestamp >= last_timestamp
+                                    THEN excluded.cpu_last ELSE cpu_last END,
+                    free_mem_last = CASE WHEN excluded.last_timestamp >= last_timestamp
+                                         THEN excluded.free_mem_last ELSE free_mem_last END,
+                    real_memory_last = CASE WHEN excluded.last_timestamp >= last_timestamp
+                                            THEN excluded.real_memory_last ELSE real_memory_last END,
+                    real_memory_first = CASE WHEN excluded.first_timestamp < first_timestamp
+                                             THEN excluded.real_memory_first ELSE real_memory_first END,
+                    first_timestamp = MIN(first_timestamp, excluded.first_timestamp),
+                    last_timestamp = MAX(last_timestamp, excluded.last_timestamp)
+            """, buckets.itertuples(index=False, name=None))
+
+    def _backfill_rollups(self):
+        """Builds rollups from raw samples indexed before rollups existed."""
+        connection = self._connection()
+        has_rollups = connection.execute("SELECT 1 FROM rollups_hourly LIMIT 1").fetchone()
+        has_samples = connection.execute("SELECT 1 FROM samples LIMIT 1").fetchone()
+        if has_rollups or not has_samples:
+            return
+        samples = pd.read_sql_query(
+            "SELECT timestamp, CPULoad, RealMemory, FreeMem, NodeName FROM samples",
+            connection
+        )
+        with connection:
+            self._update_rollups(connection, self._samples_frame(samples))
+
+    def _bucket(self, timestamp, tier):
+        width = ROLLUP_TIERS[tier]
+        return timestamp // width * width
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared between threads, so each
+        # thread (collector, Dash workers) gets its own.
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
@@ -0,0 +1,183 @@
+import threading
+import numpy as np
+import pandas as pd
+from config.settings import RING_BUFFER_SLOTS
+
+class MetricRingBuffer:
+    """Preallocated node x slot arrays holding the most recent samples per node.
+
+    Every poll writes one slot (column) for all nodes in place, so the live
+    dashboard reads history from memory without allocating per tick. Memory
+    is fixed at roughly 14 bytes per node per slot: float32 CPULoad, int32
+    RealMemory and FreeMem and an int16 State code. Slots where a node was
+    absent keep State code -1.
+    """
+
+    def __init__(self, slots=RING_BUFFER_SLOTS, node_capacity=256):
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._node_rows = {}
+        self._state_codes = {}
+        self._state_names = []
+        self._last_names = None
+        self._last_rows = None
+        self._head = 0
+        self._count = 0
+        self._appends = 0
+        # The last binned_cpu_load result, reused until the next append
+        self._binned = None
+        self.timestamps = np.full(slots, np.datetime64('NaT'), dtype='datetime64[ns]')
+        self._allocate(node_capacity)
+
+    def append(self, node_data):
+        """Writes one snapshot (NodeName, CPULoad, RealMemory, FreeMem, State) into the next slot."""
+        with self._lock:
+            rows = self._rows_for(node_data['NodeName'].to_numpy())
+            states = self._codes_for(node_data['State'])
+            slot = self._head
+
+            self.state[:, slot] = -1
+            self.cpu_load[rows, slot] = node_data['CPULoad'].to_numpy()
+            self.real_memory[rows, slot] = node_data['RealMemory'].to_numpy()
+            self.free_mem[rows, slot] = node_data['FreeMem'].to_numpy()
+            self.state[rows, slot] = states
+            self.timestamps[slot] = pd.Timestamp(node_data['timestamp'].iloc[0]).to_datetime64()
+
+            self._head = (slot + 1) % self.slots
+            self._count = min(self._count + 1, self.slots)
+            self._appends += 1
+
+    def warm_start(self, history):
+        """Fills the buffer from stored history, oldest snapshot first."""
+        if history.empty:
+            return
+        history = history.sort_values('timestamp')
+        timestamps = history['timestamp'].unique()[-self.slots:]
+        history = history[history['timestamp'] >= timestamps[0]]
+        for _, snapshot in history.groupby('timestamp', sort=True):
+            self.append(snapshot)
+
+    def node_history(self, node_name):
+        """Returns a node's buffered samples as a history DataFrame (empty if unknown)."""
+        with self._lock:
+            row = self._node_rows.get(node_name)
+            if row is None or not self._count:
+                return pd.DataFrame(columns=['timestamp', 'CPULoad', 'RealMemory',
+                                             'FreeMem', 'State', 'NodeName'])
+            window = {
+                'timestamp': self._chronological(self.timestamps),
+                'CPULoad': self._chronological(self.cpu_load[row]),
+                'RealMemory': self._chronological(self.real_memory[row]),
+                'FreeMem': self._chronological(self.free_mem[row]),
+                'State': self._chronological(self.state[row])
+            }
+            state_names = list(self._state_names)
+
+        present = window['State'] >= 0
+        if not present.all():
+            window = {column: values[present] for column, values in window.items()}
+        window['State'] = pd.Categorical.from_codes(window['State'], categories=state_names)
+        node_history = pd.DataFrame(window, copy=False)
+        node_history['NodeName'] = node_name
+        return node_history
+
+    def binned_cpu_load(self, max_rows, max_columns):
+        """Returns (timestamps, labels, values): the buffered CPULoad of all
+        nodes averaged into at most `max_rows` groups of neighbouring nodes
+        by `max_columns` time bins.
+
+        `timestamps` are the first sample time of each bin, `labels` name
+        each group's first and last node, and `values` is NaN where no node
+        of a group reported a load in a bin. The result's size depends on the
+        limits, not on the number of nodes, and it is computed once per
+        appended snapshot.
+        """
+        with self._lock:
+            node_count = len(self._node_rows)
+            if not node_count or not self._count:
+                return np.array([], dtype='datetime64[ns]'), [], np.empty((0, 0))
+            if self._binned is not None and self._binned[0] == (self._appends, max_rows, max_columns):
+                return self._binned[1]
+            # Groups are ranges of node names, whatever order nodes were first seen in.
+            names = sorted(self._node_rows)
+            order = np.fromiter((self._node_rows[name] for name in names), dtype=np.intp, count=node_count)
+            cpu_load = self.cpu_load[order]
+            present = (self.state[order] >= 0) & ~np.isnan(cpu_load)
+            cpu_load[~present] = 0
+            # Nodes are summed into groups before anything is put in time
+            # order, so only the small grouped arrays are reordered (slots
+            # are the first axis of the transposed arrays).
+            row_starts = _bin_starts(node_count, max_rows)
+            totals = self._chronological(np.add.reduceat(cpu_load, row_starts, axis=0, dtype=np.float64).T).T
+            counts = self._chronological(np.add.reduceat(present, row_starts, axis=0, dtype=np.int64).T).T
+            timestamps = self._chronological(self.timestamps)
+            key = (self._appends, max_rows, max_columns)
+
+        column_starts = _bin_starts(len(timestamps), max_columns)
+        totals = np.add.reduceat(totals, column_starts, axis=1)
+        counts = np.add.reduceat(counts, column_starts, axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = np.where(counts > 0, totals / counts, np.nan)
+        row_ends = np.append(row_starts[1:], node_count) - 1
+        labels = [names[start] if start == end else f"{names[start]} – {names[end]}"
+                  for start, end in zip(row_starts, row_ends)]
+        result = timestamps[column_starts], labels, values
+        with self._lock:
+            self._binned = (key, result)
+        return result
+
+    def _chronological(self, values):
+        # Before the buffer wraps, slots [0, count) are already in order and
+        # this is a view; afterwards the two halves are stitched together.
+        if self._count < self.slots:
+            return values[:self._count]
+        return np.concatenate((values[self._head:], values[:self._head]))
+
+    def _rows_for(self, node_names):
+        if (self._last_names is not None and len(self._last_names) == len(node_names)
+                and (self._last_names == node_names).all()):
+            return self._last_rows
+        rows = np.empty(len(node_names), dtype=np.intp)
+        for i, node_name in enumerate(node_names):
+            row = self._node_rows.get(node_name)
+            if row is None:
+                row = len(self._node_rows)
+                if row >= self.cpu_load.shape[0]:
+                    self._allocate(self.cpu_load.shape[0] * 2)
+                self._node_rows[node_name] = row
+            rows[i] = row
+        self._last_names = node_names.copy()
+        self._last_rows = rows
+        return rows
+
+    def _codes_for(self, states):
+        categorical = states.astype('category')
+        mapping = np.empty(len(categorical.cat.categories) + 1, dtype=np.int16)
+        for i, state in enumerate(categorical.cat.categories):
+            code = self._state_codes.get(state)
+            if code is None:
+                code = self._state_codes[state] = len(self._state_names)
+                self._state_names.append(state)
+            mapping[i] = code
+        mapping[-1] = -1
+        return mapping[categorical.cat.codes.to_numpy()]
+
+    def _allocate(self, capacity):
+        """(Re)allocates the per-node arrays, keeping existing rows."""
+        arrays = {
+            'cpu_load': (np.float32, np.nan),
+            'real_memory': (np.int32, 0),
+            'free_mem': (np.int32, 0),
+            'state': (np.int16, -1)
+        }
+        for name, (dtype, fill) in arrays.items():
+            resized = np.full((capacity, self.slots), fill, dtype=dtype)
+            current = getattr(self, name, None)
+            if current is not None:
+                resized[:current.shape[0]] = current
+            setattr(self, name, resized)
+
+
+def _bin_starts(length, bins):
+    """Start indices of at most `bins` nearly equal, non-empty bins over `length` items."""
+    return np.linspace(0, length, min(length, bins) + 1)[:-1].round().astype(np.intp)
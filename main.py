@@ -1,9 +1,16 @@
-from fastapi import FastAPI, Depends, Cookie, HTTPException
+from fastapi import FastAPI, Depends, Cookie, Header, HTTPException, Request
 from fastapi.middleware.wsgi import WSGIMiddleware
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from visualization.dashboard import Dashboard
 from auth.auth_manager import AuthManager
+from visualization.admin_pages import profiles_page, profile_page
+from utils.metrics import REGISTRY, OPENMETRICS_CONTENT_TYPE
+from config.settings import EVENTS_POLL_INTERVAL, EVENTS_KEEPALIVE_INTERVAL, ADMIN_USERS
 from typing import Optional
+from urllib.parse import urlsplit
+import asyncio
+import json
 import uvicorn
 
 # Create the FastAPI app instance
@@ -11,6 +18,9 @@ app = FastAPI()
 auth_manager = AuthManager()
 dashboard = Dashboard()
 
+ACTIVE_SESSIONS = REGISTRY.gauge('active_sessions', 'Logged-in sessions that have not expired')
+ACTIVE_SESSIONS.set_function(auth_manager.sessions.count)
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
     return auth_manager.get_login_page()
@@ -21,21 +31,149 @@ async def login(response=Depends(auth_manager.login)):
 
 # Initialize dashboard with credentials once
 dash_initialized = False
+dash_lock = asyncio.Lock()
+
+async def ensure_dashboard(user):
+    global dash_initialized
+    if dash_initialized:
+        return
+    async with dash_lock:
+        if not dash_initialized:
+            # Starting the collector waits for the first poll (up to
+            # CLUSTER_POLL_TIMEOUT), so it runs in a worker thread while the
+            # event loop keeps serving streams and /metrics.
+            await run_in_threadpool(dashboard.initialize_with_credentials, user["username"], user["password"])
+            app.mount("/dashboard", WSGIMiddleware(dashboard.app.server))
+            dash_initialized = True
+
+@app.middleware("http")
+async def start_dashboard(request: Request, call_next):
+    # A page left open across a restart sends Dash requests before anyone
+    # has opened /dashboard again; start the dashboard for them too.
+    if not dash_initialized and request.url.path.startswith("/dashboard/"):
+        user = auth_manager.get_current_user(request.cookies.get("session"))
+        if not user:
+            return RedirectResponse(url="/")
+        await ensure_dashboard(user)
+    return await call_next(request)
 
 @app.get("/dashboard")
 async def get_dashboard(session: Optional[str] = Cookie(None)):
-    global dash_initialized
     user = auth_manager.get_current_user(session)
     
     if not user:
         return RedirectResponse(url="/")
     
-    if not dash_initialized:
-        dashboard.initialize_with_credentials(user["username"], user["password"])
-        app.mount("/dashboard", WSGIMiddleware(dashboard.app.server))
-        dash_initialized = True
-    
+    await ensure_dashboard(user)
     return RedirectResponse(url="/dashboard/")
 
+@app.get("/api/nodes")
+async def get_nodes(session: Optional[str] = Cookie(None)):
+    user = auth_manager.get_current_user(session)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    await ensure_dashboard(user)
+    snapshot = dashboard.collector.get_snapshot() if dashboard.collector else None
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="No node data collected yet")
+    
+    return {
+        "version": snapshot.version,
+        "timestamp": snapshot.timestamp.isoformat(),
+        "clusters": snapshot.clusters,
+        "nodes": snapshot.node_data.to_dict(orient="records")
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Exposes this worker's metrics in the OpenMetrics text format."""
+    return Response(REGISTRY.expose(), media_type=OPENMETRICS_CONTENT_TYPE)
+
+def get_admin(session):
+    user = auth_manager.get_current_user(session)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if user["username"] not in ADMIN_USERS:
+        raise HTTPException(status_code=403, detail="Not an admin")
+    return user
+
+def check_same_origin(request):
+    """Rejects a form post that another site made the browser send (CSRF)."""
+    source = request.headers.get("origin") or request.headers.get("referer")
+    if not source or urlsplit(source).netloc != request.headers.get("host"):
+        raise HTTPException(status_code=403, detail="Cross-origin request refused")
+
+@app.get("/admin/profiles", response_class=HTMLResponse)
+async def list_profiles(session: Optional[str] = Cookie(None)):
+    """Lists the profiles of slow Dash callbacks."""
+    get_admin(session)
+    profiler = dashboard.profiler
+    return profiles_page(profiler.list_profiles(), profiler.enabled, profiler.threshold)
+
+@app.post("/admin/profiles/toggle")
+async def toggle_profiling(request: Request, session: Optional[str] = Cookie(None)):
+    """Switches callback profiling on or off in this worker."""
+    get_admin(session)
+    check_same_origin(request)
+    if dashboard.profiler.enabled:
+        dashboard.profiler.disable()
+    else:
+        dashboard.profiler.enable()
+    return RedirectResponse(url="/admin/profiles", status_code=303)
+
+@app.get("/admin/profiles/{profile_id}", response_class=HTMLResponse)
+async def show_profile(profile_id: str, session: Optional[str] = Cookie(None)):
+    """Shows one callback profile."""
+    get_admin(session)
+    profile = dashboard.profiler.load_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No such profile")
+    return profile_page(profile)
+
+@app.get("/events")
+async def node_events(request: Request, since: int = 0, session: Optional[str] = Cookie(None),
+                      last_event_id: Optional[str] = Header(None)):
+    """Streams the nodes that changed since version `since` as server-sent events."""
+    user = auth_manager.get_current_user(session)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    await ensure_dashboard(user)
+    if not dashboard.collector:
+        raise HTTPException(status_code=503, detail="No node data collected yet")
+    
+    # A reconnecting EventSource resumes from the last event it received.
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    
+    return StreamingResponse(
+        stream_node_events(request, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def stream_node_events(request: Request, version: int):
+    # Checking the collector's version is a lock and an integer compare, so
+    # polling it here is cheaper than parking a thread per open stream.
+    idle = 0
+    while not await request.is_disconnected():
+        snapshot = dashboard.collector.get_snapshot()
+        if snapshot is not None and snapshot.version != version:
+            # Diffing and encoding are CPU work, so they run off the event
+            # loop; the diff itself is computed once for all streams.
+            version, event = await run_in_threadpool(snapshot_event, version)
+            yield event
+            idle = 0
+        elif idle >= EVENTS_KEEPALIVE_INTERVAL:
+            yield ": keep-alive\n\n"
+            idle = 0
+        await asyncio.sleep(EVENTS_POLL_INTERVAL)
+        idle += EVENTS_POLL_INTERVAL
+
+def snapshot_event(since):
+    """Returns the new version and the server-sent event describing the changes since `since`."""
+    changes = dashboard.collector.get_changes(since)
+    return changes['version'], f"id: {changes['version']}\nevent: snapshot\ndata: {json.dumps(changes)}\n\n"
+
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8005)
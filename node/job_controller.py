@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from typing import NamedTuple
+import pandas as pd
+from node.node_parser import JOB_FIELDS, ACCOUNTING_FIELDS, SLURM_TIME_FORMAT, expand_hostlist
+from config.settings import SLURM_ACCOUNTING_COMMAND, JOB_ACCOUNTING_OVERLAP, JOB_HISTORY_RETENTION_HOURS
+
+
+class JobIndex(NamedTuple):
+    """A cluster's jobs as of one poll, indexed by node name."""
+    jobs: pd.DataFrame      # squeue rows: pending and running jobs
+    finished: pd.DataFrame  # sacct rows of jobs that ended within JOB_HISTORY_RETENTION_HOURS
+    running_by_node: dict   # node -> positions in jobs
+    finished_by_node: dict  # node -> positions in finished
+
+    def node_jobs(self, node_name):
+        """Returns (running, finished) job rows for one node, most recent finished first."""
+        running = self.jobs.iloc[self.running_by_node.get(node_name, [])]
+        finished = self.finished.iloc[self.finished_by_node.get(node_name, [])]
+        return running, finished.sort_values('End', ascending=False)
+
+
+class JobController:
+    """Tracks the jobs of one cluster from the squeue and sacct sections of each poll.
+
+    sacct is queried with a time cursor, so each poll only returns jobs that
+    finished since the previous query; slurmdbd never has to scan the whole
+    retention window again. The cursor only advances once a query's output
+    has been applied, so a failed poll is covered by the next one.
+
+    `index` is replaced as a whole on every update, so readers on other
+    threads always see a consistent JobIndex without locking.
+    """
+
+    def __init__(self, cluster=None, retention_hours=JOB_HISTORY_RETENTION_HOURS):
+        self.cluster = cluster
+        self.retention = timedelta(hours=retention_hours)
+        self._cursor = None
+        self._pending_cursor = None
+        self.index = JobIndex(pd.DataFrame(columns=['Cluster'] + JOB_FIELDS),
+                              pd.DataFrame(columns=['Cluster'] + ACCOUNTING_FIELDS), {}, {})
+
+    def accounting_command(self):
+        """Returns the sacct command for jobs that finished since the cursor."""
+        self._pending_cursor = datetime.now()
+        if self._cursor is None:
+            since = self._pending_cursor - self.retention
+        else:
+            since = self._cursor - timedelta(seconds=JOB_ACCOUNTING_OVERLAP)
+        return SLURM_ACCOUNTING_COMMAND.format(since=since.strftime(SLURM_TIME_FORMAT))
+
+    def update(self, jobs=None, finished=None):
+        """Applies a poll's parsed squeue (`jobs`) and sacct (`finished`) output.
+
+        Either may be None when its command failed; the previous jobs are
+        then kept, and the sacct cursor stays where it was.
+        """
+        index = self.index
+        if jobs is None:
+            jobs = index.jobs
+        if finished is None:
+            finished = index.finished
+        else:
+            self._cursor = self._pending_cursor
+            # The overlap returns some jobs twice; the newest record wins.
+            if not index.finished.empty:
+                finished = pd.concat([index.finished, finished], ignore_index=True)
+            finished = finished.drop_duplicates(subset='JobId', keep='last')
+        finished = finished[~(finished['End'] < datetime.now() - self.retention)].reset_index(drop=True)
+        jobs = jobs.reset_index(drop=True)
+        self.index = JobIndex(jobs, finished, self._by_node(jobs), self._by_node(finished))
+        return self.index
+
+    def node_jobs(self, node_name):
+        """Returns (running, finished) job rows for one node from the latest poll."""
+        return self.index.node_jobs(node_name)
+
+    def _by_node(self, jobs):
+        by_node = {}
+        expanded = {}
+        for position, hostlist in enumerate(jobs['NodeList'].tolist()):
+            if not hostlist:
+                continue
+            # Many jobs share a hostlist (e.g. single-node jobs on one node).
+            if hostlist not in expanded:
+                expanded[hostlist] = expand_hostlist(hostlist)
+            for node in expanded[hostlist]:
+                by_node.setdefault(node, []).append(position)
+        return by_node
@@ -0,0 +1,277 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import NamedTuple, Optional
+import pandas as pd
+from config.settings import (UPDATE_INTERVAL, SNAPSHOT_HISTORY_SIZE,
+                             CLUSTER_POLL_TIMEOUT, CLUSTER_POLL_CONCURRENCY)
+from node.snapshot_diff import SnapshotDiff, diff_snapshots, merge_diffs
+from utils.metrics import REGISTRY
+
+REFRESH_SECONDS = REGISTRY.histogram('collector_refresh_seconds', 'Time to poll every cluster and publish a snapshot')
+POLL_SECONDS = REGISTRY.histogram('cluster_poll_seconds', 'Time to poll one cluster', ['cluster'])
+POLL_FAILURES = REGISTRY.counter('cluster_poll_failures', 'Cluster polls that failed, timed out or were skipped',
+                                 ['cluster', 'reason'])
+SNAPSHOT_VERSION = REGISTRY.gauge('snapshot_version', 'Version of the latest published snapshot')
+CLUSTER_NODES = REGISTRY.gauge('cluster_nodes', 'Nodes in the latest snapshot', ['cluster'])
+REFRESH_FAILURES = REGISTRY.counter('collector_refresh_failures', 'Collection cycles that raised an unexpected error')
+LAST_REFRESH = REGISTRY.gauge('collector_last_refresh_timestamp_seconds',
+                              'Unix time of the last collection cycle that published a snapshot')
+
+
+class NodeSnapshot(NamedTuple):
+    """Immutable result of one collection cycle, shared by all readers."""
+    version: int
+    timestamp: datetime
+    node_data: pd.DataFrame
+    changes: Optional[SnapshotDiff] = None  # against the previous poll, within DIFF_TOLERANCES
+    clusters: Optional[dict] = None  # per-cluster poll status
+    # Collected by the "batch" ingest mode only
+    partitions: Optional[pd.DataFrame] = None
+    jobs: Optional[pd.DataFrame] = None
+    scheduler: Optional[dict] = None  # cluster -> sdiag counters
+
+    def get_node(self, node_name, cluster=None):
+        """Returns the row for a specific node, or None if it is unknown."""
+        matches = self.node_data['NodeName'] == node_name
+        if cluster is not None:
+            matches &= self.node_data['Cluster'] == cluster
+        node_data = self.node_data[matches]
+        return node_data.iloc[0] if not node_data.empty else None
+
+    def cluster_data(self, cluster, table='node_data'):
+        """Returns the rows of one cluster from `table` ('node_data',
+        'partitions' or 'jobs'), or None if that table was not collected."""
+        data = getattr(self, table)
+        if data is None:
+            return None
+        return data[data['Cluster'] == cluster]
+
+
+class NodeCollector:
+    """Polls the clusters on a fixed interval and publishes versioned snapshots.
+
+    Dashboard callbacks, the report button and API endpoints read the latest
+    snapshot instead of going over SSH themselves, so each login node sees
+    exactly one poll per interval no matter how many tabs are open. The last
+    few snapshots are kept so readers can work out what changed since the
+    version they last saw.
+
+    Clusters are polled concurrently, at most `max_concurrency` at a time
+    and each within `timeout` seconds, so a poll takes as long as the
+    slowest cluster rather than the sum of all of them. A cluster that
+    fails or times out keeps its last good rows in the snapshot, and is not
+    polled again while its previous poll is still stuck.
+    """
+
+    def __init__(self, node_controllers, interval=UPDATE_INTERVAL / 1000,
+                 timeout=CLUSTER_POLL_TIMEOUT, max_concurrency=CLUSTER_POLL_CONCURRENCY):
+        if not isinstance(node_controllers, dict):
+            node_controllers = {node_controllers.cluster: node_controllers}
+        self.node_controllers = node_controllers
+        self.interval = interval
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        # One thread per cluster: a stuck SSH call cannot be cancelled, so it
+        # must not hold up a worker another cluster needs.
+        self._executor = ThreadPoolExecutor(max_workers=len(node_controllers),
+                                            thread_name_prefix="cluster-poll")
+        self._polls = {}
+        self._cluster_data = {}
+        self._cluster_info = {}
+        self._cluster_status = {}
+        self._snapshot = None
+        self._recent = deque(maxlen=SNAPSHOT_HISTORY_SIZE)
+        # (since_version, version) -> get_changes result, shared by all streams
+        self._changes = OrderedDict()
+        self._changes_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Takes a first snapshot synchronously, then polls in the background."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        # The first poll also runs on the collector thread: refresh() starts
+        # its own event loop, which cannot nest in a caller's (e.g. FastAPI's).
+        first_poll = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(first_poll,), name="node-collector", daemon=True)
+        self._thread.start()
+        first_poll.wait()
+
+    def stop(self):
+        """Stops the background poller."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def refresh(self) -> Optional[NodeSnapshot]:
+        """Polls every cluster once and publishes the result as a new snapshot."""
+        with REFRESH_SECONDS.time():
+            return self._refresh()
+
+    def _refresh(self):
+        results = asyncio.run(self._poll_clusters())
+        diffs = []
+        for cluster, result in results.items():
+            if result is not None:
+                self._cluster_data[cluster], _, changes, info = result
+                self._cluster_info[cluster] = info or {}
+                diffs.append(changes)
+        if not diffs:
+            return None
+
+        clusters = [cluster for cluster in self.node_controllers if cluster in self._cluster_data]
+        current_data = pd.concat([self._cluster_data[cluster] for cluster in clusters], ignore_index=True)
+        infos = {cluster: self._cluster_info[cluster] for cluster in clusters}
+        scheduler = {cluster: info['scheduler'] for cluster, info in infos.items()
+                     if info.get('scheduler') is not None}
+        with self._condition:
+            version = self._snapshot.version + 1 if self._snapshot else 1
+            snapshot = self._snapshot = NodeSnapshot(
+                version, datetime.now(), current_data, merge_diffs(diffs),
+                {cluster: dict(status) for cluster, status in self._cluster_status.items()},
+                self._combine(info.get('partitions') for info in infos.values()),
+                self._combine(info.get('jobs') for info in infos.values()),
+                scheduler or None
+            )
+            self._recent.append(snapshot)
+            self._condition.notify_all()
+        SNAPSHOT_VERSION.set(version)
+        for cluster, count in current_data['Cluster'].value_counts().items():
+            CLUSTER_NODES.set(count, cluster=cluster)
+        return snapshot
+
+    def get_snapshot(self, timeout=None) -> Optional[NodeSnapshot]:
+        """Returns the latest snapshot, waiting up to `timeout` seconds for the first one."""
+        with self._condition:
+            if self._snapshot is None and timeout:
+                self._condition.wait_for(lambda: self._snapshot is not None, timeout)
+            return self._snapshot
+
+    def get_snapshot_version(self, version) -> Optional[NodeSnapshot]:
+        """Returns a recent snapshot by version, or None once it has been dropped."""
+        with self._condition:
+            for snapshot in self._recent:
+                if snapshot.version == version:
+                    return snapshot
+            return None
+
+    def get_changes(self, since_version):
+        """Describes the latest snapshot relative to version `since_version`.
+
+        Returns a JSON-ready dict with the new version, the rows whose
+        metrics or state changed and the cluster state counts. `resync` is
+        set instead when the old version is gone or nodes were added or
+        removed, in which case the reader should fetch the whole snapshot.
+
+        Results are cached per (since_version, version), so every stream
+        waiting on the same versions shares one diff.
+        """
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return None
+        key = (since_version, snapshot.version)
+        # Held while computing, so concurrent callers wait for the first
+        # one's result instead of repeating the diff.
+        with self._changes_lock:
+            changes = self._changes.get(key)
+            if changes is None:
+                changes = self._changes[key] = self._compute_changes(snapshot, since_version)
+                while len(self._changes) > SNAPSHOT_HISTORY_SIZE:
+                    self._changes.popitem(last=False)
+            return changes
+
+    def _compute_changes(self, snapshot, since_version):
+        previous = self.get_snapshot_version(since_version)
+        diff = None
+        if previous is not None:
+            # Readers apply changes on top of each other, so this diff is
+            # exact: drift within the per-tick tolerances would accumulate.
+            diff = diff_snapshots(previous.node_data, snapshot.node_data, {})
+        resync = diff is None or not diff.added.empty or not diff.removed.empty
+        changes = {
+            'version': snapshot.version,
+            'since': since_version,
+            'timestamp': snapshot.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+            'resync': resync,
+            'nodes': []
+        }
+        if not resync:
+            changes['nodes'] = diff.changed.to_dict(orient='records')
+            changes['states'] = {}
+            for cluster, cluster_data in snapshot.node_data.groupby('Cluster', sort=False):
+                state_counts = cluster_data['State'].astype(str).value_counts()
+                changes['states'][cluster] = {'labels': state_counts.index.tolist(),
+                                              'values': state_counts.tolist()}
+        return changes
+
+    def _combine(self, frames):
+        # Clusters that did not collect a table are skipped; None if none did.
+        frames = [frame for frame in frames if frame is not None]
+        return pd.concat(frames, ignore_index=True) if frames else None
+
+    async def _poll_clusters(self):
+        """Runs update_node_data on every cluster concurrently; failed clusters map to None."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        loop = asyncio.get_running_loop()
+
+        async def poll(cluster, node_controller):
+            previous = self._polls.get(cluster)
+            if previous is not None and not previous.done():
+                print(f"Skipping {cluster}: its previous poll is still running")
+                POLL_FAILURES.inc(cluster=cluster, reason='busy')
+                return None
+            async with semaphore:
+                started = time.monotonic()
+                future = self._polls[cluster] = self._executor.submit(node_controller.update_node_data)
+                try:
+                    result = await asyncio.wait_for(asyncio.wrap_future(future, loop=loop), self.timeout)
+                    error = None
+                except asyncio.TimeoutError:
+                    result, error = None, f"timed out after {self.timeout}s"
+                    POLL_FAILURES.inc(cluster=cluster, reason='timeout')
+                except Exception as e:
+                    result, error = None, str(e)
+                    POLL_FAILURES.inc(cluster=cluster, reason='error')
+                if error:
+                    print(f"Error collecting node data from {cluster}: {error}")
+                POLL_SECONDS.observe(time.monotonic() - started, cluster=cluster)
+                self._cluster_status[cluster] = {
+                    'ok': error is None,
+                    'error': error,
+                    'seconds': round(time.monotonic() - started, 3),
+                    'updated': datetime.now().isoformat() if error is None
+                               else self._cluster_status.get(cluster, {}).get('updated')
+                }
+                return result
+
+        results = await asyncio.gather(*(
+            poll(cluster, node_controller) for cluster, node_controller in self.node_controllers.items()
+        ))
+        return dict(zip(self.node_controllers, results))
+
+    def _run(self, first_poll):
+        try:
+            self._refresh_safely()
+        finally:
+            first_poll.set()
+        while not self._stop_event.wait(self.interval):
+            self._refresh_safely()
+
+    def _refresh_safely(self):
+        # An unexpected error (e.g. odd Slurm output) must not end the
+        # thread: readers would be served a frozen snapshot for good.
+        # Failures are counted, and LAST_REFRESH shows how stale the data is.
+        try:
+            if self.refresh() is not None:
+                LAST_REFRESH.set(time.time())
+        except Exception as e:
+            print(f"Error refreshing node data: {e}")
+            REFRESH_FAILURES.inc()
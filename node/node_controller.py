@@ -1,40 +1,160 @@
+import os
+from contextlib import closing
+import paramiko
+from datetime import datetime, timedelta
 from utils.ssh_client import SSHClient
 from node.node_parser import NodeParser
+from node.job_controller import JobController
 from data.data_manager import DataManager
-import pandas as pd
+from data.ring_buffer import MetricRingBuffer
+from node.snapshot_diff import diff_snapshots
+from utils.metrics import REGISTRY
+from config.settings import SLURM_INGEST_MODE, SLURM_BATCH_COMMANDS, REPORT_PERIODS, CLUSTERS, HISTORY_DIR
+
+PARSE_SECONDS = REGISTRY.histogram('parse_seconds', 'Time to parse Slurm command output',
+                                   ['cluster', 'section'])
+PARSE_ROWS = REGISTRY.counter('parse_rows', 'Rows parsed from Slurm command output', ['cluster', 'section'])
+COMMAND_FAILURES = REGISTRY.counter('slurm_command_failures', 'Slurm commands that failed in a batch poll',
+                                    ['cluster', 'section'])
 
 class NodeController:
-    def __init__(self, username=None, password=None):
+    def __init__(self, username=None, password=None, cluster=None):
         self.username = username
         self.password = password
-        self.ssh_client = SSHClient()
+        self.cluster = cluster or next(iter(CLUSTERS))
+        self.ssh_client = SSHClient(CLUSTERS[self.cluster])
         self.node_parser = NodeParser()
-        self.data_manager = DataManager()
+        # The first cluster keeps the original history directory, so a
+        # single-cluster setup reads the history it already has.
+        is_first = self.cluster == next(iter(CLUSTERS))
+        self.data_manager = DataManager(
+            history_dir=HISTORY_DIR if is_first else os.path.join(HISTORY_DIR, self.cluster),
+            cluster=self.cluster,
+            import_legacy=is_first
+        )
+        self.job_controller = JobController(self.cluster)
+        self.ring_buffer = MetricRingBuffer()
+        self.ring_buffer.warm_start(self.data_manager.load_history())
+        self.ingest_mode = SLURM_INGEST_MODE
+        self._json_supported = None
+        self._last_data = None
     
-    def get_current_node_data(self):
-        """Fetches and processes current node data."""
+    def get_cluster_data(self):
+        """Fetches current node data along with the cluster's partitions, jobs
+        and scheduler stats.
+
+        Returns (node_data, cluster_info). cluster_info is None unless the
+        ingest mode is "batch"; see get_batch_data.
+        """
+        if self.ingest_mode == "batch":
+            return self.get_batch_data()
+        if self.ingest_mode != "text" and self._json_supported is not False:
+            try:
+                # Parsing consumes the stream, so this includes reading it over
+                # SSH. Closing it checks scontrol's exit status.
+                with closing(self.ssh_client.stream_node_info_json(self.username, self.password)) as stream:
+                    node_data = self._parse('nodes-json', self.node_parser.parse_slurm_json, stream, self.cluster)
+                self._json_supported = True
+                return node_data, None
+            except (paramiko.SSHException, OSError) as e:
+                raise Exception(f"Failed to fetch node data: {e}")
+            except Exception as e:
+                if self.ingest_mode == "json":
+                    raise Exception(f"Failed to fetch node data: {e}")
+                print(f"JSON node output unavailable, using text output: {e}")
+                if self._json_supported is None:
+                    self._json_supported = False
+
         slurm_output = self.ssh_client.get_node_info(self.username, self.password)
         if not slurm_output:
             raise Exception("Failed to fetch node data")
-        return self.node_parser.parse_slurm_output(slurm_output)
+        return self._parse('nodes', self.node_parser.parse_slurm_output, slurm_output, self.cluster), None
+    
+    def get_batch_data(self):
+        """Runs SLURM_BATCH_COMMANDS in one SSH round trip and parses each section.
+
+        Returns (node_data, cluster_info), where cluster_info holds the
+        'partitions' and 'jobs' DataFrames and the 'scheduler' stats dict.
+        Only the node section is required; any other section that failed is
+        reported and left as None. Jobs that finished since the previous
+        poll are fetched in the same script and passed to the job controller.
+        """
+        commands = dict(SLURM_BATCH_COMMANDS, accounting=self.job_controller.accounting_command())
+        try:
+            sections = self.ssh_client.run_batch(commands, self.username, self.password)
+        except (paramiko.SSHException, OSError) as e:
+            raise Exception(f"Failed to fetch node data: {e}")
+
+        parsers = {
+            'nodes': lambda output: self.node_parser.parse_slurm_output(output, self.cluster),
+            'partitions': lambda output: self.node_parser.parse_sinfo(output, self.cluster),
+            'jobs': lambda output: self.node_parser.parse_squeue(output, self.cluster),
+            'scheduler': self.node_parser.parse_sdiag,
+            'accounting': lambda output: self.node_parser.parse_sacct(output, self.cluster)
+        }
+        results = {}
+        for name, (status, output, error) in sections.items():
+            results[name] = None
+            if status != 0:
+                print(f"'{commands[name].split()[0]}' failed on {self.cluster} (status {status}): {error}")
+                COMMAND_FAILURES.inc(cluster=self.cluster, section=name)
+            elif name in parsers:
+                results[name] = self._parse(name, parsers[name], output)
+        node_data = results.pop('nodes', None)
+        if node_data is None:
+            raise Exception("Failed to fetch node data")
+        self.job_controller.update(results.get('jobs'), results.pop('accounting', None))
+        return node_data, results
+    
+    def _parse(self, section, parser, *args):
+        """Runs a parser, recording its latency and how many rows it produced."""
+        with PARSE_SECONDS.time(cluster=self.cluster, section=section):
+            result = parser(*args)
+        PARSE_ROWS.inc(len(result), cluster=self.cluster, section=section)
+        return result
     
     def update_node_data(self):
-        """Updates node data and returns both current and historical data."""
-        current_data = self.get_current_node_data()
+        """Updates node data.
+
+        Returns the current data, the history rows appended, a SnapshotDiff
+        against the previous update and the cluster info from
+        get_cluster_data.
+        """
+        current_data, cluster_info = self.get_cluster_data()
         historical_data = self.data_manager.update_historical_data(current_data)
-        return current_data, historical_data
+        if not historical_data.empty:
+            self.ring_buffer.append(historical_data)
+        changes = diff_snapshots(self._last_data, current_data)
+        self._last_data = current_data
+        return current_data, historical_data, changes, cluster_info
     
     def get_node_history(self, node_name):
         """Retrieves historical data for a specific node."""
-        try:
-            historical_data = pd.read_csv('historical_data.csv')
-            historical_data['timestamp'] = pd.to_datetime(historical_data['timestamp'])
-            return historical_data[historical_data['NodeName'] == node_name].copy()
-        except FileNotFoundError:
-            return pd.DataFrame()
-    
-    def get_node_current_state(self, node_name):
-        """Gets current state for a specific node."""
-        current_data = self.get_current_node_data()
-        node_data = current_data[current_data['NodeName'] == node_name]
-        return node_data.iloc[0] if not node_data.empty else None
\ No newline at end of file
+        node_history = self.ring_buffer.node_history(node_name)
+        if node_history.empty:
+            return self.data_manager.load_node_history(node_name)
+        node_history['Cluster'] = self.cluster
+        return node_history
+    
+    def get_cpu_heatmap(self, max_rows, max_columns):
+        """Returns the buffered CPU load of the whole cluster binned for a heatmap; see
+        MetricRingBuffer.binned_cpu_load."""
+        return self.ring_buffer.binned_cpu_load(max_rows, max_columns)
+    
+    def get_node_jobs(self, node_name):
+        """Returns (running, finished) jobs on a node as of the last poll, without going over SSH."""
+        return self.job_controller.node_jobs(node_name)
+    
+    def get_node_rollups(self, node_name, tier='daily', since=None):
+        """Retrieves precomputed hourly or daily aggregates for a specific node."""
+        return self.data_manager.load_node_rollups(node_name, tier, since)
+    
+    def get_period_summary(self, period):
+        """Aggregates the stored history over a report period ('daily' or 'weekly').
+
+        Returns (since, until, nodes, cluster) as described by HistoryIndex.query_period.
+        """
+        until = datetime.now()
+        since = until - timedelta(days=REPORT_PERIODS[period])
+        nodes, cluster = self.data_manager.load_period_summary(since, until)
+        return since, until, nodes, cluster
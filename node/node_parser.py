@@ -1,36 +1,278 @@
+import json
 import re
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+# scontrol key -> DataFrame column
+FIELD_COLUMNS = {
+    'NodeName': 'NodeName',
+    'CPULoad': 'CPULoad',
+    'RealMemory': 'RealMemory',
+    'FreeMem': 'FreeMem',
+    'State': 'State',
+    'CPUAlloc': 'CPUAlloc',
+    'CPUTot': 'CPUTot',
+    'CPUEfctv': 'CPUEfctv',
+    'AllocMem': 'AllocMem',
+    'Gres': 'Gres',
+    'Partitions': 'Partitions',
+    'AvailableFeatures': 'Features',
+    'Features': 'Features',
+    'Reason': 'Reason',
+    'BootTime': 'BootTime',
+    'LastBusyTime': 'LastBusyTime'
+}
+
+# One pass over the text picks out only the keys we keep. Every key is
+# preceded by a space (see parse_slurm_output), which lets the regex engine
+# skip ahead on a literal; values run to the next whitespace, except Reason,
+# which may contain spaces and runs until the next key or the end of the line.
+FIELD_PATTERN = re.compile(
+    r' (?:(' + '|'.join(key for key in FIELD_COLUMNS if key != 'Reason') + r')=(\S*)'
+    r'|Reason=(.*?)(?= [A-Za-z][\w:.]*=|$))',
+    re.M
+)
+
+INTEGER_COLUMNS = ['RealMemory', 'FreeMem', 'CPUAlloc', 'CPUTot', 'CPUEfctv', 'AllocMem']
+TEXT_COLUMNS = ['Gres', 'Partitions', 'Features', 'Reason']
+TIME_COLUMNS = ['BootTime', 'LastBusyTime']
+SLURM_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+# `scontrol show node --json` field -> DataFrame column
+JSON_FIELD_COLUMNS = {
+    'name': 'NodeName',
+    'real_memory': 'RealMemory',
+    'free_mem': 'FreeMem',
+    'alloc_cpus': 'CPUAlloc',
+    'cpus': 'CPUTot',
+    'effective_cpus': 'CPUEfctv',
+    'alloc_memory': 'AllocMem'
+}
+
+# `sinfo --format='%R|%a|%D|%C'` and `squeue --format='%i|%u|%P|%T|%M|%D|%N'`
+# fields (see SLURM_BATCH_COMMANDS)
+PARTITION_FIELDS = ['Partition', 'Available', 'Nodes', 'CPUs']
+JOB_FIELDS = ['JobId', 'User', 'Partition', 'State', 'Elapsed', 'Nodes', 'NodeList']
+# `sacct --format=JobID,User,Partition,State,Start,End,Elapsed,NodeList,ExitCode` fields
+ACCOUNTING_FIELDS = ['JobId', 'User', 'Partition', 'State', 'Start', 'End', 'Elapsed', 'NodeList', 'ExitCode']
+CPU_STATE_COLUMNS = ['CPUsAllocated', 'CPUsIdle', 'CPUsOther', 'CPUsTotal']
+# sdiag sections whose counters get a prefix, as their names repeat
+SDIAG_SECTIONS = {'Main schedule statistics': 'Main', 'Backfilling stats': 'Backfill'}
+
+def expand_hostlist(hostlist):
+    """Expands a Slurm hostlist such as 'node[001-003,007],gpu01' into node names.
+
+    Zero padding in ranges is kept, and several bracket groups in one name
+    (e.g. 'rack[1-2]-node[01-02]') expand to their product.
+    """
+    names = []
+    for item in re.findall(r'(?:[^,\[]|\[[^\]]*\])+', hostlist or ''):
+        match = re.search(r'\[([^\]]*)\]', item)
+        if match is None:
+            names.append(item)
+            continue
+        prefix, suffix = item[:match.start()], item[match.end():]
+        for part in match.group(1).split(','):
+            first, _, last = part.partition('-')
+            values = ([str(i).zfill(len(first)) for i in range(int(first), int(last) + 1)]
+                      if last else [first])
+            for value in values:
+                names.extend(expand_hostlist(prefix + value + suffix))
+    return names
+
+def iter_json_array(chunks, key):
+    """Yields the elements of the top-level `key` array from streamed JSON text.
+
+    Elements are decoded one at a time as soon as they are complete, so the
+    document is never held in memory as a whole.
+    """
+    decoder = json.JSONDecoder()
+    array_start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    chunks = iter(chunks)
+    buffer = ''
+
+    while (match := array_start.search(buffer)) is None:
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError(f"No '{key}' array in JSON output")
+        buffer = buffer[-len(key) - 16:] + chunk
+
+    position = match.end()
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position < len(buffer):
+            if buffer[position] == ']':
+                return
+            try:
+                element, position = decoder.raw_decode(buffer, position)
+                yield element
+                continue
+            except json.JSONDecodeError:
+                pass
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError(f"Truncated '{key}' array in JSON output")
+        buffer = buffer[position:] + chunk
+        position = 0
+
+def _json_number(value):
+    """Unwraps Slurm's {"set": ..., "infinite": ..., "number": ...} integers."""
+    if isinstance(value, dict):
+        return value.get('number') if value.get('set') else None
+    return value
+
+def _json_list(value):
+    if isinstance(value, list):
+        return ','.join(value) or None
+    return value or None
+
+def _json_time(value):
+    seconds = _json_number(value)
+    if not seconds:
+        return None
+    return datetime.fromtimestamp(seconds).strftime(SLURM_TIME_FORMAT)
+
 class NodeParser:
     @staticmethod
-    def parse_slurm_output(output):
-        """Parses the SLURM output and returns a pandas DataFrame."""
-        nodes = []
-        node_blocks = output.strip().split("\n\n")
-        timestamp = datetime.now()
-        
-        for block in node_blocks:
-            node = {
-                'timestamp': timestamp,
-                'CPULoad': 0.0,
-                'RealMemory': 0,
-                'FreeMem': 0,
-                'State': 'UNKNOWN'
-            }
-            for line in block.split("\n"):
-                if match := re.search(r"NodeName=(\S+)", line):
-                    node["NodeName"] = match.group(1)
-                if match := re.search(r"CPULoad=(\S+)", line):
-                    node["CPULoad"] = float(match.group(1))
-                if match := re.search(r"RealMemory=(\S+)", line):
-                    node["RealMemory"] = int(match.group(1))
-                if match := re.search(r"FreeMem=(\S+)", line):
-                    if match.group(1) == 'N/A':
-                        node["FreeMem"] = 0
-                    else:
-                        node["FreeMem"] = int(match.group(1))
-                if match := re.search(r"State=(\S+)", line):
-                    node["State"] = match.group(1)
-            nodes.append(node)
-        return pd.DataFrame(nodes)
\ No newline at end of file
+    def parse_slurm_output(output, cluster=None):
+        """Parses the SLURM output and returns a pandas DataFrame.
+
+        Accepts both the multi-line and the `--oneliner` form of
+        `scontrol show node`. The text is tokenized in a single pass into
+        per-column lists, and the DataFrame is built once at the end. Every
+        row is labelled with `cluster` in the Cluster column.
+        """
+        text = ' ' + output.replace('\nNodeName=', '\n NodeName=')
+        row_count = text.count(' NodeName=')
+        columns = {name: [None] * row_count for name in dict.fromkeys(FIELD_COLUMNS.values())}
+
+        row = -1
+        for key, value, reason in FIELD_PATTERN.findall(text):
+            if key == 'NodeName':
+                row += 1
+            elif row < 0:
+                continue
+            if not key:
+                key, value = 'Reason', reason.strip()
+            columns[FIELD_COLUMNS[key]][row] = value
+
+        return NodeParser._build_frame(columns, row_count, datetime.now(), cluster)
+
+    @staticmethod
+    def parse_slurm_json(chunks, cluster=None):
+        """Parses streamed `scontrol show node --json` output into the same DataFrame
+        schema as parse_slurm_output, decoding one node at a time."""
+        columns = {name: [] for name in dict.fromkeys(FIELD_COLUMNS.values())}
+        for node in iter_json_array(chunks, 'nodes'):
+            for field, column in JSON_FIELD_COLUMNS.items():
+                columns[column].append(_json_number(node.get(field)))
+            # cpu_load is reported in hundredths
+            cpu_load = _json_number(node.get('cpu_load'))
+            columns['CPULoad'].append(cpu_load / 100 if cpu_load is not None else None)
+            state = node.get('state')
+            columns['State'].append('+'.join(state) if isinstance(state, list) else (state or '').upper() or None)
+            columns['Gres'].append(_json_list(node.get('gres')))
+            columns['Partitions'].append(_json_list(node.get('partitions')))
+            columns['Features'].append(_json_list(node.get('features')))
+            columns['Reason'].append(node.get('reason') or None)
+            columns['BootTime'].append(_json_time(node.get('boot_time')))
+            columns['LastBusyTime'].append(_json_time(node.get('last_busy')))
+
+        return NodeParser._build_frame(columns, len(columns['NodeName']), datetime.now(), cluster)
+
+    @staticmethod
+    def parse_sinfo(output, cluster=None):
+        """Parses `sinfo` partition output into one row per partition.
+
+        sinfo may split a partition over several lines; their node and CPU
+        counts are summed.
+        """
+        partitions = NodeParser._split_fields(output, PARTITION_FIELDS)
+        cpus = partitions.pop('CPUs').str.split('/', expand=True).reindex(columns=range(4))
+        for i, column in enumerate(CPU_STATE_COLUMNS):
+            partitions[column] = NodeParser._to_number(cpus[i].tolist(), 'int64')
+        partitions['Nodes'] = NodeParser._to_number(partitions['Nodes'].tolist(), 'int64')
+        partitions = partitions.groupby('Partition', sort=False).agg(
+            {'Available': 'first', 'Nodes': 'sum', **{column: 'sum' for column in CPU_STATE_COLUMNS}}
+        ).reset_index()
+        partitions.insert(0, 'Cluster', cluster)
+        return partitions
+
+    @staticmethod
+    def parse_squeue(output, cluster=None):
+        """Parses `squeue` output into one row per job."""
+        jobs = NodeParser._split_fields(output, JOB_FIELDS)
+        jobs['Nodes'] = NodeParser._to_number(jobs['Nodes'].tolist(), 'int64')
+        jobs['State'] = pd.Categorical(jobs['State'])
+        jobs['NodeList'] = jobs['NodeList'].replace('', None)
+        jobs.insert(0, 'Cluster', cluster)
+        return jobs
+
+    @staticmethod
+    def parse_sacct(output, cluster=None):
+        """Parses `sacct --parsable2` output into one row per job allocation."""
+        jobs = NodeParser._split_fields(output, ACCOUNTING_FIELDS)
+        # e.g. 'CANCELLED by 1234'
+        jobs['State'] = jobs['State'].str.split(' ', n=1).str[0]
+        for column in ['Start', 'End']:
+            jobs[column] = pd.to_datetime(jobs[column], format=SLURM_TIME_FORMAT, errors='coerce')
+        jobs['NodeList'] = jobs['NodeList'].replace({'': None, 'None assigned': None})
+        jobs.insert(0, 'Cluster', cluster)
+        return jobs
+
+    @staticmethod
+    def parse_sdiag(output):
+        """Parses `sdiag` output into a dict of its integer counters.
+
+        Counters in the main and backfill scheduler sections are prefixed
+        with 'Main ' and 'Backfill ' (e.g. 'Main Last cycle').
+        """
+        stats = {}
+        prefix = ''
+        for line in output.splitlines():
+            key, _, value = line.partition(':')
+            key, value = key.strip(), value.strip()
+            if not line[:1].isspace():
+                prefix = next((name for section, name in SDIAG_SECTIONS.items()
+                               if key.startswith(section)), '')
+            if value.lstrip('-').isdigit():
+                stats[f"{prefix} {key}" if prefix and line[:1].isspace() else key] = int(value)
+        return stats
+
+    @staticmethod
+    def _split_fields(output, fields):
+        rows = [line.split('|', len(fields) - 1) for line in output.splitlines() if line.strip()]
+        return pd.DataFrame([row + [''] * (len(fields) - len(row)) for row in rows],
+                            columns=fields, dtype=object)
+
+    @staticmethod
+    def _build_frame(columns, row_count, timestamp, cluster=None):
+        data = {
+            'timestamp': np.full(row_count, np.datetime64(timestamp, 'ns')),
+            'CPULoad': NodeParser._to_number(columns['CPULoad'], 'float64'),
+            'RealMemory': NodeParser._to_number(columns['RealMemory'], 'int64'),
+            'FreeMem': NodeParser._to_number(columns['FreeMem'], 'int64'),
+            'State': pd.Categorical([state or 'UNKNOWN' for state in columns['State']]),
+            'NodeName': np.array(columns['NodeName'], dtype=object),
+            'Cluster': np.full(row_count, cluster, dtype=object)
+        }
+        for column in INTEGER_COLUMNS:
+            if column not in data:
+                data[column] = NodeParser._to_number(columns[column], 'int64')
+        for column in TEXT_COLUMNS:
+            data[column] = np.array([None if value == '(null)' else value
+                                     for value in columns[column]], dtype=object)
+        for column in TIME_COLUMNS:
+            data[column] = pd.to_datetime(columns[column], format=SLURM_TIME_FORMAT, errors='coerce')
+
+        # Older Slurm releases do not report CPUEfctv; it equals CPUTot there.
+        data['CPUEfctv'] = np.where(data['CPUEfctv'] > 0, data['CPUEfctv'], data['CPUTot'])
+        return pd.DataFrame(data)
+
+    @staticmethod
+    def _to_number(values, dtype):
+        # N/A (e.g. FreeMem or CPULoad on a down node) becomes 0, as it always has.
+        numbers = pd.to_numeric(np.array(values, dtype=object), errors='coerce')
+        return np.nan_to_num(numbers, nan=0).astype(dtype)
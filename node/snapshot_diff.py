@@ -0,0 +1,85 @@
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from config.settings import DIFF_TOLERANCES
+
+# Nodes are matched on these columns; names are only unique within a cluster.
+KEY_COLUMNS = ['Cluster', 'NodeName']
+METRIC_COLUMNS = ['CPULoad', 'RealMemory', 'FreeMem']
+# Columns compared between snapshots and carried in change records
+DIFF_COLUMNS = KEY_COLUMNS + METRIC_COLUMNS + ['State']
+
+
+class SnapshotDiff(NamedTuple):
+    """What changed between two consecutive node snapshots."""
+    added: pd.DataFrame        # DIFF_COLUMNS rows of nodes that appeared
+    removed: pd.DataFrame      # KEY_COLUMNS of nodes that disappeared
+    changed: pd.DataFrame      # current DIFF_COLUMNS rows (plus <metric>_delta) of nodes that changed
+    transitions: pd.DataFrame  # KEY_COLUMNS, previous_state, State for state changes
+
+    @property
+    def empty(self):
+        return self.added.empty and self.removed.empty and self.changed.empty
+
+    def records(self):
+        """Returns the diff as a list of small JSON-ready change records."""
+        records = [{'event': 'added', **row} for row in self.added.to_dict(orient='records')]
+        records += [{'event': 'removed', **row} for row in self.removed.to_dict(orient='records')]
+        records += [{'event': 'state', **row} for row in self.transitions.to_dict(orient='records')]
+        records += [{'event': 'metrics', **row} for row in self.changed.to_dict(orient='records')]
+        return records
+
+
+def diff_snapshots(previous, current, tolerances=DIFF_TOLERANCES):
+    """Compares two node DataFrames, matching nodes by cluster and name.
+
+    A node counts as changed when its State differs or a metric moved by
+    more than its entry in `tolerances` (metrics not listed must match
+    exactly, so an empty dict gives an exact diff).
+    """
+    current = _normalise(current)
+    if previous is None:
+        previous = current.iloc[:0]
+    else:
+        previous = _normalise(previous)
+
+    previous_keys = pd.MultiIndex.from_frame(previous[KEY_COLUMNS])
+    current_keys = pd.MultiIndex.from_frame(current[KEY_COLUMNS])
+    positions = previous_keys.get_indexer(current_keys)
+    present = positions >= 0
+    added = current[~present]
+    removed = previous.loc[~previous_keys.isin(current_keys), KEY_COLUMNS]
+
+    before = previous.iloc[positions[present]]
+    after = current[present]
+    previous_states = before['State'].to_numpy()
+    states = after['State'].to_numpy()
+    state_changed = previous_states != states
+    changed = state_changed.copy()
+    deltas = {}
+    for column in METRIC_COLUMNS:
+        deltas[f"{column}_delta"] = after[column].to_numpy(dtype=float) - before[column].to_numpy(dtype=float)
+        changed |= np.abs(deltas[f"{column}_delta"]) > tolerances.get(column, 0)
+
+    transitions = after.loc[state_changed, KEY_COLUMNS].assign(
+        previous_state=previous_states[state_changed], State=states[state_changed])
+    changed_rows = after[changed].assign(**{name: delta[changed] for name, delta in deltas.items()})
+    return SnapshotDiff(added.reset_index(drop=True), removed.reset_index(drop=True),
+                        changed_rows.reset_index(drop=True), transitions.reset_index(drop=True))
+
+
+def merge_diffs(diffs):
+    """Combines the diffs of separate clusters into one SnapshotDiff."""
+    return SnapshotDiff(*(
+        pd.concat([getattr(diff, field) for diff in diffs], ignore_index=True)
+        for field in SnapshotDiff._fields
+    ))
+
+
+def _normalise(node_data):
+    # Categorical State columns from different snapshots have different
+    # categories and cannot be compared directly. Frames without a Cluster
+    # column (e.g. from older callers) count as one unnamed cluster.
+    if 'Cluster' not in node_data:
+        node_data = node_data.assign(Cluster='')
+    return node_data[DIFF_COLUMNS].astype({'State': str, 'NodeName': str}).fillna({'Cluster': ''})
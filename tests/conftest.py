@@ -0,0 +1,32 @@
+import os
+import sys
+from datetime import datetime, timedelta
+import pandas as pd
+import pytest
+
+# The project is a set of top-level packages run from the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_snapshot(timestamp, nodes, cluster='test'):
+    """Builds a node snapshot from {NodeName: (CPULoad, FreeMem, State)}."""
+    return pd.DataFrame({
+        'Cluster': cluster,
+        'NodeName': list(nodes),
+        'CPULoad': [values[0] for values in nodes.values()],
+        'RealMemory': 1000,
+        'FreeMem': [values[1] for values in nodes.values()],
+        'State': [values[2] for values in nodes.values()],
+        'timestamp': pd.Timestamp(timestamp)
+    })
+
+
+@pytest.fixture
+def now():
+    # Whole minutes, so samples fall in predictable rollup buckets
+    return datetime.now().replace(second=0, microsecond=0)
+
+
+@pytest.fixture
+def hours_ago(now):
+    return lambda hours: now - timedelta(hours=hours)
@@ -0,0 +1,98 @@
+import threading
+import time
+import pytest
+from auth import credential_cache
+from auth.credential_cache import CredentialCache
+
+
+class Check:
+    """A credential check that accepts `password` and counts its calls."""
+
+    def __init__(self, password='right', delay=0):
+        self.password = password
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, username, password):
+        self.calls += 1
+        time.sleep(self.delay)
+        return password == self.password
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = {'now': 1000.0}
+    monkeypatch.setattr(credential_cache.time, 'monotonic', lambda: clock['now'])
+    return clock
+
+
+def test_caches_successes_for_ttl_and_failures_for_failure_ttl(clock):
+    cache = CredentialCache(ttl=300, failure_ttl=30)
+    check = Check()
+    assert cache.verify('host', 'alice', 'right', check)
+    assert not cache.verify('host', 'alice', 'wrong', check)
+    clock['now'] += 29
+    assert cache.verify('host', 'alice', 'right', check) and not cache.verify('host', 'alice', 'wrong', check)
+    assert check.calls == 2
+
+    clock['now'] += 2
+    assert not cache.verify('host', 'alice', 'wrong', check)
+    assert check.calls == 3
+    clock['now'] += 300
+    assert cache.verify('host', 'alice', 'right', check)
+    assert check.calls == 4
+
+
+def test_entries_are_per_host_user_and_password():
+    cache = CredentialCache()
+    check = Check()
+    cache.verify('host', 'alice', 'right', check)
+    cache.verify('other', 'alice', 'right', check)
+    cache.verify('host', 'bob', 'right', check)
+    assert not cache.verify('host', 'alice', 'wrong', check)
+    assert check.calls == 4
+
+
+def test_concurrent_checks_of_the_same_credentials_verify_once():
+    cache = CredentialCache()
+    check = Check(delay=0.2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.verify('host', 'alice', 'right', check)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [True] * 5 and check.calls == 1
+
+
+def test_errors_are_raised_and_not_cached():
+    cache = CredentialCache()
+
+    def unreachable(username, password):
+        raise OSError('host unreachable')
+
+    with pytest.raises(OSError):
+        cache.verify('host', 'alice', 'right', unreachable)
+    check = Check()
+    assert cache.verify('host', 'alice', 'right', check) and check.calls == 1
+
+
+def test_evicts_the_least_recently_used_entry():
+    cache = CredentialCache(max_size=2)
+    check = Check()
+    for user in ['a', 'b']:
+        cache.verify('host', user, 'right', check)
+    cache.verify('host', 'a', 'right', check)
+    cache.verify('host', 'c', 'right', check)
+    assert check.calls == 3
+    cache.verify('host', 'a', 'right', check)
+    assert check.calls == 3
+    cache.verify('host', 'b', 'right', check)
+    assert check.calls == 4
+
+
+def test_stores_no_passwords():
+    cache = CredentialCache()
+    cache.verify('host', 'alice', 'hunter2', Check('hunter2'))
+    assert all(b'hunter2' not in key for key in cache._entries)
@@ -0,0 +1,98 @@
+import json
+import os
+from datetime import timedelta
+import pytest
+from conftest import make_snapshot
+from data.data_manager import DataManager, MANIFEST_FILE, INDEX_FILE
+
+
+@pytest.fixture
+def history_dir(tmp_path):
+    return str(tmp_path / 'history')
+
+
+def open_store(history_dir, **kwargs):
+    return DataManager(history_dir, cluster='test', import_legacy=False, **kwargs)
+
+
+def test_appends_and_reloads_snapshots(history_dir, hours_ago):
+    manager = open_store(history_dir)
+    manager.update_historical_data(make_snapshot(hours_ago(2), {'n1': (1.0, 500, 'IDLE'), 'n2': (2.0, 400, 'MIXED')}))
+    manager.update_historical_data(make_snapshot(hours_ago(1), {'n1': (3.0, 300, 'IDLE'), 'n2': (4.0, 200, 'MIXED')}))
+    manager.close()
+
+    reopened = open_store(history_dir)
+    history = reopened.load_history()
+    assert len(history) == 4
+    assert (history['Cluster'] == 'test').all()
+    assert reopened.load_node_history('n1')['CPULoad'].tolist() == [1.0, 3.0]
+    reopened.close()
+
+
+def test_skips_snapshots_not_newer_than_the_last_one(history_dir, hours_ago):
+    manager = open_store(history_dir)
+    snapshot = make_snapshot(hours_ago(1), {'n1': (1.0, 500, 'IDLE')})
+    assert len(manager.update_historical_data(snapshot)) == 1
+    assert len(manager.update_historical_data(snapshot)) == 0
+    assert len(manager.load_history()) == 1
+    manager.close()
+
+
+def test_recovery_truncates_torn_appends_and_drops_uncommitted_segments(history_dir, hours_ago):
+    manager = open_store(history_dir)
+    manager.update_historical_data(make_snapshot(hours_ago(1), {'n1': (1.0, 500, 'IDLE')}))
+    manager.close()
+
+    with open(os.path.join(history_dir, MANIFEST_FILE)) as manifest:
+        partition = next(iter(json.load(manifest)['partitions']))
+    with open(os.path.join(history_dir, f'{partition}.csv'), 'a') as segment:
+        segment.write('2000-01-01 00:00:00,9.0,10')
+    with open(os.path.join(history_dir, '2000-01-01.csv'), 'w') as segment:
+        segment.write('never committed')
+
+    reopened = open_store(history_dir)
+    assert not os.path.exists(os.path.join(history_dir, '2000-01-01.csv'))
+    history = reopened.load_history()
+    assert history['CPULoad'].tolist() == [1.0]
+    # The truncated segment takes further appends cleanly.
+    reopened.update_historical_data(make_snapshot(hours_ago(0), {'n1': (2.0, 500, 'IDLE')}))
+    assert reopened.load_history()['CPULoad'].tolist() == [1.0, 2.0]
+    reopened.close()
+
+
+def test_retention_drops_expired_partitions(history_dir, now):
+    manager = open_store(history_dir, retention_days=2)
+    manager.update_historical_data(make_snapshot(now - timedelta(days=5), {'n1': (1.0, 500, 'IDLE')}))
+    manager.update_historical_data(make_snapshot(now, {'n1': (2.0, 500, 'IDLE')}))
+
+    segments = [name for name in os.listdir(history_dir) if name.endswith('.csv')]
+    assert segments == [f"{now:%Y-%m-%d}.csv"]
+    assert manager.load_history(since=now - timedelta(days=30))['CPULoad'].tolist() == [2.0]
+    # The expired day's rollups outlive its raw samples.
+    rollups = manager.load_node_rollups('n1', 'daily')
+    assert rollups['CPULoad_mean'].tolist() == [1.0, 2.0]
+    manager.close()
+
+
+def test_catches_up_the_index_after_a_crash(history_dir, hours_ago):
+    manager = open_store(history_dir)
+    manager.update_historical_data(make_snapshot(hours_ago(1), {'n1': (1.0, 500, 'IDLE')}))
+    manager.close()
+    # Samples and rollups are indexed in one transaction, so a crash before
+    # it commits leaves neither; a missing index is the same case.
+    for name in os.listdir(history_dir):
+        if name.startswith(INDEX_FILE):
+            os.remove(os.path.join(history_dir, name))
+
+    reopened = open_store(history_dir)
+    assert reopened.load_node_history('n1')['CPULoad'].tolist() == [1.0]
+    assert reopened.load_node_rollups('n1', 'hourly')['samples'].tolist() == [1]
+    reopened.close()
+
+
+def test_only_one_manager_may_open_a_store(history_dir):
+    manager = open_store(history_dir)
+    with pytest.raises(Exception, match='already open'):
+        open_store(history_dir)
+    manager.close()
+    open_store(history_dir).close()
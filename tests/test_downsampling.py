@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from visualization.downsampling import lttb_indices, downsample_series
+
+
+def test_keeps_every_point_when_under_the_threshold():
+    assert lttb_indices(np.arange(5), np.ones(5), 10).tolist() == [0, 1, 2, 3, 4]
+    assert lttb_indices(np.arange(5), np.ones(5), 2).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_selects_threshold_points_in_order_with_both_ends():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=10000)
+    indices = lttb_indices(np.arange(10000), y, 100)
+
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 9999
+    assert (np.diff(indices) > 0).all()
+
+
+def test_keeps_spikes():
+    y = np.zeros(1000)
+    y[[123, 456, 789]] = [50, -40, 30]
+    indices = lttb_indices(np.arange(1000), y, 20)
+    assert {123, 456, 789} <= set(indices.tolist())
+
+
+def test_missing_values_do_not_break_the_selection():
+    y = np.sin(np.linspace(0, 20, 500))
+    y[100:150] = np.nan
+    indices = lttb_indices(np.arange(500), y, 50)
+    assert len(indices) == 50 and (np.diff(indices) > 0).all()
+
+
+def test_zoomed_series_spend_the_budget_inside_the_range():
+    timestamps = pd.date_range('2025-01-01', periods=10000, freq='min')
+    values = np.sin(np.arange(10000) / 50)
+    x_range = (timestamps[4000], timestamps[4999])
+
+    kept_timestamps, kept_values = downsample_series(timestamps, values, 200, x_range)
+    inside = (kept_timestamps >= np.datetime64(x_range[0])) & (kept_timestamps <= np.datetime64(x_range[1]))
+    assert inside.sum() == 200
+    # A coarse overview of the rest remains for the range slider.
+    assert 0 < (~inside).sum() <= 50
+    assert kept_timestamps[0] == np.datetime64(timestamps[0]) and kept_timestamps[-1] == np.datetime64(timestamps[-1])
+    assert (np.diff(kept_timestamps.astype(np.int64)) > 0).all()
+    np.testing.assert_array_equal(kept_values, values[np.searchsorted(timestamps.values, kept_timestamps)])
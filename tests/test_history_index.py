@@ -0,0 +1,99 @@
+from datetime import timedelta
+import pandas as pd
+import pytest
+from data.history_index import HistoryIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    return HistoryIndex(str(tmp_path / 'history.db'))
+
+
+def samples(now, cpu_loads, node='n1'):
+    """One sample per minute from `now`, with the given CPU loads."""
+    return pd.DataFrame({
+        'timestamp': [now + timedelta(minutes=i) for i in range(len(cpu_loads))],
+        'CPULoad': cpu_loads,
+        'RealMemory': 1000,
+        'FreeMem': [100 * (i + 1) for i in range(len(cpu_loads))],
+        'State': 'IDLE',
+        'NodeName': node
+    })
+
+
+def test_query_node_returns_one_node_after_since_in_time_order(index, now):
+    start = now.replace(hour=1, minute=0)
+    index.insert(pd.concat([samples(start, [3.0, 4.0], 'n1').iloc[::-1], samples(start, [9.0, 9.0], 'n2')]))
+
+    history = index.query_node('n1', start)
+    assert history['CPULoad'].tolist() == [4.0]
+    history = index.query_node('n1', start - timedelta(minutes=1))
+    assert history['timestamp'].tolist() == [pd.Timestamp(start), pd.Timestamp(start + timedelta(minutes=1))]
+    assert (history['NodeName'] == 'n1').all()
+    assert index.query_node('n3', start - timedelta(days=1)).empty
+
+
+def test_last_timestamp_is_the_newest_indexed_sample(index, now):
+    assert index.last_timestamp() is None
+    index.insert(samples(now, [1.0, 2.0]))
+    assert index.last_timestamp() == pd.Timestamp(now + timedelta(minutes=1))
+
+
+def test_rollups_aggregate_each_bucket(index, now):
+    start = now.replace(hour=1, minute=0)
+    index.insert(samples(start, [1.0, 5.0, 3.0]))
+
+    hourly = index.query_rollups('n1', 'hourly', start - timedelta(days=1))
+    assert hourly[['samples', 'CPULoad_min', 'CPULoad_mean', 'CPULoad_max', 'CPULoad_last']].values.tolist() == [
+        [3, 1.0, 3.0, 5.0, 3.0]]
+    assert hourly['FreeMem_mean'].tolist() == [200.0]
+    assert hourly['timestamp'].tolist() == [pd.Timestamp(start)]
+
+
+def test_later_batches_merge_into_existing_buckets(index, now):
+    start = now.replace(hour=1, minute=0)
+    index.insert(samples(start + timedelta(minutes=2), [6.0]))
+    index.insert(samples(start, [2.0, 4.0]))
+
+    hourly = index.query_rollups('n1', 'hourly', start - timedelta(days=1))
+    assert hourly[['samples', 'CPULoad_mean', 'CPULoad_max']].values.tolist() == [[3, 4.0, 6.0]]
+    # "last" is the latest sample's value, whatever order batches arrived in.
+    assert hourly['CPULoad_last'].tolist() == [6.0]
+
+
+def test_replaying_rows_does_not_count_them_twice(index, now):
+    rows = samples(now.replace(hour=1, minute=0), [1.0, 2.0, 3.0])
+    assert index.insert(rows) == 3
+    before = {tier: index.query_rollups('n1', tier, now - timedelta(days=1)) for tier in ['hourly', 'daily']}
+
+    assert index.insert(rows) == 0
+    # A batch overlapping indexed rows only adds the new ones.
+    overlapping = samples(now.replace(hour=1, minute=0), [9.0, 9.0, 9.0, 4.0])
+    assert index.insert(overlapping) == 1
+
+    hourly = index.query_rollups('n1', 'hourly', now - timedelta(days=1))
+    assert hourly['samples'].tolist() == [before['hourly']['samples'].iloc[0] + 1]
+    assert hourly['CPULoad_mean'].tolist() == [2.5]
+    assert index.query_node('n1', now - timedelta(days=1))['CPULoad'].tolist() == [1.0, 2.0, 3.0, 4.0]
+
+
+def test_rollups_outlive_deleted_samples(index, now):
+    start = now.replace(hour=1, minute=0) - timedelta(days=3)
+    index.insert(samples(start, [1.0, 3.0]))
+    index.delete_before(now)
+
+    assert index.query_node('n1', start - timedelta(days=1)).empty
+    assert index.query_rollups('n1', 'daily', start - timedelta(days=1))['CPULoad_mean'].tolist() == [2.0]
+
+    index.delete_rollups_before('daily', now)
+    assert index.query_rollups('n1', 'daily', start - timedelta(days=1)).empty
+
+
+def test_query_period_summarises_every_node(index, now):
+    start = now.replace(hour=1, minute=0)
+    index.insert(pd.concat([samples(start, [1.0, 3.0], 'n1'), samples(start, [5.0, 7.0], 'n2')]))
+
+    nodes, cluster = index.query_period('hourly', start - timedelta(hours=1), start + timedelta(hours=1))
+    assert nodes[['NodeName', 'samples', 'CPULoad_mean', 'CPULoad_max', 'State']].values.tolist() == [
+        ['n1', 2, 2.0, 3.0, 'IDLE'], ['n2', 2, 6.0, 7.0, 'IDLE']]
+    assert cluster[['nodes', 'CPULoad_mean', 'RealMemory']].values.tolist() == [[2, 4.0, 2000]]
@@ -0,0 +1,75 @@
+import re
+import pytest
+from datetime import datetime, timedelta
+from node.job_controller import JobController
+from node.node_parser import NodeParser, SLURM_TIME_FORMAT, expand_hostlist
+from config.settings import JOB_ACCOUNTING_OVERLAP
+
+
+def starttime(command):
+    return datetime.strptime(re.search(r'--starttime=(\S+)', command).group(1), SLURM_TIME_FORMAT)
+
+
+def sacct(*jobs):
+    """sacct --parsable2 output for (JobId, State, End, NodeList) tuples."""
+    return '\n'.join(
+        f"{job_id}|alice|batch|{state}|{(end - timedelta(hours=1)):{SLURM_TIME_FORMAT}}|"
+        f"{end:{SLURM_TIME_FORMAT}}|01:00:00|{nodes}|0:0"
+        for job_id, state, end, nodes in jobs
+    )
+
+
+def test_first_query_covers_the_retention_window():
+    controller = JobController(retention_hours=24)
+    since = starttime(controller.accounting_command())
+    assert abs(datetime.now() - timedelta(hours=24) - since) < timedelta(seconds=5)
+
+
+def test_cursor_only_advances_once_a_query_is_applied():
+    controller = JobController(retention_hours=24)
+    first = starttime(controller.accounting_command())
+    # The sacct section failed: the next query starts from the same point.
+    controller.update(finished=None)
+    assert starttime(controller.accounting_command()) - first < timedelta(seconds=5)
+
+    controller.update(finished=NodeParser.parse_sacct(''))
+    since = starttime(controller.accounting_command())
+    assert abs(datetime.now() - timedelta(seconds=JOB_ACCOUNTING_OVERLAP) - since) < timedelta(seconds=5)
+
+
+def test_overlapping_queries_keep_the_newest_record():
+    controller = JobController(retention_hours=24)
+    end = datetime.now().replace(microsecond=0) - timedelta(minutes=5)
+    controller.accounting_command()
+    controller.update(finished=NodeParser.parse_sacct(sacct(('1', 'RUNNING', end, 'n01'))))
+    controller.accounting_command()
+    index = controller.update(finished=NodeParser.parse_sacct(sacct(('1', 'COMPLETED', end, 'n01'),
+                                                                     ('2', 'FAILED', end, 'n02'))))
+    assert index.finished[['JobId', 'State']].values.tolist() == [['1', 'COMPLETED'], ['2', 'FAILED']]
+
+
+def test_drops_jobs_past_retention_and_indexes_by_node():
+    controller = JobController(retention_hours=1)
+    recent = datetime.now().replace(microsecond=0) - timedelta(minutes=5)
+    old = recent - timedelta(hours=3)
+    controller.accounting_command()
+    controller.update(
+        jobs=NodeParser.parse_squeue('10|bob|batch|RUNNING|1:00|2|n[01-02]\n11|bob|batch|PENDING|0:00|1|'),
+        finished=NodeParser.parse_sacct(sacct(('1', 'COMPLETED', recent, 'n[02-03]'), ('2', 'COMPLETED', old, 'n01')))
+    )
+
+    running, finished = controller.node_jobs('n02')
+    assert running['JobId'].tolist() == ['10']
+    assert finished['JobId'].tolist() == ['1']
+    running, finished = controller.node_jobs('n01')
+    assert running['JobId'].tolist() == ['10'] and finished.empty
+
+
+@pytest.mark.parametrize('hostlist, names', [
+    ('node01', ['node01']),
+    ('node[001-003,007],gpu01', ['node001', 'node002', 'node003', 'node007', 'gpu01']),
+    ('rack[1-2]-node[01-02]', ['rack1-node01', 'rack1-node02', 'rack2-node01', 'rack2-node02']),
+    ('', [])
+])
+def test_expands_hostlists(hostlist, names):
+    assert expand_hostlist(hostlist) == names
@@ -0,0 +1,57 @@
+import pytest
+from utils.metrics import MetricsRegistry
+
+
+def test_counters_and_gauges_expose_one_sample_per_label_set():
+    registry = MetricsRegistry()
+    rows = registry.counter('rows_written', 'Rows written', ['cluster'])
+    rows.inc(3, cluster='a')
+    rows.inc(cluster='a')
+    rows.inc(cluster='b "quoted"\n')
+    registry.gauge('nodes', 'Nodes seen').set(12)
+
+    assert registry.expose() == (
+        '# TYPE rows_written counter\n'
+        '# HELP rows_written Rows written\n'
+        'rows_written_total{cluster="a"} 4\n'
+        'rows_written_total{cluster="b \\"quoted\\"\\n"} 1\n'
+        '# TYPE nodes gauge\n'
+        '# HELP nodes Nodes seen\n'
+        'nodes 12\n'
+        '# EOF\n'
+    )
+
+
+def test_histograms_are_cumulative_with_count_and_sum():
+    registry = MetricsRegistry()
+    latency = registry.histogram('poll_seconds', 'Poll time', buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value)
+
+    lines = registry.expose().splitlines()
+    assert lines[2:] == [
+        'poll_seconds_bucket{le="0.1"} 2',
+        'poll_seconds_bucket{le="1.0"} 3',
+        'poll_seconds_bucket{le="+Inf"} 4',
+        'poll_seconds_count 4',
+        'poll_seconds_sum 3.65',
+        '# EOF'
+    ]
+
+
+def test_gauge_functions_are_read_when_exposed():
+    registry = MetricsRegistry()
+    values = iter([1, 2])
+    registry.gauge('sessions', 'Sessions').set_function(lambda: next(values))
+    assert 'sessions 1' in registry.expose()
+    assert 'sessions 2' in registry.expose()
+
+
+def test_registering_again_returns_the_same_metric():
+    registry = MetricsRegistry()
+    counter = registry.counter('polls', 'Polls', ['cluster'])
+    assert registry.counter('polls', 'Polls', ['cluster']) is counter
+    with pytest.raises(Exception, match='already registered'):
+        registry.gauge('polls', 'Polls')
+    with pytest.raises(Exception, match='takes labels'):
+        counter.inc(host='x')
@@ -0,0 +1,104 @@
+import pandas as pd
+import pytest
+from benchmarks import synthetic
+from node.node_parser import NodeParser, iter_json_array
+
+NODES = """NodeName=node01 Arch=x86_64 CoresPerSocket=16
+   CPUAlloc=8 CPUEfctv=32 CPUTot=32 CPULoad=7.50
+   AvailableFeatures=ib,avx2 ActiveFeatures=ib,avx2
+   Gres=(null)
+   RealMemory=191000 AllocMem=0 FreeMem=120000 Sockets=2 Boards=1
+   State=MIXED ThreadsPerCore=1 TmpDisk=0 Weight=1 Owner=N/A MCS_label=N/A
+   Partitions=compute,long
+   BootTime=2025-01-02T03:04:05 SlurmdStartTime=2025-01-02T03:05:00
+   LastBusyTime=2025-01-03T00:00:00 ResumeAfterTime=None
+
+NodeName=node02 Arch=x86_64 CoresPerSocket=16
+   CPUAlloc=0 CPUTot=32 CPULoad=N/A
+   RealMemory=191000 AllocMem=0 FreeMem=N/A Sockets=2 Boards=1
+   State=DOWN*+DRAIN ThreadsPerCore=1 TmpDisk=0 Weight=1 Owner=N/A MCS_label=N/A
+   Partitions=compute
+   BootTime=None SlurmdStartTime=None
+   Reason=hardware: DIMM B2 [root@2025-01-01T00:00:00]
+"""
+
+
+def without_timestamp(node_data):
+    return node_data.drop(columns='timestamp')
+
+
+def test_parses_the_fields_we_keep():
+    nodes = NodeParser.parse_slurm_output(NODES, cluster='simlab')
+
+    assert nodes['NodeName'].tolist() == ['node01', 'node02']
+    assert nodes['Cluster'].tolist() == ['simlab', 'simlab']
+    assert nodes.loc[0, ['CPULoad', 'RealMemory', 'FreeMem', 'CPUAlloc', 'CPUTot']].tolist() == [
+        7.5, 191000, 120000, 8, 32]
+    assert nodes.loc[0, ['Features', 'Partitions', 'Gres']].tolist() == ['ib,avx2', 'compute,long', None]
+    assert nodes.loc[0, 'BootTime'] == pd.Timestamp('2025-01-02T03:04:05')
+    assert nodes['State'].astype(str).tolist() == ['MIXED', 'DOWN*+DRAIN']
+
+
+def test_not_available_values_become_zero_and_missing_fields_empty():
+    node = NodeParser.parse_slurm_output(NODES).iloc[1]
+
+    assert node['CPULoad'] == 0.0 and node['FreeMem'] == 0
+    assert pd.isna(node['BootTime']) and pd.isna(node['LastBusyTime'])
+    assert node['Gres'] is None and node['Features'] is None
+    # Older slurmd releases do not report CPUEfctv.
+    assert node['CPUEfctv'] == 32
+
+
+def test_reason_keeps_its_spaces_up_to_the_end_of_the_line():
+    node = NodeParser.parse_slurm_output(NODES).iloc[1]
+    assert node['Reason'] == 'hardware: DIMM B2 [root@2025-01-01T00:00:00]'
+
+    oneliner = NodeParser.parse_slurm_output(
+        'NodeName=n1 State=IDLE Reason=Not responding [slurm@2025-01-01T00:00:00] Comment=x\n')
+    assert oneliner.loc[0, 'Reason'] == 'Not responding [slurm@2025-01-01T00:00:00]'
+
+
+def test_multi_line_and_oneliner_output_parse_alike():
+    text = NodeParser.parse_slurm_output(synthetic.scontrol_text(300))
+    oneliner = NodeParser.parse_slurm_output(synthetic.scontrol_text(300, oneliner=True))
+
+    assert len(text) == 300
+    pd.testing.assert_frame_equal(without_timestamp(text), without_timestamp(oneliner))
+
+
+def test_empty_output_gives_an_empty_frame():
+    nodes = NodeParser.parse_slurm_output('')
+    assert nodes.empty and 'CPULoad' in nodes
+
+
+
+def test_json_output_parses_like_the_text_output():
+    text = NodeParser.parse_slurm_output(synthetic.scontrol_text(300), cluster='simlab')
+    json_nodes = NodeParser.parse_slurm_json(synthetic.chunked(synthetic.scontrol_json(300), 1000), cluster='simlab')
+
+    # JSON states carry no '*' (not responding) suffix.
+    text['State'] = text['State'].astype(str).str.replace('*', '', regex=False)
+    json_nodes['State'] = json_nodes['State'].astype(str)
+    pd.testing.assert_frame_equal(without_timestamp(text), without_timestamp(json_nodes))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 100000])
+def test_iter_json_array_decodes_elements_across_chunk_boundaries(chunk_size):
+    text = '{"meta": {"nodes": "not this"}, "nodes" : [ {"name": "a", "tags": ["]", "}"]},\n {"name": "b"} ], "errors": []}'
+    chunks = synthetic.chunked(text, chunk_size)
+    assert list(iter_json_array(chunks, 'nodes')) == [{'name': 'a', 'tags': [']', '}']}, {'name': 'b'}]
+
+
+def test_iter_json_array_reads_no_further_than_the_array():
+    chunks = iter(['{"nodes": [{"name": "a"}]', ', "errors": ', 'never read'])
+    assert list(iter_json_array(chunks, 'nodes')) == [{'name': 'a'}]
+    assert next(chunks) == ', "errors": '
+
+
+@pytest.mark.parametrize('text, error', [
+    ('{"errors": []}', "No 'nodes' array"),
+    ('{"nodes": [{"name": "a"}, {"name": ', "Truncated 'nodes' array")
+])
+def test_iter_json_array_rejects_missing_and_truncated_arrays(text, error):
+    with pytest.raises(ValueError, match=error):
+        list(iter_json_array(synthetic.chunked(text, 5), 'nodes'))
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import make_snapshot
+from data.ring_buffer import MetricRingBuffer
+
+START = pd.Timestamp('2025-01-01 00:00')
+
+
+def fill(buffer, count, nodes=('n1', 'n2')):
+    """Appends `count` snapshots a minute apart; node i's load is the step + i / 10."""
+    for step in range(count):
+        buffer.append(make_snapshot(START + pd.Timedelta(minutes=step),
+                                    {node: (step + i / 10, 100 + step, 'IDLE') for i, node in enumerate(nodes)}))
+
+
+def test_returns_a_nodes_samples_in_time_order_before_wrapping():
+    buffer = MetricRingBuffer(slots=5)
+    fill(buffer, 3)
+
+    history = buffer.node_history('n2')
+    assert history['CPULoad'].tolist() == pytest.approx([0.1, 1.1, 2.1])
+    assert history['FreeMem'].tolist() == [100, 101, 102]
+    assert history['timestamp'].tolist() == [START + pd.Timedelta(minutes=step) for step in range(3)]
+    assert (history['NodeName'] == 'n2').all() and history['State'].astype(str).tolist() == ['IDLE'] * 3
+
+
+def test_keeps_only_the_latest_slots_once_wrapped():
+    buffer = MetricRingBuffer(slots=4)
+    fill(buffer, 10)
+
+    history = buffer.node_history('n1')
+    assert history['CPULoad'].tolist() == [6.0, 7.0, 8.0, 9.0]
+    assert history['timestamp'].is_monotonic_increasing
+
+
+def test_skips_slots_where_a_node_was_absent():
+    buffer = MetricRingBuffer(slots=4)
+    fill(buffer, 2)
+    buffer.append(make_snapshot(START + pd.Timedelta(minutes=2), {'n2': (5.0, 100, 'DOWN')}))
+
+    assert buffer.node_history('n1')['CPULoad'].tolist() == [0.0, 1.0]
+    assert buffer.node_history('n2')['State'].astype(str).tolist() == ['IDLE', 'IDLE', 'DOWN']
+    assert buffer.node_history('unknown').empty
+
+
+def test_grows_beyond_its_initial_node_capacity():
+    buffer = MetricRingBuffer(slots=3, node_capacity=2)
+    nodes = [f"n{i}" for i in range(9)]
+    fill(buffer, 3, nodes)
+
+    assert buffer.node_history('n8')['CPULoad'].tolist() == pytest.approx([0.8, 1.8, 2.8])
+    assert buffer.node_history('n0')['CPULoad'].tolist() == [0.0, 1.0, 2.0]
+
+
+def test_warm_start_loads_the_latest_snapshots_of_stored_history():
+    history = pd.concat([make_snapshot(START + pd.Timedelta(minutes=step), {'n1': (float(step), 100, 'IDLE')})
+                         for step in range(6)])
+    buffer = MetricRingBuffer(slots=4)
+    buffer.warm_start(history.sample(frac=1, random_state=0))
+
+    assert buffer.node_history('n1')['CPULoad'].tolist() == [2.0, 3.0, 4.0, 5.0]
+
+
+def test_bins_cpu_load_by_node_group_and_time():
+    buffer = MetricRingBuffer(slots=8)
+    fill(buffer, 4, nodes=('a1', 'a2', 'b1', 'b2'))
+    # b2 is absent from the last snapshot; its group averages b1 alone there.
+    buffer.append(make_snapshot(START + pd.Timedelta(minutes=4), {'a1': (4.0, 100, 'IDLE'), 'a2': (4.1, 100, 'IDLE'),
+                                                                  'b1': (4.2, 100, 'IDLE')}))
+
+    timestamps, labels, values = buffer.binned_cpu_load(max_rows=2, max_columns=3)
+    assert labels == ['a1 – a2', 'b1 – b2']
+    assert list(timestamps) == [START, START + pd.Timedelta(minutes=2), START + pd.Timedelta(minutes=3)]
+    np.testing.assert_allclose(values, [[0.55, 2.05, 3.55], [0.75, 2.25, (3.2 + 3.3 + 4.2) / 3]], rtol=1e-6)
+    # Repeated reads reuse the result until the next append.
+    assert buffer.binned_cpu_load(max_rows=2, max_columns=3)[2] is values
+
+
+def test_binning_an_empty_buffer_gives_empty_results():
+    timestamps, labels, values = MetricRingBuffer(slots=4).binned_cpu_load(10, 10)
+    assert len(timestamps) == 0 and labels == [] and values.size == 0
@@ -0,0 +1,66 @@
+import pytest
+from auth import session_store
+from auth.session_store import MemorySessionStore, SQLiteSessionStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = {'now': 1000.0}
+    monkeypatch.setattr(session_store.time, 'time', lambda: clock['now'])
+    return clock
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, tmp_path):
+    def make_store(**kwargs):
+        if request.param == 'memory':
+            return MemorySessionStore(**kwargs)
+        return SQLiteSessionStore(str(tmp_path / 'sessions.db'), str(tmp_path / 'session.key'), **kwargs)
+    return make_store
+
+
+def test_round_trips_session_data(make_store, clock):
+    store = make_store()
+    token = store.create({'username': 'alice'})
+    assert store.get(token) == {'username': 'alice'}
+    assert store.get('unknown') is None
+    store.delete(token)
+    assert store.get(token) is None
+
+
+def test_sessions_expire_after_their_idle_ttl(make_store, clock):
+    store = make_store(ttl=60)
+    token = store.create({'username': 'alice'})
+    clock['now'] += 50
+    assert store.get(token) is not None
+    # Using a session extends it.
+    clock['now'] += 50
+    assert store.get(token) is not None
+    clock['now'] += 61
+    assert store.get(token) is None
+    assert store.count() == 0
+
+
+def test_evicts_the_least_recently_used_session(make_store, clock):
+    store = make_store(max_size=2)
+    first = store.create({'user': 1})
+    clock['now'] += 1
+    second = store.create({'user': 2})
+    clock['now'] += 1
+    store.get(first)
+    clock['now'] += 1
+    third = store.create({'user': 3})
+
+    assert store.get(second) is None
+    assert store.get(first) == {'user': 1} and store.get(third) == {'user': 3}
+    assert store.count() == 2
+
+
+def test_sqlite_sessions_are_shared_and_encrypted(tmp_path, clock):
+    paths = str(tmp_path / 'sessions.db'), str(tmp_path / 'session.key')
+    token = SQLiteSessionStore(*paths).create({'password': 'secret'})
+    # Another worker opening the same files sees the session.
+    assert SQLiteSessionStore(*paths).get(token) == {'password': 'secret'}
+    # The database file and its write-ahead log
+    stored = b''.join(path.read_bytes() for path in tmp_path.glob('sessions.db*'))
+    assert b'secret' not in stored and token.encode() not in stored
@@ -0,0 +1,43 @@
+from conftest import make_snapshot
+from node.snapshot_diff import diff_snapshots, merge_diffs
+
+TIMESTAMP = '2025-01-01 12:00'
+
+
+def test_first_snapshot_adds_every_node():
+    diff = diff_snapshots(None, make_snapshot(TIMESTAMP, {'n1': (1.0, 500, 'IDLE'), 'n2': (2.0, 500, 'IDLE')}))
+    assert diff.added['NodeName'].tolist() == ['n1', 'n2']
+    assert diff.removed.empty and diff.changed.empty and diff.transitions.empty
+
+
+def test_reports_added_removed_and_changed_nodes():
+    previous = make_snapshot(TIMESTAMP, {'n1': (1.0, 500, 'IDLE'), 'n2': (2.0, 500, 'IDLE'), 'n3': (3.0, 500, 'IDLE')})
+    current = make_snapshot(TIMESTAMP, {'n1': (1.2, 500, 'IDLE'), 'n2': (2.0, 500, 'DOWN'), 'n4': (0.0, 900, 'IDLE')})
+    diff = diff_snapshots(previous, current, tolerances={'CPULoad': 0.5})
+
+    assert diff.added['NodeName'].tolist() == ['n4']
+    assert diff.removed['NodeName'].tolist() == ['n3']
+    # n1's load moved within tolerance; n2 changed state.
+    assert diff.changed['NodeName'].tolist() == ['n2']
+    assert diff.transitions[['NodeName', 'previous_state', 'State']].values.tolist() == [['n2', 'IDLE', 'DOWN']]
+    assert [record['event'] for record in diff.records()] == ['added', 'removed', 'state', 'metrics']
+
+
+def test_metric_changes_beyond_tolerance_carry_deltas():
+    previous = make_snapshot(TIMESTAMP, {'n1': (1.0, 500, 'IDLE')})
+    current = make_snapshot(TIMESTAMP, {'n1': (2.0, 100, 'IDLE')})
+    diff = diff_snapshots(previous, current, tolerances={'CPULoad': 0.5, 'FreeMem': 256})
+
+    assert diff.changed[['CPULoad_delta', 'FreeMem_delta', 'RealMemory_delta']].values.tolist() == [
+        [1.0, -400.0, 0.0]]
+    assert diff.transitions.empty
+    assert diff_snapshots(current, current).empty
+
+
+def test_nodes_are_matched_within_their_cluster():
+    previous = make_snapshot(TIMESTAMP, {'n1': (1.0, 500, 'IDLE')}, cluster='a')
+    current = make_snapshot(TIMESTAMP, {'n1': (1.0, 500, 'IDLE')}, cluster='b')
+    diff = merge_diffs([diff_snapshots(previous, current)])
+
+    assert diff.added[['Cluster', 'NodeName']].values.tolist() == [['b', 'n1']]
+    assert diff.removed[['Cluster', 'NodeName']].values.tolist() == [['a', 'n1']]
@@ -0,0 +1,53 @@
+import shutil
+import subprocess
+import pytest
+from utils.ssh_client import _batch_script, _split_batch_output
+
+TOKEN = 'a1b2c3'
+
+needs_sh = pytest.mark.skipif(shutil.which('sh') is None, reason='needs a POSIX shell')
+
+
+def run_batch(commands):
+    script = _batch_script(commands, TOKEN)
+    output = subprocess.run(['sh', '-s'], input=script, capture_output=True, text=True, timeout=30).stdout
+    return _split_batch_output(output, TOKEN, commands)
+
+
+@needs_sh
+def test_splits_each_sections_output_status_and_errors():
+    results = run_batch({
+        'first': "printf 'a|b\\nc|d\\n'",
+        'failing': "echo partial; echo 'boom' >&2; exit 3",
+        'empty': 'true'
+    })
+    assert results == {
+        'first': (0, 'a|b\nc|d\n', ''),
+        'failing': (3, 'partial\n', 'boom'),
+        'empty': (0, '', '')
+    }
+
+
+@needs_sh
+def test_commands_reading_stdin_do_not_swallow_later_sections():
+    results = run_batch({'reader': 'cat', 'after': 'echo still here'})
+    assert results == {'reader': (0, '', ''), 'after': (0, 'still here\n', '')}
+
+
+@needs_sh
+def test_output_without_a_trailing_newline_is_kept_whole():
+    assert run_batch({'bare': "printf 'no newline'"}) == {'bare': (0, 'no newline', '')}
+
+
+def test_sections_cut_off_before_their_end_marker_have_no_status():
+    output = f"@@{TOKEN} begin nodes\nNodeName=n1\n@@{TOKEN} end nodes 0\n\n@@{TOKEN} begin jobs\n1|alice\n"
+    results = _split_batch_output(output, TOKEN, ['nodes', 'jobs', 'scheduler'])
+    assert results['nodes'] == (0, 'NodeName=n1', '')
+    assert results['jobs'] == (None, '1|alice\n', '')
+    # Sections that never started are reported as missing.
+    assert results['scheduler'] == (None, '', '')
+
+
+def test_marker_lookalikes_with_another_token_stay_in_the_output():
+    output = f"@@{TOKEN} begin nodes\n@@other end nodes 0\n@@{TOKEN} end nodes 0\n\n"
+    assert _split_batch_output(output, TOKEN, ['nodes'])['nodes'] == (0, '@@other end nodes 0', '')
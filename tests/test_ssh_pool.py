@@ -0,0 +1,115 @@
+import socket
+import threading
+import time
+import pytest
+from benchmarks.fake_cluster import FakeSSHServer
+from utils.ssh_pool import SSHConnectionPool
+
+PASSWORD = 'secret'
+
+
+class FakeShell:
+    """Runs `echo TEXT`, `sleep SECONDS` and `exit STATUS` for FakeSSHServer."""
+
+    def run(self, command, stdin=''):
+        name, _, argument = command.partition(' ')
+        if name == 'echo':
+            return 0, argument + '\n', ''
+        if name == 'sleep':
+            time.sleep(float(argument))
+            return 0, '', ''
+        if name == 'exit':
+            return int(argument), '', 'failed'
+        return 127, '', f"sh: {name}: command not found"
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = FakeSSHServer(FakeShell(), password=PASSWORD).start()
+    yield server
+    server.stop()
+
+
+def is_open(client):
+    transport = client.get_transport()
+    return transport is not None and transport.is_active()
+
+
+def connects(pool):
+    return pool.timings.snapshot().get('connect', {}).get('count', 0)
+
+
+def test_concurrent_callers_share_one_connection(server):
+    pool = SSHConnectionPool()
+    outputs = []
+    threads = [threading.Thread(target=lambda: outputs.append(
+        pool.exec_command(server.address, 'alice', PASSWORD, 'echo hi'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert outputs == ['hi\n'] * 8
+    assert connects(pool) == 1
+    pool.close_all()
+
+
+def test_eviction_never_closes_a_connection_in_use(server):
+    pool = SSHConnectionPool(max_size=1)
+    with pool.connection(server.address, 'alice', PASSWORD) as client:
+        # A second user pushes the pool past max_size while alice is busy;
+        # bob's idle connection is evicted rather than alice's.
+        assert pool.exec_command(server.address, 'bob', PASSWORD, 'echo bob') == 'bob\n'
+        assert client.exec_command('echo still')[1].read() == b'still\n'
+        assert list(pool._connections) == [(server.address, 'alice')]
+    assert is_open(client)
+    pool.close_all()
+    assert not is_open(client)
+
+
+def test_replaced_connections_close_once_returned(server):
+    pool = SSHConnectionPool()
+    with pool.connection(server.address, 'alice', PASSWORD) as client:
+        pool.close_all()
+        assert client.exec_command('echo still')[1].read() == b'still\n'
+    assert not is_open(client)
+
+
+def test_reconnects_when_a_pooled_connection_broke(server):
+    pool = SSHConnectionPool()
+    with pool.connection(server.address, 'alice', PASSWORD) as client:
+        pass
+    client.get_transport().close()
+    assert pool.exec_command(server.address, 'alice', PASSWORD, 'echo again') == 'again\n'
+    assert connects(pool) == 2
+    pool.close_all()
+
+
+def test_timeouts_are_not_retried_and_keep_the_connection(server):
+    pool = SSHConnectionPool(command_timeout=0.2)
+    with pytest.raises(socket.timeout):
+        pool.exec_command(server.address, 'alice', PASSWORD, 'sleep 1')
+    assert pool.exec_command(server.address, 'alice', PASSWORD, 'echo after') == 'after\n'
+    assert connects(pool) == 1
+    pool.close_all()
+
+
+def test_raises_on_a_non_zero_exit_status(server):
+    pool = SSHConnectionPool()
+    with pytest.raises(Exception, match="'exit 3' exited with status 3: failed"):
+        pool.exec_command(server.address, 'alice', PASSWORD, 'exit 3')
+    with pytest.raises(Exception, match='exited with status 2'):
+        list(pool.stream_command(server.address, 'alice', PASSWORD, 'exit 2'))
+    pool.close_all()
+
+
+def test_stream_returns_its_connection_when_closed_early(server):
+    pool = SSHConnectionPool(max_size=1)
+    stream = pool.stream_command(server.address, 'alice', PASSWORD, 'echo streamed')
+    assert next(stream) == 'streamed\n'
+    stream.close()
+    with pool.connection(server.address, 'bob', PASSWORD):
+        pass
+    # alice's connection was returned, so bob's evicted it.
+    assert list(pool._connections) == [(server.address, 'bob')]
+    pool.close_all()
@@ -0,0 +1,168 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Default latency buckets in seconds, from 1 ms to 2 minutes
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class _Metric:
+    """A named metric with one value per combination of label values."""
+    type = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise Exception(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _label_text(self, key, extra=()):
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+    def expose(self):
+        """Returns the metric's lines in the OpenMetrics text format."""
+        lines = [f"# TYPE {self.name} {self.type}", f"# HELP {self.name} {self.documentation}"]
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            lines += self._samples(key, value)
+        return lines
+
+
+class Counter(_Metric):
+    """A value that only goes up, such as requests served or rows written."""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self, key, value):
+        return [f"{self.name}_total{self._label_text(key)} {value}"]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, such as nodes seen or active sessions.
+
+    `set_function` makes the gauge read its value when scraped instead.
+    """
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function):
+        self._function = function
+
+    def expose(self):
+        if self._function is not None:
+            try:
+                self.set(self._function())
+            except Exception as e:
+                print(f"Error reading gauge {self.name}: {e}")
+        return super().expose()
+
+    def _samples(self, key, value):
+        return [f"{self.name}{self._label_text(key)} {value}"]
+
+
+class Histogram(_Metric):
+    """Counts observations (e.g. latencies in seconds) into cumulative buckets."""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes how long the `with` block took."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self, key, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = '+Inf' if bound == math.inf else repr(float(bound))
+            lines.append(f"{self.name}_bucket{self._label_text(key, [('le', le)])} {cumulative}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(key)} {total}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics of one process, exposed together at /metrics.
+
+    Recording a value is a dict update under a per-metric lock, so
+    instrumentation can stay on in production.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge, name, documentation, labels)
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, documentation, labels, buckets=buckets)
+
+    def expose(self):
+        """Returns every metric in the OpenMetrics text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.expose()
+        return '\n'.join(lines + ['# EOF']) + '\n'
+
+    def _register(self, metric_type, name, documentation, labels, **kwargs):
+        # Modules may be imported more than once (e.g. by report workers);
+        # registering the same metric again returns the existing one.
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_type(name, documentation, labels, **kwargs)
+            elif not isinstance(metric, metric_type) or metric.labels != tuple(labels):
+                raise Exception(f"Metric {name} is already registered differently")
+            return metric
+
+
+REGISTRY = MetricsRegistry()
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
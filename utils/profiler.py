@@ -0,0 +1,237 @@
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from config.settings import (PROFILE_CALLBACKS, PROFILE_THRESHOLD, PROFILE_SAMPLE_INTERVAL,
+                             PROFILE_DIR, PROFILE_RING_SIZE)
+from utils.metrics import REGISTRY
+
+# Allocated bytes, from 1 KB to 1 GB
+BYTE_BUCKETS = tuple(1024 * 4 ** i for i in range(11))
+PROFILE_ID = re.compile(r'^\d+-\d+$')
+# Sampled stacks keep at most this many innermost frames
+MAX_STACK_DEPTH = 64
+
+CALLBACK_CPU_SECONDS = REGISTRY.histogram('dash_callback_cpu_seconds', 'CPU time of profiled Dash callbacks',
+                                          ['callback'])
+CALLBACK_ALLOCATED_BYTES = REGISTRY.histogram('dash_callback_allocated_bytes',
+                                              'Peak memory allocated by profiled Dash callbacks',
+                                              ['callback'], buckets=BYTE_BUCKETS)
+SLOW_CALLBACKS = REGISTRY.counter('dash_slow_callbacks', 'Profiled Dash callbacks slower than the threshold',
+                                  ['callback'])
+
+
+class _Call:
+    __slots__ = ('name', 'start', 'stacks', 'baseline')
+
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.stacks = Counter()
+        self.baseline = None
+
+
+class CallbackProfiler:
+    """Measures wrapped callbacks and profiles the slow ones.
+
+    While enabled, every call's wall and CPU time and the memory it
+    allocated (tracemalloc's peak above the starting point; approximate
+    when calls overlap) are recorded as metrics. Once a call has run for
+    `threshold` seconds, a sampler thread takes a tracemalloc snapshot and
+    then samples the call's stack every `sample_interval` seconds; when it
+    ends, the folded stacks and the allocations made since the snapshot
+    are written to `directory`, which keeps the latest `ring_size` profiles.
+    Calls under the threshold only pay for the clock and tracemalloc
+    counter reads around them, though tracemalloc slows every allocation
+    while profiling is on.
+    """
+
+    def __init__(self, enabled=PROFILE_CALLBACKS, threshold=PROFILE_THRESHOLD,
+                 sample_interval=PROFILE_SAMPLE_INTERVAL, directory=PROFILE_DIR, ring_size=PROFILE_RING_SIZE):
+        self.threshold = threshold
+        self.sample_interval = sample_interval
+        self.directory = directory
+        self.ring_size = ring_size
+        self.enabled = False
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._sampler = None
+        # Whether enable() started tracemalloc, and so disable() may stop it
+        self._started_tracing = False
+        # Profiles are written off the request thread, one at a time.
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='profile-writer')
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        if not tracemalloc.is_tracing():
+            # One frame per allocation is enough to group them by line.
+            tracemalloc.start(1)
+            self._started_tracing = True
+        with self._lock:
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name='callback-sampler', daemon=True)
+                self._sampler.start()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        # Tracing started by someone else (e.g. PYTHONTRACEMALLOC) is left running.
+        if self._started_tracing:
+            self._started_tracing = False
+            tracemalloc.stop()
+
+    def wrap(self, name, function):
+        """Returns `function` measured and, when slow, profiled under `name`."""
+        @functools.wraps(function)
+        def profiled(*args, **kwargs):
+            if not self.enabled:
+                return function(*args, **kwargs)
+            thread_id = threading.get_ident()
+            start_memory = tracemalloc.get_traced_memory()[0]
+            call = _Call(name, time.perf_counter())
+            with self._lock:
+                if not self._active:
+                    tracemalloc.reset_peak()
+                self._active[thread_id] = call
+                self._wake.set()
+            cpu_start = time.thread_time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                cpu = time.thread_time() - cpu_start
+                wall = time.perf_counter() - call.start
+                current_memory, peak_memory = tracemalloc.get_traced_memory()
+                with self._lock:
+                    del self._active[thread_id]
+                CALLBACK_CPU_SECONDS.observe(cpu, callback=name)
+                CALLBACK_ALLOCATED_BYTES.observe(max(0, peak_memory - start_memory), callback=name)
+                if wall >= self.threshold:
+                    SLOW_CALLBACKS.inc(callback=name)
+                    self._writer.submit(self._save, call, time.time() - wall, wall, cpu,
+                                        peak_memory - start_memory, current_memory - start_memory)
+        return profiled
+
+    def list_profiles(self):
+        """Returns the stored profiles' summaries, newest first."""
+        profiles = []
+        for profile_id in reversed(self._profile_ids()):
+            profile = self.load_profile(profile_id)
+            if profile is not None:
+                profile.pop('stacks')
+                profile.pop('allocations')
+                profiles.append(profile)
+        return profiles
+
+    def load_profile(self, profile_id):
+        """Returns a stored profile, or None if there is no such profile."""
+        if not PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.json")) as profile_file:
+                return json.load(profile_file)
+        except (OSError, ValueError):
+            return None
+
+    def _sample(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.sample_interval)
+            with self._lock:
+                calls = list(self._active.items())
+                if not calls:
+                    self._wake.clear()
+                    continue
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            for thread_id, call in calls:
+                if now - call.start < self.threshold:
+                    continue
+                if call.baseline is None and tracemalloc.is_tracing():
+                    try:
+                        call.baseline = tracemalloc.take_snapshot()
+                    except RuntimeError:
+                        # Profiling was disabled meanwhile.
+                        pass
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = _fold(frame)
+                with self._lock:
+                    # The call may have ended since; its stacks are being saved.
+                    if self._active.get(thread_id) is call:
+                        call.stacks[stack] += 1
+
+    def _save(self, call, started, wall, cpu, peak_bytes, net_bytes):
+        try:
+            allocations = []
+            if call.baseline is not None and tracemalloc.is_tracing():
+                # Leave out the memory taken by the snapshots themselves.
+                own = [tracemalloc.Filter(False, tracemalloc.__file__)]
+                snapshot = tracemalloc.take_snapshot().filter_traces(own)
+                for stat in snapshot.compare_to(call.baseline.filter_traces(own), 'lineno')[:25]:
+                    frame = stat.traceback[0]
+                    allocations.append({'location': f"{_short_path(frame.filename)}:{frame.lineno}",
+                                        'size_diff': stat.size_diff, 'count_diff': stat.count_diff,
+                                        'size': stat.size})
+            profile_id = f"{time.time_ns()}-{os.getpid()}"
+            profile = {
+                'id': profile_id,
+                'callback': call.name,
+                'started': datetime.fromtimestamp(started).isoformat(timespec='seconds'),
+                'wall': wall,
+                'cpu': cpu,
+                'peak_bytes': peak_bytes,
+                'net_bytes': net_bytes,
+                'threshold': self.threshold,
+                'sample_interval': self.sample_interval,
+                'samples': sum(call.stacks.values()),
+                'stacks': call.stacks.most_common(200),
+                'allocations': allocations
+            }
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{profile_id}.json")
+            with open(f"{path}.tmp", 'w') as profile_file:
+                json.dump(profile, profile_file)
+            os.replace(f"{path}.tmp", path)
+            for expired in self._profile_ids()[:-self.ring_size]:
+                try:
+                    os.remove(os.path.join(self.directory, f"{expired}.json"))
+                except FileNotFoundError:
+                    # Another worker pruned it first.
+                    pass
+        except Exception as e:
+            print(f"Error saving profile of {call.name}: {e}")
+
+    def _profile_ids(self):
+        # Ids start with a nanosecond timestamp, so they sort by age.
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        ids = [name[:-5] for name in names if name.endswith('.json') and PROFILE_ID.match(name[:-5])]
+        return sorted(ids, key=lambda profile_id: int(profile_id.split('-')[0]))
+
+
+def _fold(frame):
+    # "outer;...;inner" as used by flame graph tools, up to the wrapper.
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        if code.co_name == 'profiled' and code.co_filename == __file__:
+            break
+        names.append(f"{code.co_name} ({_short_path(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def _short_path(path):
+    return '/'.join(path.replace('\\', '/').split('/')[-2:])
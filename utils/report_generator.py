@@ -3,14 +3,46 @@ from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.graphics.shapes import Drawing
+from reportlab.graphics.shapes import Drawing, String
 from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
 from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.charts.legends import Legend
 from datetime import datetime
 import io
-import matplotlib.pyplot as plt
-import seaborn as sns
-import base64
+import numpy as np
+from config.settings import REPORT_TABLE_ROWS
+
+CHART_COLORS = [colors.HexColor(color) for color in
+                ('#3498db', '#2ecc71', '#f1c40f', '#e74c3c', '#9b59b6', '#34495e', '#1abc9c', '#e67e22')]
+
+OVERVIEW_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 14),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 12),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+DETAIL_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
 
 class ReportGenerator:
     def __init__(self):
@@ -27,144 +59,313 @@ class ReportGenerator:
             fontSize=16,
             spaceAfter=12
         )
+        self.group_style = ParagraphStyle(
+            'GroupHeading',
+            parent=self.styles['Heading3'],
+            fontSize=12,
+            spaceBefore=8,
+            spaceAfter=6
+        )
         self.body_style = self.styles['Normal']
 
-    def generate_report(self, node_data, filename="node_report.pdf"):
-        """Generate a PDF report with node information."""
-        doc = SimpleDocTemplate(
-            filename,
-            pagesize=letter,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=72
-        )
+    def generate_report(self, node_data, filename="node_report.pdf", renderer="native", group_by="State"):
+        """Generate a PDF report with node information.
 
-        # Create story (content) for the PDF
-        story = []
-        
-        # Add Title
-        story.append(Paragraph("Node Management System Report", self.title_style))
-        story.append(Paragraph(
-            f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            self.body_style
-        ))
-        story.append(Spacer(1, 20))
+        `renderer` selects ReportLab vector charts ("native") or the older
+        matplotlib/seaborn PNG charts ("matplotlib"). Node details are grouped
+        by `group_by` ("State" or "Partitions").
+        """
+        doc = self._document(filename)
+        story = self._title(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
         # Add System Overview
-        story.append(Paragraph("System Overview", self.heading_style))
-        
-        # Create overview table
         total_nodes = len(node_data)
         total_cpu_load = node_data['CPULoad'].mean()
         total_memory = node_data['RealMemory'].sum()
         used_memory = (node_data['RealMemory'] - node_data['FreeMem']).sum()
-        
-        overview_data = [
-            ['Metric', 'Value'],
+        story.extend(self._overview([
             ['Total Nodes', str(total_nodes)],
             ['Average CPU Load', f"{total_cpu_load:.2f}%"],
             ['Total Memory', f"{total_memory/1024:.2f} GB"],
             ['Used Memory', f"{used_memory/1024:.2f} GB"],
             ['Memory Utilization', f"{(used_memory/total_memory)*100:.2f}%"]
-        ]
-        
-        table = Table(overview_data, colWidths=[200, 200])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
         ]))
-        story.append(table)
-        story.append(Spacer(1, 20))
 
         # Add Node Details
         story.append(Paragraph("Node Details", self.heading_style))
-        
-        node_details = []
-        # Create header row
-        node_details.append(['Node Name', 'CPU Load', 'Memory Usage', 'State'])
-        
-        # Add data rows
-        for _, row in node_data.iterrows():
-            memory_usage = ((row['RealMemory'] - row['FreeMem']) / row['RealMemory'] * 100)
-            node_details.append([
-                row['NodeName'],
-                f"{row['CPULoad']:.1f}%",
-                f"{memory_usage:.1f}%",
-                row['State']
-            ])
-
-        table = Table(node_details, colWidths=[120, 100, 100, 100])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        story.extend(self._node_tables(
+            ['Node Name', 'CPU Load', 'Memory Usage', 'State'],
+            [
+                (node_data['NodeName'].to_numpy(), None),
+                (node_data['CPULoad'].to_numpy(dtype=float), '%.1f%%'),
+                (self._memory_usage(node_data['RealMemory'], node_data['FreeMem']), '%.1f%%'),
+                (node_data['State'].to_numpy(), None)
+            ],
+            node_data[group_by].astype(str).to_numpy()
+        ))
+        story.append(Spacer(1, 20))
+
+        # Add visualizations
+        story.append(Paragraph("System Visualizations", self.heading_style))
+        if renderer == "matplotlib":
+            story.extend(self._matplotlib_charts(node_data))
+        else:
+            story.extend(self._native_charts(node_data))
+
+        # Build PDF
+        doc.build(story)
+        return filename
+
+    def generate_period_report(self, nodes, cluster, since, until, filename="node_report.pdf"):
+        """Generate a PDF report summarising the stored history between `since` and `until`.
+
+        `nodes` and `cluster` are the per-node and per-bucket aggregates
+        returned by HistoryIndex.query_period.
+        """
+        doc = self._document(filename)
+        story = self._title(
+            f"Period: {since.strftime('%Y-%m-%d %H:%M')} to {until.strftime('%Y-%m-%d %H:%M')}"
+        )
+        if nodes.empty:
+            story.append(Paragraph("No history was recorded in this period.", self.body_style))
+            doc.build(story)
+            return filename
+
+        samples = nodes['samples'].sum()
+        average_cpu_load = (nodes['CPULoad_mean'] * nodes['samples']).sum() / samples
+        used_memory = cluster['RealMemory'] - cluster['FreeMem']
+        story.extend(self._overview([
+            ['Nodes Reporting', str(len(nodes))],
+            ['Samples', str(samples)],
+            ['Average CPU Load', f"{average_cpu_load:.2f}%"],
+            ['Peak CPU Load', f"{nodes['CPULoad_max'].max():.2f}%"],
+            ['Total Memory', f"{nodes['RealMemory'].sum()/1024:.2f} GB"],
+            ['Average Used Memory', f"{used_memory.mean()/1024:.2f} GB"],
+            ['Memory Utilization', f"{used_memory.sum()/cluster['RealMemory'].sum()*100:.2f}%"]
         ]))
-        story.append(table)
+
+        story.append(Paragraph("Node Details", self.heading_style))
+        story.extend(self._node_tables(
+            ['Node Name', 'Avg CPU', 'Peak CPU', 'Avg Memory', 'Last State'],
+            [
+                (nodes['NodeName'].to_numpy(), None),
+                (nodes['CPULoad_mean'].to_numpy(dtype=float), '%.1f%%'),
+                (nodes['CPULoad_max'].to_numpy(dtype=float), '%.1f%%'),
+                (self._memory_usage(nodes['RealMemory'], nodes['FreeMem_mean']), '%.1f%%'),
+                (nodes['State'].to_numpy(), None)
+            ],
+            nodes['State'].astype(str).to_numpy(),
+            col_widths=[110, 80, 80, 90, 100]
+        ))
         story.append(Spacer(1, 20))
 
-        # Add visualizations using matplotlib
         story.append(Paragraph("System Visualizations", self.heading_style))
-        
+        labels = cluster['timestamp'].dt.strftime('%m-%d %H:%M').tolist()
+        state_counts = nodes['State'].value_counts()
+        story.extend([
+            self._line_chart('Cluster CPU Load', cluster['CPULoad_mean'].tolist(), labels,
+                             'Average CPU Load (%)'),
+            Spacer(1, 20),
+            self._line_chart('Cluster Memory Utilization',
+                             self._memory_usage(cluster['RealMemory'], cluster['FreeMem']).tolist(),
+                             labels, 'Memory Usage (%)'),
+            Spacer(1, 20),
+            self._histogram_chart('Average CPU Load Distribution',
+                                  nodes['CPULoad_mean'].to_numpy(dtype=float), 'CPU Load (%)'),
+            Spacer(1, 20),
+            self._pie_chart('Last Node State Distribution', state_counts.tolist(),
+                            state_counts.index.tolist())
+        ])
+
+        doc.build(story)
+        return filename
+
+    def _document(self, filename):
+        return SimpleDocTemplate(
+            filename,
+            pagesize=letter,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=72
+        )
+
+    def _title(self, subtitle):
+        return [
+            Paragraph("Node Management System Report", self.title_style),
+            Paragraph(subtitle, self.body_style),
+            Spacer(1, 20)
+        ]
+
+    def _overview(self, rows):
+        table = Table([['Metric', 'Value']] + rows, colWidths=[200, 200])
+        table.setStyle(OVERVIEW_TABLE_STYLE)
+        return [Paragraph("System Overview", self.heading_style), table, Spacer(1, 20)]
+
+    def _node_tables(self, header, columns, groups, col_widths=None):
+        """Builds the node details as page-sized tables, one run per group.
+
+        `columns` are (values, format) pairs; values are formatted one chunk
+        at a time with numpy, so no table or row list spans all nodes.
+        Missing numbers (NaN, e.g. memory use of a node reporting no
+        RealMemory) are shown as "N/A".
+
+        The story still holds every chunk until doc.build, so memory grows
+        with the node count, but only by a few short strings per node:
+        ReportLab keeps each finished page in memory until the file is
+        saved, so streaming the story would not bound it further. What the
+        chunking avoids is one table spanning all nodes, which ReportLab
+        re-measures every time it splits it across a page.
+        """
+        order = np.argsort(groups, kind='stable')
+        group_names, starts, counts = np.unique(groups[order], return_index=True, return_counts=True)
+        flowables = []
+        for group, start, count in zip(group_names, starts, counts):
+            flowables.append(Paragraph(f"{group} ({count} nodes)", self.group_style))
+            for chunk_start in range(start, start + count, REPORT_TABLE_ROWS):
+                chunk = order[chunk_start:min(chunk_start + REPORT_TABLE_ROWS, start + count)]
+                rows = np.column_stack([
+                    self._format(values[chunk], fmt) for values, fmt in columns
+                ]).tolist()
+                table = Table([header] + rows, colWidths=col_widths or [120, 100, 100, 100], repeatRows=1)
+                table.setStyle(DETAIL_TABLE_STYLE)
+                flowables.append(table)
+        return flowables
+
+    def _format(self, values, fmt):
+        if not fmt:
+            return values.astype(str)
+        return np.where(np.isfinite(values), np.char.mod(fmt, values), 'N/A')
+
+    def _memory_usage(self, real_memory, free_mem):
+        """Used memory as a percentage of RealMemory (NaN where RealMemory is 0)."""
+        real_memory = np.asarray(real_memory, dtype=float)
+        used = real_memory - np.asarray(free_mem, dtype=float)
+        return np.divide(used * 100, real_memory, out=np.full_like(used, np.nan), where=real_memory > 0)
+
+    def _native_charts(self, node_data):
+        """Draws the report charts as ReportLab vector graphics."""
+        state_counts = node_data['State'].astype(str).value_counts()
+        return [
+            self._histogram_chart('CPU Load Distribution',
+                                  node_data['CPULoad'].to_numpy(dtype=float), 'CPU Load (%)'),
+            Spacer(1, 20),
+            self._histogram_chart('Memory Usage Distribution',
+                                  self._memory_usage(node_data['RealMemory'], node_data['FreeMem']),
+                                  'Memory Usage (%)'),
+            Spacer(1, 20),
+            self._pie_chart('Node State Distribution', state_counts.tolist(),
+                            state_counts.index.tolist())
+        ]
+
+    def _histogram_chart(self, title, values, value_title, bins=10):
+        """Node counts per value bin, so the chart size does not grow with the cluster."""
+        counts, edges = np.histogram(values[np.isfinite(values)], bins=bins)
+        return self._bar_chart(
+            title,
+            counts.tolist(),
+            [f"{low:.0f}-{high:.0f}" for low, high in zip(edges[:-1], edges[1:])],
+            f"Nodes by {value_title}"
+        )
+
+    def _bar_chart(self, title, values, labels, value_title):
+        drawing = Drawing(400, 300)
+        drawing.add(String(200, 285, title, fontName='Helvetica-Bold', fontSize=12, textAnchor='middle'))
+        chart = VerticalBarChart()
+        chart.x = 50
+        chart.y = 60
+        chart.width = 330
+        chart.height = 200
+        chart.data = [values]
+        chart.bars[0].fillColor = CHART_COLORS[0]
+        chart.bars[0].strokeColor = None
+        chart.valueAxis.valueMin = 0
+        chart.categoryAxis.categoryNames = labels
+        chart.categoryAxis.labels.fontSize = 7
+        drawing.add(chart)
+        drawing.add(String(200, 270, value_title, fontSize=9, textAnchor='middle'))
+        return drawing
+
+    def _line_chart(self, title, values, labels, value_title, max_labels=8):
+        drawing = Drawing(400, 300)
+        drawing.add(String(200, 285, title, fontName='Helvetica-Bold', fontSize=12, textAnchor='middle'))
+        chart = HorizontalLineChart()
+        chart.x = 50
+        chart.y = 60
+        chart.width = 330
+        chart.height = 200
+        chart.data = [[value if np.isfinite(value) else None for value in values]]
+        chart.lines[0].strokeColor = CHART_COLORS[0]
+        chart.lines[0].strokeWidth = 1.5
+        chart.valueAxis.valueMin = 0
+        step = max(1, len(labels) // max_labels)
+        chart.categoryAxis.categoryNames = [label if i % step == 0 else '' for i, label in enumerate(labels)]
+        chart.categoryAxis.labels.fontSize = 7
+        chart.categoryAxis.labels.angle = 30
+        chart.categoryAxis.labels.boxAnchor = 'ne'
+        drawing.add(chart)
+        drawing.add(String(200, 270, value_title, fontSize=9, textAnchor='middle'))
+        return drawing
+
+    def _pie_chart(self, title, values, labels):
+        drawing = Drawing(400, 220)
+        drawing.add(String(200, 205, title, fontName='Helvetica-Bold', fontSize=12, textAnchor='middle'))
+        pie = Pie()
+        pie.x = 40
+        pie.y = 20
+        pie.width = pie.height = 160
+        pie.data = values
+        pie.slices.strokeColor = colors.white
+        for i in range(len(values)):
+            pie.slices[i].fillColor = CHART_COLORS[i % len(CHART_COLORS)]
+        drawing.add(pie)
+        legend = Legend()
+        legend.x = 240
+        legend.y = 170
+        legend.fontSize = 9
+        legend.colorNamePairs = [(CHART_COLORS[i % len(CHART_COLORS)], f"{label} ({value})")
+                                 for i, (label, value) in enumerate(zip(labels, values))]
+        drawing.add(legend)
+        return drawing
+
+    def _matplotlib_charts(self, node_data):
+        """Renders the report charts as PNG images with matplotlib/seaborn."""
+        # Imported lazily so the web process does not pay for them unless asked.
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        charts = []
         # CPU Load Distribution
         plt.figure(figsize=(8, 4))
         sns.histplot(data=node_data, x='CPULoad', bins=10)
         plt.title('CPU Load Distribution')
         plt.xlabel('CPU Load (%)')
         plt.ylabel('Count')
-        
-        # Save plot to memory
-        img_data = io.BytesIO()
-        plt.savefig(img_data, format='png', bbox_inches='tight')
-        img_data.seek(0)
-        plt.close()
-        
-        # Add plot to PDF
-        img = Image(img_data)
-        img.drawWidth = 400
-        img.drawHeight = 300
-        story.append(img)
-        story.append(Spacer(1, 20))
+        charts.append(self._figure_image(plt))
+        charts.append(Spacer(1, 20))
 
         # Memory Usage by Node
         plt.figure(figsize=(10, 5))
-        memory_usage = ((node_data['RealMemory'] - node_data['FreeMem']) / 
+        memory_usage = ((node_data['RealMemory'] - node_data['FreeMem']) /
                        node_data['RealMemory'] * 100)
         plt.bar(node_data['NodeName'], memory_usage)
         plt.title('Memory Usage by Node')
         plt.xlabel('Node')
         plt.ylabel('Memory Usage (%)')
         plt.xticks(rotation=45)
-        
+        charts.append(self._figure_image(plt))
+        return charts
+
+    def _figure_image(self, plt):
         # Save plot to memory
         img_data = io.BytesIO()
         plt.savefig(img_data, format='png', bbox_inches='tight')
         img_data.seek(0)
         plt.close()
-        
-        # Add plot to PDF
+
         img = Image(img_data)
         img.drawWidth = 400
         img.drawHeight = 300
-        story.append(img)
-
-        # Build PDF
-        doc.build(story)
-        return filename
\ No newline at end of file
+        return img
@@ -0,0 +1,141 @@
+import atexit
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from config.settings import REPORT_WORKERS, REPORT_CACHE_SIZE
+from utils.metrics import REGISTRY
+
+REPORT_RENDER_SECONDS = REGISTRY.histogram('report_render_seconds', 'Time to render a PDF report in a worker',
+                                           ['period'])
+REPORT_WAIT_SECONDS = REGISTRY.histogram('report_wait_seconds', 'Time from submitting a report to it finishing',
+                                         ['period'])
+REPORT_FAILURES = REGISTRY.counter('report_failures', 'Reports that failed to render', ['period'])
+
+
+def _render_report(node_data, path, summary=None):
+    """Renders a report and returns how long rendering took, in seconds."""
+    start = time.perf_counter()
+    # Imported in the worker so rendering libraries stay out of the web process.
+    from utils.report_generator import ReportGenerator
+    if summary is None:
+        ReportGenerator().generate_report(node_data, path)
+    else:
+        since, until, nodes, cluster = summary
+        ReportGenerator().generate_period_report(nodes, cluster, since, until, path)
+    return time.perf_counter() - start
+
+
+class ReportJobManager:
+    """Renders PDF reports in a bounded process pool.
+
+    `submit` returns a job id immediately; callers poll `get_job` until the
+    report is done. Finished reports are cached per snapshot version,
+    period and cluster, so asking again for the same data returns the existing job. Files live in
+    a private temporary directory that is removed at shutdown.
+    """
+
+    def __init__(self, max_workers=REPORT_WORKERS, cache_size=REPORT_CACHE_SIZE):
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self.output_dir = tempfile.mkdtemp(prefix='node_reports_')
+        self._executor = None
+        self._jobs = {}
+        self._jobs_by_key = OrderedDict()
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    def submit(self, snapshot, period='current', summary=None, cluster=None):
+        """Queues a report and returns its job id.
+
+        With `period` 'current' the report describes `snapshot`; otherwise
+        `summary` holds `cluster`'s NodeController.get_period_summary(period).
+        """
+        key = (snapshot.version, period, cluster)
+        with self._lock:
+            job_id = self._jobs_by_key.get(key)
+            if job_id:
+                if self._status(self._jobs[job_id]) != 'failed':
+                    self._jobs_by_key.move_to_end(key)
+                    return job_id
+                del self._jobs[job_id]
+
+            job_id = uuid.uuid4().hex
+            path = os.path.join(self.output_dir, f"{job_id}.pdf")
+            node_data = snapshot.node_data if summary is None else None
+            future = self._get_executor().submit(_render_report, node_data, path, summary)
+            future.add_done_callback(lambda done, period=period, submitted=time.perf_counter():
+                                     self._record(done, period, submitted))
+            self._jobs[job_id] = {
+                'future': future,
+                'path': path,
+                'filename': f"node_report_{cluster + '_' if cluster else ''}{period}_{snapshot.timestamp.strftime('%Y%m%d_%H%M%S')}.pdf"
+            }
+            self._jobs_by_key[key] = job_id
+            self._evict()
+            return job_id
+
+    def get_job(self, job_id):
+        """Returns the job's status ('pending', 'done' or 'failed'), path, filename and error."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            status = self._status(job)
+            error = job['future'].exception() if status == 'failed' else None
+            return {
+                'status': status,
+                'path': job['path'],
+                'filename': job['filename'],
+                'error': str(error) if error else None
+            }
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def _record(self, future, period, submitted):
+        if future.cancelled():
+            return
+        if future.exception():
+            REPORT_FAILURES.inc(period=period)
+            return
+        REPORT_RENDER_SECONDS.observe(future.result(), period=period)
+        REPORT_WAIT_SECONDS.observe(time.perf_counter() - submitted, period=period)
+
+    def _get_executor(self):
+        if self._executor is None:
+            # Forking a process that runs the collector and server threads is
+            # unsafe, so workers are spawned fresh.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def _status(self, job):
+        future = job['future']
+        if not future.done():
+            return 'pending'
+        return 'failed' if future.exception() else 'done'
+
+    def _evict(self):
+        """Drops the oldest finished reports beyond the cache size."""
+        while len(self._jobs_by_key) > self.cache_size:
+            key, job_id = next(iter(self._jobs_by_key.items()))
+            job = self._jobs[job_id]
+            if not job['future'].done():
+                break
+            del self._jobs_by_key[key]
+            del self._jobs[job_id]
+            try:
+                os.remove(job['path'])
+            except FileNotFoundError:
+                pass
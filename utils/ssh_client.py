@@ -1,45 +1,96 @@
+import re
+import secrets
 import paramiko
 from config.settings import HOSTNAME
+from utils.ssh_pool import SSHConnectionPool
+
+# Shared by every SSHClient in the process so logins and polls reuse transports.
+_connection_pool = SSHConnectionPool()
 
 class SSHClient:
-    def __init__(self):
-        self._client = None
-        self.hostname = HOSTNAME
+    def __init__(self, hostname=HOSTNAME):
+        self.hostname = hostname
+        self.pool = _connection_pool
 
     def get_node_info(self, username=None, password=None):
         """Fetches node information using SSH and returns the output as a string."""
         try:
-            if not self._client or not username:
-                self._connect(username, password)
-
-            stdin, stdout, stderr = self._client.exec_command("scontrol show node")
-            output = stdout.read().decode()
-            return output
+            return self.pool.exec_command(self.hostname, username, password, "scontrol show node --oneliner")
         except Exception as e:
             print(f"An error occurred while fetching node info: {e}")
             return None
-        finally:
-            if self._client:
-                self._client.close()
-                self._client = None
 
-    def test_connection(self, username: str, password: str) -> bool:
-        """Test SSH connection with provided credentials."""
+    def stream_node_info_json(self, username=None, password=None):
+        """Yields `scontrol show node --json` output in chunks as it arrives over SSH."""
+        return self.pool.stream_command(self.hostname, username, password, "scontrol show node --json")
+
+    def run_batch(self, commands, username=None, password=None):
+        """Runs several commands in one SSH round trip.
+
+        `commands` maps section names to shell commands. They run in order
+        as a single script fed to `sh -s`, with each command's output framed
+        by marker lines carrying a per-call token. Returns
+        {name: (exit_status, stdout, stderr)}; a command whose frame never
+        closed (e.g. the script was cut off) has status None.
+        """
+        token = secrets.token_hex(8)
+        output = self.pool.exec_command(self.hostname, username, password, "sh -s",
+                                        input=_batch_script(commands, token))
+        return _split_batch_output(output, token, commands)
+
+    def authenticate(self, username: str, password: str) -> bool:
+        """Logs in with the given credentials and returns whether they were accepted.
+
+        The connection stays in the shared pool, so the collector's first
+        poll with the same credentials reuses it. Errors other than a
+        rejected login are raised.
+        """
         try:
-            ssh = paramiko.SSHClient()
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            ssh.connect(self.hostname, username=username, password=password)
-            ssh.close()
-            return True
+            with self.pool.connection(self.hostname, username, password):
+                return True
         except paramiko.AuthenticationException:
             return False
+
+    def test_connection(self, username: str, password: str) -> bool:
+        """Test SSH connection with provided credentials."""
+        try:
+            return self.authenticate(username, password)
         except Exception as e:
             print(f"SSH connection test error: {e}")
             return False
 
-    def _connect(self, username: str, password: str):
-        """Establish SSH connection."""
-        if not self._client:
-            self._client = paramiko.SSHClient()
-            self._client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            self._client.connect(self.hostname, username=username, password=password)
\ No newline at end of file
+    def get_timings(self) -> dict:
+        """Returns connect/exec/read latency counters for the shared pool."""
+        return self.pool.timings.snapshot()
+
+
+def _batch_script(commands, token):
+    # stdout goes straight through (via fd 3) while stderr is captured, so a
+    # section's error text can be reported after its closing marker. The
+    # script itself arrives on stdin, so commands get /dev/null instead and
+    # cannot swallow the sections after them.
+    lines = ["exec 3>&1"]
+    for name, command in commands.items():
+        lines += [
+            f"echo '@@{token} begin {name}'",
+            f"err=$( {{ {command} ; }} </dev/null 2>&1 1>&3 ); status=$?",
+            f"printf '\\n@@{token} end {name} %d\\n%s\\n' \"$status\" \"$err\""
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def _split_batch_output(output, token, commands):
+    markers = list(re.finditer(r'^@@%s (begin|end) (\S+)(?: (\d+))?$' % token, output, re.M))
+    results = {name: (None, '', '') for name in commands}
+    for i, marker in enumerate(markers):
+        kind, name, status = marker.groups()
+        following = markers[i + 1] if i + 1 < len(markers) else None
+        text = output[marker.end() + 1:following.start() if following else len(output)]
+        if kind == 'begin':
+            # A closed frame's stdout ends with the newline printed before its end marker.
+            if following is not None and following.group(1, 2) == ('end', name):
+                text = text[:-1]
+            results[name] = (None, text, '')
+        else:
+            results[name] = (int(status), results[name][1], text.strip())
+    return results
@@ -0,0 +1,318 @@
+import codecs
+import hashlib
+import os
+import socket
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+import paramiko
+from config.settings import (
+    SSH_CONNECT_TIMEOUT,
+    SSH_COMMAND_TIMEOUT,
+    SSH_KEEPALIVE_INTERVAL,
+    SSH_POOL_MAX_SIZE,
+    SSH_POOL_IDLE_TIMEOUT
+)
+from utils.metrics import REGISTRY
+
+SSH_STAGE_SECONDS = REGISTRY.histogram('ssh_stage_seconds', 'SSH connect, exec and read latency', ['stage'])
+SSH_RETRIES = REGISTRY.counter('ssh_retries', 'SSH commands retried after their pooled connection broke')
+SSH_CONNECTIONS = REGISTRY.gauge('ssh_pooled_connections', 'Open connections in the SSH pool')
+# Every live pool, so the gauge counts all of them
+_POOLS = weakref.WeakSet()
+SSH_CONNECTIONS.set_function(lambda: sum(len(pool._connections) for pool in list(_POOLS)))
+
+
+class SSHTimings:
+    """Cumulative latency counters for the connect, exec and read stages."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, stage, seconds):
+        SSH_STAGE_SECONDS.observe(seconds, stage=stage)
+        with self._lock:
+            count, total, worst = self._stats.get(stage, (0, 0.0, 0.0))
+            self._stats[stage] = (count + 1, total + seconds, max(worst, seconds))
+
+    def snapshot(self):
+        """Returns count, total, average and max seconds per stage."""
+        with self._lock:
+            return {
+                stage: {
+                    'count': count,
+                    'total': total,
+                    'avg': total / count if count else 0.0,
+                    'max': worst
+                }
+                for stage, (count, total, worst) in self._stats.items()
+            }
+
+
+class _PooledConnection:
+    __slots__ = ('key', 'client', 'password_digest', 'last_used', 'users', 'retired')
+
+    def __init__(self, key, client, password_digest):
+        self.key = key
+        self.client = client
+        self.password_digest = password_digest
+        self.last_used = time.monotonic()
+        # Callers currently holding the connection; it is only closed at 0.
+        self.users = 0
+        # Dropped from the pool, to be closed once its last user is done
+        self.retired = False
+
+    def is_healthy(self):
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def close(self):
+        try:
+            self.client.close()
+        except Exception:
+            pass
+
+
+class SSHConnectionPool:
+    """Long-lived SSH connections keyed by (host, user).
+
+    Connections are kept alive with transport keepalives, health-checked
+    before reuse, evicted after sitting idle and capped at `max_size`
+    (least recently used first). A connection is only handed out to callers
+    presenting the password it was opened with.
+
+    Callers check a connection out for the duration of their command, and
+    eviction or replacement never closes one that is checked out: it is
+    closed when its last user returns it, so the pool may briefly exceed
+    `max_size`. Connects to the same (host, user) run one at a time, so
+    concurrent callers share the first connection instead of racing.
+    """
+
+    def __init__(self, max_size=SSH_POOL_MAX_SIZE, idle_timeout=SSH_POOL_IDLE_TIMEOUT,
+                 keepalive_interval=SSH_KEEPALIVE_INTERVAL, connect_timeout=SSH_CONNECT_TIMEOUT,
+                 command_timeout=SSH_COMMAND_TIMEOUT):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+        self.timings = SSHTimings()
+        self._connections = OrderedDict()
+        self._lock = threading.Lock()
+        # (host, user) -> lock held while connecting
+        self._connecting = {}
+        self._salt = os.urandom(16)
+        _POOLS.add(self)
+
+    @contextmanager
+    def connection(self, hostname, username, password):
+        """Checks out a connected paramiko client, reusing a pooled one when
+        possible, for the duration of a `with` block."""
+        entry = self._checkout(hostname, username, password)
+        try:
+            yield entry.client
+        finally:
+            self._release(entry)
+
+    def exec_command(self, hostname, username, password, command, input=None):
+        """Runs a command on a pooled connection and returns its decoded stdout.
+
+        `input`, if given, is written to the command's stdin, which is then
+        closed. A broken connection is discarded and the command retried
+        once on a fresh one; a command that times out is not retried. Raises
+        if the command exits non-zero, so a failed command is not mistaken
+        for empty output.
+        """
+        for attempt in range(2):
+            entry = self._checkout(hostname, username, password)
+            try:
+                start = time.perf_counter()
+                stdin, stdout, stderr = entry.client.exec_command(command, timeout=self.command_timeout)
+                if input is not None:
+                    stdin.write(input)
+                    stdin.channel.shutdown_write()
+                self.timings.record('exec', time.perf_counter() - start)
+
+                start = time.perf_counter()
+                output = stdout.read().decode()
+                self.timings.record('read', time.perf_counter() - start)
+                status = stdout.channel.recv_exit_status()
+                if status != 0:
+                    error = stderr.read().decode(errors='replace').strip()
+                    raise Exception(f"'{command}' exited with status {status}: {error}")
+                return output
+            except (paramiko.AuthenticationException, socket.timeout):
+                # A timeout is a slow command, not a broken connection;
+                # running it again would only add load to a slow slurmctld.
+                raise
+            except (paramiko.SSHException, EOFError, OSError):
+                self._discard(entry)
+                if attempt:
+                    raise
+                SSH_RETRIES.inc()
+            finally:
+                self._release(entry)
+
+    def stream_command(self, hostname, username, password, command, chunk_size=64 * 1024):
+        """Runs a command and yields its stdout as text chunks as they arrive.
+
+        Raises once the output is exhausted if the command exited non-zero,
+        including when the consumer stops early and closes the generator:
+        the rest of the output is then read and discarded so the exit
+        status arrives. The connection stays checked out until then.
+        """
+        for attempt in range(2):
+            entry = self._checkout(hostname, username, password)
+            started = False
+            try:
+                start = time.perf_counter()
+                stdin, stdout, stderr = entry.client.exec_command(command, timeout=self.command_timeout)
+                self.timings.record('exec', time.perf_counter() - start)
+                started = True
+                break
+            except (paramiko.AuthenticationException, socket.timeout):
+                raise
+            except (paramiko.SSHException, EOFError, OSError):
+                self._discard(entry)
+                if attempt:
+                    raise
+                SSH_RETRIES.inc()
+            finally:
+                # A started command keeps the connection until its output is read.
+                if not started:
+                    self._release(entry)
+
+        channel = stdout.channel
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        start = time.perf_counter()
+        try:
+            try:
+                while data := channel.recv(chunk_size):
+                    if text := decoder.decode(data):
+                        yield text
+                if text := decoder.decode(b'', final=True):
+                    yield text
+            except GeneratorExit:
+                while channel.recv(chunk_size):
+                    pass
+            finally:
+                self.timings.record('read', time.perf_counter() - start)
+
+            status = channel.recv_exit_status()
+            if status != 0:
+                error = stderr.read().decode(errors='replace').strip()
+                raise Exception(f"'{command}' exited with status {status}: {error}")
+        finally:
+            channel.close()
+            self._release(entry)
+
+    def evict_idle(self):
+        """Closes connections that have not been used within the idle timeout."""
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            expired = [key for key, entry in self._connections.items()
+                       if not entry.users and entry.last_used < cutoff]
+            entries = [self._connections.pop(key) for key in expired]
+        for entry in entries:
+            entry.close()
+
+    def close_all(self):
+        """Closes every connection, those in use once their users return them."""
+        with self._lock:
+            entries = list(self._connections.values())
+            self._connections.clear()
+            idle = [entry for entry in entries if self._retire(entry)]
+        for entry in idle:
+            entry.close()
+
+    def _checkout(self, hostname, username, password):
+        key = (hostname, username)
+        digest = self._digest(password)
+        self.evict_idle()
+
+        with self._lock:
+            connecting = self._connecting.setdefault(key, threading.Lock())
+        with connecting:
+            with self._lock:
+                entry = self._connections.get(key)
+                if entry and entry.password_digest == digest and entry.is_healthy():
+                    entry.users += 1
+                    entry.last_used = time.monotonic()
+                    self._connections.move_to_end(key)
+                    return entry
+
+            entry = _PooledConnection(key, self._connect(hostname, username, password), digest)
+            entry.users = 1
+            with self._lock:
+                stale = self._connections.pop(key, None)
+                self._connections[key] = entry
+                closing = self._trim()
+                if stale and self._retire(stale):
+                    closing.append(stale)
+        for stale in closing:
+            stale.close()
+        return entry
+
+    def _release(self, entry):
+        """Returns a checked-out connection, closing it if it was retired meanwhile."""
+        with self._lock:
+            entry.users -= 1
+            entry.last_used = time.monotonic()
+            closing = self._trim()
+            if entry.retired and not entry.users:
+                closing.append(entry)
+        for stale in closing:
+            stale.close()
+
+    def _discard(self, entry):
+        """Drops a broken connection from the pool; it is closed when released."""
+        with self._lock:
+            if self._connections.get(entry.key) is entry:
+                del self._connections[entry.key]
+            entry.retired = True
+
+    def _retire(self, entry):
+        # Called with the lock held; returns whether the entry can be closed now.
+        entry.retired = True
+        return not entry.users
+
+    def _trim(self):
+        # Called with the lock held; pops the least recently used idle
+        # connections beyond max_size for the caller to close.
+        excess = len(self._connections) - self.max_size
+        if excess <= 0:
+            return []
+        idle = [key for key, entry in self._connections.items() if not entry.users][:excess]
+        return [self._connections.pop(key) for key in idle]
+
+    def _connect(self, hostname, username, password):
+        start = time.perf_counter()
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        host, port = _split_port(hostname)
+        client.connect(
+            host,
+            port=port,
+            username=username,
+            password=password,
+            timeout=self.connect_timeout,
+            banner_timeout=self.connect_timeout,
+            auth_timeout=self.connect_timeout
+        )
+        client.get_transport().set_keepalive(self.keepalive_interval)
+        self.timings.record('connect', time.perf_counter() - start)
+        return client
+
+    def _digest(self, password):
+        return hashlib.sha256(self._salt + (password or '').encode()).digest()
+
+
+def _split_port(hostname):
+    # "host:port" selects a non-standard SSH port, e.g. a tunnel or a local test endpoint.
+    host, separator, port = hostname.rpartition(':')
+    if separator and port.isdigit() and ':' not in host:
+        return host, int(port)
+    return hostname, 22
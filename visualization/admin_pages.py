@@ -0,0 +1,98 @@
+import html
+from collections import Counter
+
+PAGE_STYLE = """
+    <style>
+        body { font-family: sans-serif; margin: 20px; color: #2c3e50; }
+        table { border-collapse: collapse; margin-bottom: 20px; }
+        th, td { border: 1px solid #ddd; padding: 4px 8px; text-align: left; font-size: 14px; }
+        th { background-color: #ecf0f1; }
+        td.number { text-align: right; }
+        pre { background-color: #f8f9fa; padding: 10px; overflow-x: auto; font-size: 12px; }
+        .note { color: #7f8c8d; }
+    </style>
+"""
+
+
+def profiles_page(profiles, enabled, threshold):
+    """Returns the HTML list of stored callback profiles, newest first."""
+    rows = ''.join(
+        f"<tr><td>{html.escape(profile['started'])}</td>"
+        f"<td><a href=\"/admin/profiles/{profile['id']}\">{html.escape(profile['callback'])}</a></td>"
+        f"<td class=\"number\">{profile['wall'] * 1000:.0f}</td>"
+        f"<td class=\"number\">{profile['cpu'] * 1000:.0f}</td>"
+        f"<td class=\"number\">{profile['peak_bytes'] / 2**20:.1f}</td>"
+        f"<td class=\"number\">{profile['samples']}</td></tr>"
+        for profile in profiles
+    )
+    action = 'Disable' if enabled else 'Enable'
+    return f"""
+    <html>
+        <head><title>Callback Profiles</title>{PAGE_STYLE}</head>
+        <body>
+            <h1>Callback Profiles</h1>
+            <p>Profiling is <b>{'on' if enabled else 'off'}</b> in this worker; callbacks slower
+               than {threshold:g} s are profiled.</p>
+            <form action="/admin/profiles/toggle" method="post">
+                <button type="submit">{action} profiling</button>
+                <span class="note">Applies to this worker process until it restarts.</span>
+            </form>
+            <table>
+                <tr><th>Started</th><th>Callback</th><th>Wall ms</th><th>CPU ms</th>
+                    <th>Peak MB</th><th>Samples</th></tr>
+                {rows or '<tr><td colspan="6">No slow callbacks recorded.</td></tr>'}
+            </table>
+            <p><a href="/dashboard">Back to the dashboard</a></p>
+        </body>
+    </html>
+    """
+
+
+def profile_page(profile):
+    """Returns the HTML view of one profile: hot frames, allocations and folded stacks."""
+    own, total = Counter(), Counter()
+    for stack, count in profile['stacks']:
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for frame in set(frames):
+            total[frame] += count
+    interval_ms = profile['sample_interval'] * 1000
+
+    def frame_rows(counter):
+        return ''.join(
+            f"<tr><td>{html.escape(frame)}</td><td class=\"number\">{count}</td>"
+            f"<td class=\"number\">{count * interval_ms:.0f}</td></tr>"
+            for frame, count in counter.most_common(25)
+        ) or '<tr><td colspan="3">No samples.</td></tr>'
+
+    allocation_rows = ''.join(
+        f"<tr><td>{html.escape(allocation['location'])}</td>"
+        f"<td class=\"number\">{allocation['size_diff'] / 1024:.0f}</td>"
+        f"<td class=\"number\">{allocation['count_diff']}</td></tr>"
+        for allocation in profile['allocations']
+    ) or '<tr><td colspan="3">No allocation data.</td></tr>'
+    folded = '\n'.join(f"{stack} {count}" for stack, count in profile['stacks'])
+
+    return f"""
+    <html>
+        <head><title>Profile of {html.escape(profile['callback'])}</title>{PAGE_STYLE}</head>
+        <body>
+            <h1>{html.escape(profile['callback'])}</h1>
+            <p>Started {html.escape(profile['started'])}: {profile['wall'] * 1000:.0f} ms wall,
+               {profile['cpu'] * 1000:.0f} ms CPU, {profile['peak_bytes'] / 2**20:.1f} MB peak allocated,
+               {profile['net_bytes'] / 2**20:.1f} MB retained.</p>
+            <p class="note">Stacks were sampled every {interval_ms:g} ms once the call passed
+               {profile['threshold']:g} s ({profile['samples']} samples).</p>
+            <h2>Hot frames (self)</h2>
+            <table><tr><th>Frame</th><th>Samples</th><th>~ms</th></tr>{frame_rows(own)}</table>
+            <h2>Hot frames (including callees)</h2>
+            <table><tr><th>Frame</th><th>Samples</th><th>~ms</th></tr>{frame_rows(total)}</table>
+            <h2>Allocations while slow</h2>
+            <table><tr><th>Line</th><th>KB</th><th>Blocks</th></tr>{allocation_rows}</table>
+            <h2>Folded stacks</h2>
+            <p class="note">In the format read by flamegraph.pl and speedscope.</p>
+            <pre>{html.escape(folded)}</pre>
+            <p><a href="/admin/profiles">All profiles</a></p>
+        </body>
+    </html>
+    """
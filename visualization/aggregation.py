@@ -0,0 +1,35 @@
+def partition_summary(node_data):
+    """Per-partition node count, mean CPU load and memory use of a snapshot.
+
+    A node listed in several partitions counts in each of them; nodes in no
+    partition are left out.
+    """
+    nodes = node_data[['NodeName', 'Partitions', 'CPULoad', 'RealMemory', 'FreeMem']]
+    nodes = nodes.assign(Partition=nodes['Partitions'].fillna('').str.split(',')).explode('Partition')
+    nodes = nodes[nodes['Partition'] != '']
+    return _summarise(nodes, 'Partition')
+
+def state_summary(node_data):
+    """Per-state node count, mean CPU load and memory use of a snapshot, busiest states first."""
+    nodes = node_data[['NodeName', 'CPULoad', 'RealMemory', 'FreeMem']].assign(State=node_data['State'].astype(str))
+    return _summarise(nodes, 'State').sort_values('Nodes', ascending=False)
+
+def top_nodes(node_data, count, column='CPULoad'):
+    """Returns the `count` nodes with the highest `column` ('CPULoad' or 'MemoryUsage')."""
+    nodes = node_data[['NodeName', 'State', 'CPULoad', 'RealMemory', 'FreeMem']].assign(
+        MemoryUsage=_memory_usage(node_data['RealMemory'], node_data['FreeMem']))
+    return nodes.nlargest(count, column)
+
+def _summarise(nodes, key):
+    summary = nodes.groupby(key, sort=True).agg(
+        Nodes=('NodeName', 'size'),
+        CPULoad=('CPULoad', 'mean'),
+        RealMemory=('RealMemory', 'sum'),
+        FreeMem=('FreeMem', 'sum')
+    )
+    summary['MemoryUsage'] = _memory_usage(summary['RealMemory'], summary['FreeMem'])
+    return summary.reset_index()
+
+def _memory_usage(real_memory, free_mem):
+    # In percent; nodes reporting no memory count as unused rather than dividing by zero.
+    return ((real_memory - free_mem) / real_memory.where(real_memory > 0) * 100).fillna(0)
@@ -1,10 +1,18 @@
-from dash import Dash, dcc, html, Input, Output, State
-import plotly.graph_objs as go
-from datetime import datetime
+import time
+import zlib
+import flask
+import numpy as np
+import pandas as pd
+from dash import Dash, dcc, html, Input, Output, State, Patch, ctx, no_update
 from visualization.graphs import GraphGenerator
+from visualization.aggregation import partition_summary, state_summary, top_nodes
 from node.node_controller import NodeController
-from utils.report_generator import ReportGenerator
-from config.settings import UPDATE_INTERVAL
+from node.node_collector import NodeCollector
+from utils.report_jobs import ReportJobManager
+from utils.metrics import REGISTRY
+from utils.profiler import CallbackProfiler
+from config.settings import (UPDATE_INTERVAL, HISTORY_GRAPH_MAX_POINTS, CLUSTERS, CLUSTER_BAR_NODE_LIMIT,
+                             HEATMAP_ROWS, HEATMAP_COLUMNS, TOP_NODES)
 
 
 COLORS = {
@@ -19,6 +27,135 @@ COLORS = {
     'light': '#ecf0f1'
 }
 
+CALLBACK_SECONDS = REGISTRY.histogram('dash_callback_seconds', 'Dash callback request latency', ['callback'])
+CALLBACK_ERRORS = REGISTRY.counter('dash_callback_errors', 'Dash callbacks that failed', ['callback'])
+
+STATE_COLORS = {
+    'ALLOCATED': COLORS['success'],
+    'IDLE': COLORS['warning'],
+    'DOWN': COLORS['danger']
+}
+
+# Builds the node gauges and state badge from the node-current store.
+NODE_DETAILS_JS = """
+function(current) {
+    var empty = {data: [], layout: {height: 300, showlegend: false}};
+    var badge = {display: 'inline-block', marginTop: '10px'};
+    if (!current) {
+        return [empty, empty, 'Select a node to view its details.', badge];
+    }
+    if (current.error) {
+        return [empty, empty, 'Error: ' + current.error, badge];
+    }
+    function gauge(mode, value, title, steps, extra) {
+        var trace = Object.assign({
+            type: 'indicator',
+            mode: mode,
+            value: value,
+            title: {text: title},
+            gauge: {
+                axis: {range: [0, 100]},
+                bar: {color: 'darkblue'},
+                steps: steps,
+                threshold: {line: {color: 'red', width: 4}, thickness: 0.75, value: 90}
+            }
+        }, extra);
+        return {data: [trace], layout: {height: 300}};
+    }
+    var cpu = gauge('gauge+number', current.CPULoad, 'CPU Load (%)', [
+        {range: [0, 50], color: 'lightgreen'},
+        {range: [50, 80], color: 'yellow'},
+        {range: [80, 100], color: 'red'}
+    ], {});
+    var memoryUsage = (current.RealMemory - current.FreeMem) / current.RealMemory * 100;
+    var memory = gauge('gauge+number+delta', memoryUsage, 'Memory Usage (%)', [
+        {range: [0, 60], color: 'lightgreen'},
+        {range: [60, 85], color: 'yellow'},
+        {range: [85, 100], color: 'red'}
+    ], {delta: {reference: 80}});
+    return [cpu, memory, current.State, {
+        padding: '12px 24px',
+        borderRadius: '5px',
+        backgroundColor: current.color,
+        color: 'white',
+        display: 'inline-block',
+        marginTop: '10px',
+        fontWeight: 'bold',
+        boxShadow: '0 2px 4px rgba(0,0,0,0.1)'
+    }];
+}
+"""
+
+# Opens the server-sent event stream once the first snapshot is shown. Each
+# event is queued and a hidden button is clicked so Dash picks it up.
+OPEN_EVENTS_JS = """
+function(view) {
+    if (!view || window.EventSource === undefined || window.nodeEvents) {
+        return window.dash_clientside.no_update;
+    }
+    var source = new EventSource('/events?since=' + view.version);
+    window.nodeEvents = {source: source, queue: []};
+    source.addEventListener('snapshot', function(event) {
+        window.nodeEvents.queue.push(JSON.parse(event.data));
+        document.getElementById('node-events-trigger').click();
+    });
+    return 'open';
+}
+"""
+
+# Applies queued node events to the cluster figures in the browser. Events
+# that do not follow on from the shown version ask the server to resync.
+APPLY_EVENTS_JS = """
+function(n, cpu, memory, pie, view, cluster) {
+    var noUpdate = window.dash_clientside.no_update;
+    var events = window.nodeEvents ? window.nodeEvents.queue.splice(0) : [];
+    if (!events.length || !view || !cpu || !cpu.data || !memory || !pie) {
+        return [noUpdate, noUpdate, noUpdate, noUpdate, noUpdate, noUpdate];
+    }
+    function copy(figure) {
+        return Object.assign({}, figure, {data: figure.data.map(function(trace) {
+            return Object.assign({}, trace, trace.y ? {y: trace.y.slice()} : {});
+        })});
+    }
+    cpu = copy(cpu);
+    memory = copy(memory);
+    pie = copy(pie);
+    var version = view.version;
+    var timestamp = noUpdate;
+    for (var e = 0; e < events.length; e++) {
+        var event = events[e];
+        if (event.version === version) {
+            continue;
+        }
+        // Aggregate views are computed on the server, so they are refetched.
+        if (event.resync || event.since !== version || view.aggregate) {
+            return [noUpdate, noUpdate, noUpdate, noUpdate, noUpdate, event.version];
+        }
+        var index = {};
+        cpu.data[0].x.forEach(function(name, i) { index[name] = i; });
+        event.nodes.forEach(function(node) {
+            var i = index[node.NodeName];
+            if (node.Cluster !== cluster || i === undefined) {
+                return;
+            }
+            cpu.data[0].y[i] = node.CPULoad;
+            memory.data[0].y[i] = node.RealMemory;
+            memory.data[1].y[i] = node.RealMemory - node.FreeMem;
+        });
+        if (event.states[cluster]) {
+            pie.data[0].labels = event.states[cluster].labels;
+            pie.data[0].values = event.states[cluster].values;
+        }
+        version = event.version;
+        timestamp = event.timestamp;
+    }
+    if (version === view.version) {
+        return [noUpdate, noUpdate, noUpdate, noUpdate, noUpdate, noUpdate];
+    }
+    return [cpu, memory, pie, Object.assign({}, view, {version: version}), timestamp, noUpdate];
+}
+"""
+
 STYLES = {
     'page_container': {
         'padding': '20px',
@@ -55,6 +192,20 @@ STYLES = {
         'transition': 'background-color 0.3s ease',
         'boxShadow': '0 2px 4px rgba(0,0,0,0.1)'
     },
+    'report_period': {
+        'position': 'absolute',
+        'right': '210px',
+        'top': '50%',
+        'transform': 'translateY(-50%)',
+        'width': '170px'
+    },
+    'report_status': {
+        'position': 'absolute',
+        'right': '20px',
+        'bottom': '6px',
+        'color': COLORS['light'],
+        'fontSize': '12px'
+    },
     'card': {
         'backgroundColor': 'white',
         'padding': '20px',
@@ -96,21 +247,36 @@ class Dashboard:
     def __init__(self, requests_pathname_prefix='/dashboard/'):
         self.app = None
         self.requests_pathname_prefix = requests_pathname_prefix
-        self.node_controller = None
+        self.node_controllers = {}
+        self.collector = None
+        self.report_jobs = None
         self.graph_generator = GraphGenerator()
+        self.profiler = CallbackProfiler()
 
     def initialize_with_credentials(self, username: str, password: str):
         """Initialize dashboard with user credentials."""
         if not self.app:
             self.app = Dash(__name__, requests_pathname_prefix=self.requests_pathname_prefix)
-            self.node_controller = NodeController(username, password)
+            # The same account is used on every cluster.
+            self.node_controllers = {
+                cluster: NodeController(username, password, cluster) for cluster in CLUSTERS
+            }
+            self.collector = NodeCollector(self.node_controllers)
+            self.collector.start()
+            self.report_jobs = ReportJobManager()
             self.setup_layout()
             self.setup_callbacks()
+            self.setup_profiling()
+            self.setup_metrics()
 
     def setup_layout(self):
         """Set up the dashboard layout."""
         try:
-            initial_data = self.node_controller.get_current_node_data()
+            snapshot = self.collector.get_snapshot()
+            if snapshot is None:
+                raise Exception("Failed to fetch node data")
+            initial_cluster = next(iter(CLUSTERS))
+            initial_data = snapshot.cluster_data(initial_cluster)
             self.app.layout = html.Div([
                 
                 html.Div([
@@ -123,7 +289,21 @@ class Dashboard:
                         id="generate-report-btn",
                         style=STYLES['report_button']
                     ),
-                    dcc.Download(id="download-report")
+                    dcc.Dropdown(
+                        id="report-period",
+                        options=[
+                            {'label': 'Current snapshot', 'value': 'current'},
+                            {'label': 'Last 24 hours', 'value': 'daily'},
+                            {'label': 'Last 7 days', 'value': 'weekly'}
+                        ],
+                        value='current',
+                        clearable=False,
+                        style=STYLES['report_period']
+                    ),
+                    html.Div(id="report-status", style=STYLES['report_status']),
+                    dcc.Download(id="download-report"),
+                    dcc.Store(id="report-job"),
+                    dcc.Interval(id="report-poll", interval=1000, disabled=True)
                 ], style=STYLES['header']),
                 
                 
@@ -133,11 +313,32 @@ class Dashboard:
                         interval=UPDATE_INTERVAL,
                         n_intervals=0
                     ),
+                    # What each figure currently shows, so updates can be sent as patches.
+                    dcc.Store(id='cluster-view'),
+                    dcc.Store(id='cluster-resync'),
+                    dcc.Store(id='event-stream'),
+                    html.Button(id='node-events-trigger', style={'display': 'none'}),
+                    dcc.Store(id='node-current'),
+                    dcc.Store(id='node-history-view'),
                     
-                    html.Div(id='last-update-timestamp', 
-                             style=STYLES['timestamp']),
+                    html.Div([
+                        "Last updated: ",
+                        html.Span(id='last-update-time', style={'fontWeight': 'bold'})
+                    ], id='last-update-timestamp', style=STYLES['timestamp']),
 
                     
+                    html.Div([
+                        html.Label("Select a Cluster:", style=STYLES['dropdown_label']),
+                        dcc.Dropdown(
+                            id="cluster-dropdown",
+                            options=[{"label": cluster, "value": cluster} for cluster in CLUSTERS],
+                            value=initial_cluster,
+                            clearable=False,
+                            style={'marginTop': '5px'}
+                        ),
+                    ], style=dict(STYLES['dropdown_container'],
+                                  display='block' if len(CLUSTERS) > 1 else 'none')),
+
                     html.Div([
                         html.Label("Select a Node:", style=STYLES['dropdown_label']),
                         dcc.Dropdown(
@@ -152,8 +353,11 @@ class Dashboard:
                     
                     html.Div([
                         html.H3("Selected Node Details", style=STYLES['section_title']),
-                        html.Div(id="node-state-indicator", 
-                                style={"textAlign": "center", "marginTop": "20px"}),
+                        html.Div([
+                            html.H4("Node State", style={'color': COLORS['primary']}),
+                            html.Div(id="node-state-badge")
+                        ], id="node-state-indicator", 
+                           style={"textAlign": "center", "marginTop": "20px"}),
                         html.Div([
                             html.Div([
                                 dcc.Graph(id="node-cpu-gauge")
@@ -163,6 +367,7 @@ class Dashboard:
                             ], style={'width': '50%', 'display': 'inline-block'})
                         ]),
                         dcc.Graph(id="node-history-graph"),
+                        html.Div(id="node-jobs"),
                         
                     ], style=STYLES['card']),
 
@@ -171,7 +376,14 @@ class Dashboard:
                         html.H3("Cluster Resource Usage", style=STYLES['section_title']),
                         dcc.Graph(id="cpu-graph"),
                         dcc.Graph(id="memory-graph"),
-                        dcc.Graph(id="state-pie-chart")
+                        dcc.Graph(id="state-pie-chart"),
+                        html.Div(id="cluster-summary")
+                    ], style=STYLES['card']),
+
+                    
+                    html.Div([
+                        html.H3("Partitions and Scheduler", style=STYLES['section_title']),
+                        html.Div(id="slurm-overview")
                     ], style=STYLES['card'])
                 ], style=STYLES['page_container'])
             ])
@@ -187,29 +399,99 @@ class Dashboard:
         """Set up all dashboard callbacks."""
         self.setup_update_metrics_callback()
         self.setup_node_graphs_callback()
+        self.setup_slurm_overview_callback()
         self.setup_report_callback()
 
+    def setup_metrics(self):
+        """Records the latency of every callback request, labelled by callback function."""
+        server = self.app.server
+
+        @server.before_request
+        def start_callback_timer():
+            if flask.request.path.endswith('/_dash-update-component'):
+                flask.g.callback_start = time.perf_counter()
+
+        @server.after_request
+        def record_callback_latency(response):
+            start = flask.g.pop('callback_start', None)
+            if start is not None:
+                output = (flask.request.get_json(silent=True) or {}).get('output', '')
+                callback = getattr(self.app.callback_map.get(output, {}).get('callback'), '__name__', output)
+                CALLBACK_SECONDS.observe(time.perf_counter() - start, callback=callback)
+                if response.status_code >= 500:
+                    CALLBACK_ERRORS.inc(callback=callback)
+            return response
+
+    def setup_profiling(self):
+        """Wraps every server-side callback in the profiler, which does nothing until enabled."""
+        for entry in self.app.callback_map.values():
+            callback = entry.get('callback')
+            if callback is not None:
+                entry['callback'] = self.profiler.wrap(callback.__name__, callback)
+
     def setup_update_metrics_callback(self):
         @self.app.callback(
-            [Output('last-update-timestamp', 'children'),
+            [Output('last-update-time', 'children'),
              Output('node-dropdown', 'options'),
              Output('cpu-graph', 'figure'),
              Output('memory-graph', 'figure'),
-             Output('state-pie-chart', 'figure')],
-            Input('interval-component', 'n_intervals')
+             Output('state-pie-chart', 'figure'),
+             Output('cluster-summary', 'children'),
+             Output('cluster-view', 'data')],
+            [Input('interval-component', 'n_intervals'),
+             Input('cluster-resync', 'data'),
+             Input('cluster-dropdown', 'value')],
+            State('cluster-view', 'data')
         )
-        def update_metrics(n):
+        def update_metrics(n, resync, cluster, view):
             try:
-                current_data, _ = self.node_controller.update_node_data()
+                snapshot = self.collector.get_snapshot()
+                if snapshot is None:
+                    raise Exception("No node data collected yet")
+                same_cluster = view and view.get('cluster') == cluster
+                if same_cluster and view['version'] == snapshot.version:
+                    # This tab already shows the latest snapshot.
+                    return (no_update,) * 7
+                current_data = snapshot.cluster_data(cluster)
+                
+                timestamp = snapshot.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+                node_names = current_data["NodeName"].tolist()
+                signature = zlib.crc32("\n".join(node_names).encode())
+                # Large clusters are shown in aggregate, sized by the figures rather than the node count.
+                aggregate = len(node_names) > CLUSTER_BAR_NODE_LIMIT
+                new_view = {'version': snapshot.version, 'cluster': cluster, 'signature': signature,
+                            'aggregate': aggregate}
                 
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                timestamp_div = html.Div([
-                    "Last updated: ",
-                    html.Span(timestamp, style={'fontWeight': 'bold'})
-                ])
+                if aggregate:
+                    # The node list only changes with the nodes themselves.
+                    dropdown_options = no_update
+                    if not (same_cluster and view['signature'] == signature):
+                        dropdown_options = [{"label": node, "value": node} for node in node_names]
+                    cpu_figure, memory_figure, state_figure, summary = self._aggregate_views(cluster, current_data)
+                    return timestamp, dropdown_options, cpu_figure, memory_figure, state_figure, summary, new_view
+                
+                previous = self.collector.get_snapshot_version(view['version']) if same_cluster else None
+                if previous is not None:
+                    previous = previous.cluster_data(cluster)
+                if previous is not None and view['signature'] == signature and not view.get('aggregate'):
+                    # Same nodes in the same order: only send the bar values that changed.
+                    cpu_figure = Patch()
+                    self._patch_values(cpu_figure['data'][0]['y'],
+                                       previous["CPULoad"], current_data["CPULoad"])
+                    memory_figure = Patch()
+                    self._patch_values(memory_figure['data'][0]['y'],
+                                       previous["RealMemory"], current_data["RealMemory"])
+                    self._patch_values(memory_figure['data'][1]['y'],
+                                       previous["RealMemory"] - previous["FreeMem"],
+                                       current_data["RealMemory"] - current_data["FreeMem"])
+                    state_counts = current_data["State"].value_counts()
+                    state_figure = Patch()
+                    state_figure['data'][0]['labels'] = state_counts.index.tolist()
+                    state_figure['data'][0]['values'] = state_counts.values.tolist()
+                    return timestamp, no_update, cpu_figure, memory_figure, state_figure, no_update, new_view
                 
                 dropdown_options = [{"label": node, "value": node} 
-                                  for node in current_data["NodeName"]]
+                                  for node in node_names]
                 
                 cpu_figure = {
                     "data": [
@@ -266,142 +548,354 @@ class Dashboard:
                     "layout": {"title": "Node State Distribution"}
                 }
                 
-                return timestamp_div, dropdown_options, cpu_figure, memory_figure, state_figure
+                return timestamp, dropdown_options, cpu_figure, memory_figure, state_figure, [], new_view
             except Exception as e:
                 print(f"Error updating metrics: {e}")
-                return html.Div("Error updating data"), [], {}, {}, {}
+                CALLBACK_ERRORS.inc(callback='update_metrics')
+                return "Error updating data", [], {}, {}, {}, [], None
+
+        # Pushed updates: the browser listens on /events and patches the
+        # figures itself, so new snapshots show up without waiting for the
+        # interval and without a request per tab per tick.
+        self.app.clientside_callback(
+            OPEN_EVENTS_JS,
+            Output('event-stream', 'data'),
+            Input('cluster-view', 'data')
+        )
+        self.app.clientside_callback(
+            APPLY_EVENTS_JS,
+            [Output('cpu-graph', 'figure', allow_duplicate=True),
+             Output('memory-graph', 'figure', allow_duplicate=True),
+             Output('state-pie-chart', 'figure', allow_duplicate=True),
+             Output('cluster-view', 'data', allow_duplicate=True),
+             Output('last-update-time', 'children', allow_duplicate=True),
+             Output('cluster-resync', 'data')],
+            Input('node-events-trigger', 'n_clicks'),
+            [State('cpu-graph', 'figure'),
+             State('memory-graph', 'figure'),
+             State('state-pie-chart', 'figure'),
+             State('cluster-view', 'data'),
+             State('cluster-dropdown', 'value')],
+            prevent_initial_call=True
+        )
+
+        @self.app.callback(
+            Output('node-dropdown', 'value'),
+            Input('cluster-dropdown', 'value'),
+            prevent_initial_call=True
+        )
+        def clear_node_selection(cluster):
+            # Node names are only meaningful within their cluster.
+            return None
 
     def setup_node_graphs_callback(self):
         @self.app.callback(
-            [Output("node-cpu-gauge", "figure"),
-             Output("node-memory-gauge", "figure"),
-             Output("node-history-graph", "figure"),
-             Output("node-state-indicator", "children")],
+            [Output("node-current", "data"),
+             Output("node-jobs", "children")],
             [Input("node-dropdown", "value"),
-             Input('interval-component', 'n_intervals')]
+             Input('cluster-view', 'data')],
+            [State("node-current", "data"),
+             State('cluster-dropdown', 'value')]
         )
-        def update_node_graphs(selected_node, n):
+        def update_node_current(selected_node, view, current, cluster):
             if not selected_node:
-                empty_gauge = {
-                    "data": [],
-                    "layout": {"height": 300, "showlegend": False}
-                }
-                return empty_gauge, empty_gauge, empty_gauge, "Select a node to view its details."
-            
+                return None, []
             try:
-                node_history = self.node_controller.get_node_history(selected_node)
-                current_data = self.node_controller.get_node_current_state(selected_node)
-
+                snapshot = self.collector.get_snapshot()
+                if snapshot is None:
+                    raise Exception("No node data collected yet")
+                if (current and current.get('node') == selected_node
+                        and current.get('version') == snapshot.version):
+                    return no_update, no_update
+                current_data = snapshot.get_node(selected_node, cluster)
                 if current_data is None:
                     raise Exception("No current data available for node")
+                # Jobs come from the job index built at poll time, so
+                # selecting a node costs no SSH call.
+                running, finished = self.node_controllers[cluster].get_node_jobs(selected_node)
+                return {
+                    'node': selected_node,
+                    'version': snapshot.version,
+                    'CPULoad': float(current_data['CPULoad']),
+                    'RealMemory': int(current_data['RealMemory']),
+                    'FreeMem': int(current_data['FreeMem']),
+                    'State': current_data['State'],
+                    'color': STATE_COLORS.get(current_data['State'], COLORS['secondary'])
+                }, self._node_jobs(running, finished)
+            except Exception as e:
+                print(f"Error updating node graphs: {e}")
+                CALLBACK_ERRORS.inc(callback='update_node_current')
+                return {'node': selected_node, 'error': str(e)}, []
 
-                cpu_gauge = self._create_cpu_gauge(current_data)
-                memory_gauge = self._create_memory_gauge(current_data)
-                history_figure = self.graph_generator.create_node_history_graph(node_history)
-                state_indicator = self._create_state_indicator(current_data)
+        # The gauges and state badge are drawn in the browser from the small
+        # node-current record instead of shipping whole figures every tick.
+        self.app.clientside_callback(
+            NODE_DETAILS_JS,
+            [Output("node-cpu-gauge", "figure"),
+             Output("node-memory-gauge", "figure"),
+             Output("node-state-badge", "children"),
+             Output("node-state-badge", "style")],
+            Input("node-current", "data")
+        )
 
-                return cpu_gauge, memory_gauge, history_figure, state_indicator
+        @self.app.callback(
+            [Output("node-history-graph", "figure"),
+             Output("node-history-view", "data")],
+            [Input("node-dropdown", "value"),
+             Input('cluster-view', 'data'),
+             Input("node-history-graph", "relayoutData")],
+            [State("node-history-view", "data"),
+             State('cluster-dropdown', 'value')]
+        )
+        def update_node_history(selected_node, cluster_view, relayout_data, view, cluster):
+            if not selected_node:
+                return {"data": [], "layout": {"height": 300, "showlegend": False}}, None
+            
+            try:
+                snapshot = self.collector.get_snapshot()
+                if snapshot is None:
+                    raise Exception("No node data collected yet")
+                incremental = (view and view['node'] == selected_node and view['cluster'] == cluster
+                               and view['last_timestamp']
+                               and ctx.triggered_id == 'cluster-view'
+                               and view['appended'] < HISTORY_GRAPH_MAX_POINTS // 10)
+                if incremental and view['version'] == snapshot.version:
+                    return no_update, no_update
+                
+                node_controller = self.node_controllers[cluster]
+                node_history = node_controller.get_node_history(selected_node)
+                daily_stats = node_controller.get_node_rollups(selected_node, 'daily')
+                last_timestamp = node_history['timestamp'].max()
+                new_view = {
+                    'node': selected_node,
+                    'cluster': cluster,
+                    'version': snapshot.version,
+                    'last_timestamp': last_timestamp.isoformat() if pd.notna(last_timestamp) else None,
+                    'appended': 0
+                }
+                
+                if incremental:
+                    # Append only the samples the client has not seen yet; the
+                    # figure is rebuilt (and re-downsampled) once enough piled up.
+                    new_samples = node_history[
+                        node_history['timestamp'] > pd.Timestamp(view['last_timestamp'])]
+                    new_view['appended'] = view['appended'] + len(new_samples)
+                    history_figure = self.graph_generator.create_node_history_patch(
+                        node_history, new_samples, daily_stats)
+                    return history_figure, new_view
+                
+                history_figure = self.graph_generator.create_node_history_graph(
+                    node_history,
+                    daily_stats,
+                    max_points=HISTORY_GRAPH_MAX_POINTS,
+                    x_range=self._get_zoom_range(relayout_data),
+                    ui_revision=f"{cluster}/{selected_node}"
+                )
+                return history_figure, new_view
 
             except Exception as e:
                 print(f"Error updating node graphs: {e}")
-                empty_gauge = {
-                    "data": [],
-                    "layout": {"height": 300, "showlegend": False}
-                }
-                return empty_gauge, empty_gauge, empty_gauge, f"Error: {str(e)}"
+                CALLBACK_ERRORS.inc(callback='update_node_history')
+                return {"data": [], "layout": {"height": 300, "showlegend": False}}, None
+
+    def setup_slurm_overview_callback(self):
+        @self.app.callback(
+            Output("slurm-overview", "children"),
+            Input('cluster-view', 'data')
+        )
+        def update_slurm_overview(view):
+            if not view:
+                return no_update
+            try:
+                snapshot = self.collector.get_snapshot()
+                if snapshot is None:
+                    raise Exception("No node data collected yet")
+                return self._slurm_overview(
+                    snapshot.cluster_data(view['cluster'], 'partitions'),
+                    snapshot.cluster_data(view['cluster'], 'jobs'),
+                    (snapshot.scheduler or {}).get(view['cluster'])
+                )
+            except Exception as e:
+                print(f"Error updating partitions: {e}")
+                CALLBACK_ERRORS.inc(callback='update_slurm_overview')
+                return html.P("Error updating data", style={'color': COLORS['danger']})
 
     def setup_report_callback(self):
         @self.app.callback(
-            Output("download-report", "data"),
+            [Output("report-job", "data"),
+             Output("report-poll", "disabled"),
+             Output("report-status", "children"),
+             Output("download-report", "data")],
             Input("generate-report-btn", "n_clicks"),
+            [State("report-period", "value"),
+             State("cluster-dropdown", "value")],
             prevent_initial_call=True
         )
-        def generate_report(n_clicks):
+        def generate_report(n_clicks, period, cluster):
             if n_clicks is None:
-                return None
+                return no_update, no_update, no_update, no_update
             
             try:
-                current_data = self.node_controller.get_current_node_data()
-                report_gen = ReportGenerator()
-                filename = f"node_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                report_gen.generate_report(current_data, filename)
+                snapshot = self.collector.get_snapshot()
+                if snapshot is None:
+                    raise Exception("No node data collected yet")
+                period = period or 'current'
+                summary = None
+                if period != 'current':
+                    # Period reports summarise the selected cluster's stored
+                    # rollups, not the live snapshot.
+                    summary = self.node_controllers[cluster].get_period_summary(period)
+                else:
+                    cluster = None
+                job_id = self.report_jobs.submit(snapshot, period, summary, cluster)
                 
-                return dcc.send_file(
-                    filename,
-                    filename=filename
-                )
+                # A report for this snapshot may already be cached.
+                job = self.report_jobs.get_job(job_id)
+                if job['status'] == 'done':
+                    return job_id, True, "", dcc.send_file(job['path'], filename=job['filename'])
+                return job_id, False, "Generating report...", no_update
             except Exception as e:
                 print(f"Error generating report: {e}")
-                return None
-
-    def _create_cpu_gauge(self, node_data):
-        return {
-            "data": [go.Indicator(
-                mode="gauge+number",
-                value=node_data['CPULoad'],
-                title={'text': "CPU Load (%)"},
-                gauge={
-                    'axis': {'range': [0, 100]},
-                    'bar': {'color': "darkblue"},
-                    'steps': [
-                        {'range': [0, 50], 'color': "lightgreen"},
-                        {'range': [50, 80], 'color': "yellow"},
-                        {'range': [80, 100], 'color': "red"}
-                    ],
-                    'threshold': {
-                        'line': {'color': "red", 'width': 4},
-                        'thickness': 0.75,
-                        'value': 90
-                    }
-                }
-            )],
-            "layout": {"height": 300}
-        }
+                CALLBACK_ERRORS.inc(callback='generate_report')
+                return None, True, "Report generation failed", no_update
 
-    def _create_memory_gauge(self, node_data):
-        memory_usage = ((node_data['RealMemory'] - node_data['FreeMem']) / 
-                       node_data['RealMemory'] * 100)
-        return {
-            "data": [go.Indicator(
-                mode="gauge+number+delta",
-                value=memory_usage,
-                title={'text': "Memory Usage (%)"},
-                delta={'reference': 80},
-                gauge={
-                    'axis': {'range': [0, 100]},
-                    'bar': {'color': "darkblue"},
-                    'steps': [
-                        {'range': [0, 60], 'color': "lightgreen"},
-                        {'range': [60, 85], 'color': "yellow"},
-                        {'range': [85, 100], 'color': "red"}
-                    ],
-                    'threshold': {
-                        'line': {'color': "red", 'width': 4},
-                        'thickness': 0.75,
-                        'value': 90
-                    }
+        @self.app.callback(
+            [Output("download-report", "data", allow_duplicate=True),
+             Output("report-poll", "disabled", allow_duplicate=True),
+             Output("report-status", "children", allow_duplicate=True)],
+            Input("report-poll", "n_intervals"),
+            State("report-job", "data"),
+            prevent_initial_call=True
+        )
+        def poll_report(n, job_id):
+            job = self.report_jobs.get_job(job_id) if job_id else None
+            if job is None:
+                return no_update, True, ""
+            if job['status'] == 'pending':
+                return no_update, False, "Generating report..."
+            if job['status'] == 'failed':
+                print(f"Error generating report: {job['error']}")
+                CALLBACK_ERRORS.inc(callback='poll_report')
+                return no_update, True, "Report generation failed"
+            return dcc.send_file(job['path'], filename=job['filename']), True, ""
+
+    def _get_zoom_range(self, relayout_data):
+        """Extracts the zoomed x-axis range from a graph's relayoutData, if any."""
+        if not relayout_data or relayout_data.get('xaxis.autorange'):
+            return None
+        if 'xaxis.range' in relayout_data:
+            return tuple(relayout_data['xaxis.range'][:2])
+        if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+            return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+        return None
+
+    def _node_jobs(self, running, finished):
+        """Builds the tables of jobs running on and recently finished on a node."""
+        children = []
+        for title, jobs, columns in [
+            ("Running Jobs", running, ['JobId', 'User', 'Partition', 'State', 'Elapsed', 'Nodes']),
+            ("Recently Finished Jobs", finished, ['JobId', 'User', 'Partition', 'State', 'End', 'Elapsed', 'ExitCode'])
+        ]:
+            if jobs.empty:
+                continue
+            rows = [html.Tr([html.Td(str(value)) for value in row])
+                    for row in jobs[columns].itertuples(index=False)]
+            children += [
+                html.H4(title, style={'color': COLORS['primary'], 'textAlign': 'center'}),
+                html.Table([html.Thead(html.Tr([html.Th(column) for column in columns])), html.Tbody(rows)],
+                           style={'width': '100%', 'textAlign': 'center', 'marginBottom': '20px'})
+            ]
+        return children or html.P("No jobs on this node.", style=dict(STYLES['timestamp'], marginTop='20px'))
+
+    def _slurm_overview(self, partitions, jobs, scheduler):
+        """Builds the partition table and scheduler summary of one cluster."""
+        if partitions is None:
+            return html.P("Partitions, jobs and scheduler stats are only collected "
+                          "with the \"batch\" ingest mode.", style={'color': COLORS['secondary']})
+        table = partitions.set_index('Partition')
+        job_counts = pd.DataFrame(0, index=table.index, columns=['RUNNING', 'PENDING'])
+        if jobs is not None and not jobs.empty:
+            counts = jobs.groupby(['Partition', jobs['State'].astype(str)]).size().unstack(fill_value=0)
+            job_counts = counts.reindex(index=table.index, columns=job_counts.columns, fill_value=0)
+        header = ['Partition', 'Availability', 'Nodes', 'Running jobs', 'Pending jobs',
+                  'CPUs allocated', 'CPUs idle', 'CPUs total']
+        rows = [
+            html.Tr([html.Td(partition), html.Td(row['Available']), html.Td(row['Nodes']),
+                     html.Td(job_counts.at[partition, 'RUNNING']), html.Td(job_counts.at[partition, 'PENDING']),
+                     html.Td(row['CPUsAllocated']), html.Td(row['CPUsIdle']), html.Td(row['CPUsTotal'])])
+            for partition, row in table.iterrows()
+        ]
+        children = [html.Table(
+            [html.Thead(html.Tr([html.Th(column) for column in header])), html.Tbody(rows)],
+            style={'width': '100%', 'textAlign': 'center'}
+        )]
+        if scheduler:
+            stats = [
+                ('Jobs running', scheduler.get('Jobs running')),
+                ('Jobs pending', scheduler.get('Jobs pending')),
+                ('Agent queue size', scheduler.get('Agent queue size')),
+                ('Last scheduling cycle (µs)', scheduler.get('Main Last cycle')),
+                ('Mean scheduling cycle (µs)', scheduler.get('Main Mean cycle')),
+                ('Last backfill cycle (µs)', scheduler.get('Backfill Last cycle'))
+            ]
+            children.append(html.P(
+                " · ".join(f"{label}: {value}" for label, value in stats if value is not None),
+                style=dict(STYLES['timestamp'], marginTop='20px', marginBottom='0')
+            ))
+        return children
+
+    def _aggregate_views(self, cluster, current_data):
+        """Builds the CPU heatmap, partition graph, state pie and summary tables of a large cluster."""
+        cpu_figure = self.graph_generator.create_cpu_heatmap(
+            *self.node_controllers[cluster].get_cpu_heatmap(HEATMAP_ROWS, HEATMAP_COLUMNS))
+        memory_figure = self.graph_generator.create_partition_graph(partition_summary(current_data))
+        states = state_summary(current_data)
+        state_figure = {
+            "data": [
+                {
+                    "labels": states['State'].tolist(),
+                    "values": states['Nodes'].tolist(),
+                    "type": "pie",
+                    "name": "Node States"
                 }
-            )],
-            "layout": {"height": 300}
+            ],
+            "layout": {"title": "Node State Distribution"}
         }
 
-    def _create_state_indicator(self, node_data):
-        state_colors = {
-            'ALLOCATED': COLORS['success'],
-            'IDLE': COLORS['warning'],
-            'DOWN': COLORS['danger']
-        }
-        state_style = {
-            'padding': '12px 24px',
-            'borderRadius': '5px',
-            'backgroundColor': state_colors.get(node_data['State'], COLORS['secondary']),
-            'color': 'white',
-            'display': 'inline-block',
-            'marginTop': '10px',
-            'fontWeight': 'bold',
-            'boxShadow': '0 2px 4px rgba(0,0,0,0.1)'
-        }
-        return html.Div([
-            html.H4("Node State", style={'color': COLORS['primary']}),
-            html.Div(node_data['State'], style=state_style)
-        ])
\ No newline at end of file
+        def table(title, header, rows):
+            return html.Div([
+                html.H4(title, style={'color': COLORS['primary'], 'textAlign': 'center'}),
+                html.Table([html.Thead(html.Tr([html.Th(column) for column in header])),
+                            html.Tbody([html.Tr([html.Td(value) for value in row]) for row in rows])],
+                           style={'width': '100%', 'textAlign': 'center'})
+            ], style={'flex': '1', 'minWidth': '300px', 'padding': '0 10px'})
+
+        busiest = top_nodes(current_data, TOP_NODES, 'CPULoad')
+        fullest = top_nodes(current_data, TOP_NODES, 'MemoryUsage')
+        return cpu_figure, memory_figure, state_figure, html.Div([
+            table("Node States", ['State', 'Nodes', 'Mean CPU Load', 'Memory Used'],
+                  [(row.State, row.Nodes, f"{row.CPULoad:.1f}", f"{row.MemoryUsage:.0f}%")
+                   for row in states.itertuples(index=False)]),
+            table(f"Top {TOP_NODES} by CPU Load", ['Node', 'State', 'CPU Load'],
+                  [(row.NodeName, str(row.State), f"{row.CPULoad:.1f}")
+                   for row in busiest.itertuples(index=False)]),
+            table(f"Top {TOP_NODES} by Memory Used", ['Node', 'State', 'Memory Used'],
+                  [(row.NodeName, str(row.State), f"{row.MemoryUsage:.0f}%")
+                   for row in fullest.itertuples(index=False)])
+        ], style={'display': 'flex', 'flexWrap': 'wrap', 'marginTop': '20px'})
+
+    def _patch_values(self, patch, previous, current):
+        """Writes the changed entries of `current` into a Patch of a value list.
+
+        Past a quarter of the entries, the whole list is cheaper to send than
+        one operation per change.
+        """
+        previous = previous.to_numpy()
+        current = current.to_numpy()
+        changed = np.flatnonzero(previous != current)
+        if len(changed) > len(current) // 4:
+            patch.clear()
+            patch.extend(current.tolist())
+            return
+        for index in changed:
+            patch[int(index)] = current[index].item()
@@ -0,0 +1,64 @@
+import numpy as np
+
+def lttb_indices(x, y, threshold):
+    """Selects `threshold` points with Largest-Triangle-Three-Buckets.
+
+    Returns the indices of the kept points (always including the first and
+    last), so the same selection can be applied to any aligned column. `x`
+    must be increasing and numeric (e.g. datetime64 viewed as int64).
+    """
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Missing values would poison every triangle area in their bucket.
+    y = np.where(np.isnan(y), 0.0, y)
+
+    # Bucket edges for the points between the fixed first and last ones.
+    edges = np.linspace(1, length - 1, threshold - 1).astype(np.intp)
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = length - 1
+
+    # Average of every bucket, plus the last point as the final "next bucket".
+    counts = np.diff(np.append(edges, length))
+    average_x = np.add.reduceat(x, edges) / counts
+    average_y = np.add.reduceat(y, edges) / counts
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        previous_x, previous_y = x[previous], y[previous]
+        areas = np.abs(
+            (previous_x - average_x[bucket + 1]) * (y[start:end] - previous_y)
+            - (previous_x - x[start:end]) * (average_y[bucket + 1] - previous_y)
+        )
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+def downsample_series(timestamps, values, max_points, x_range=None):
+    """Downsamples a time series to roughly `max_points` points for plotting.
+
+    With `x_range` (start, end), the points inside the range get the full
+    budget and the rest of the series keeps a coarse overview, so a zoomed
+    view is detailed while the range slider still shows the whole window.
+    """
+    timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+    values = np.asarray(values, dtype=np.float64)
+    positions = timestamps.view(np.int64)
+
+    if x_range is None:
+        keep = lttb_indices(positions, values, max_points)
+        return timestamps[keep], values[keep]
+
+    start, end = (np.datetime64(bound, 'ns') for bound in x_range)
+    inside = (timestamps >= start) & (timestamps <= end)
+    overview = lttb_indices(positions, values, max_points // 4)
+    overview = overview[~inside[overview]]
+    window = np.flatnonzero(inside)
+    detail = window[lttb_indices(positions[window], values[window], max_points)]
+    keep = np.union1d(overview, detail)
+    return timestamps[keep], values[keep]
@@ -1,42 +1,51 @@
 import plotly.graph_objs as go
+import numpy as np
 import pandas as pd
+from dash import Patch
+from visualization.downsampling import downsample_series
 
 class GraphGenerator:
     @staticmethod
-    def create_node_history_graph(node_history):
-        """Creates a detailed historical graph for a node."""
+    def create_node_history_graph(node_history, daily_stats=None, max_points=None,
+                                  x_range=None, ui_revision=None):
+        """Creates a detailed historical graph for a node.
+
+        `daily_stats` takes precomputed daily rollups (timestamp, CPULoad_mean,
+        FreeMem_mean, RealMemory_first); without them they are resampled from
+        `node_history`. With `max_points`, the CPU and memory traces are
+        downsampled (LTTB) to that budget, spent mostly inside `x_range` when
+        the user has zoomed in.
+        """
         memory_usage = ((node_history['RealMemory'] - node_history['FreeMem']) / 
                        node_history['RealMemory'] * 100)
         
-        daily_stats = node_history.resample('D', on='timestamp').agg({
-            'CPULoad': ['mean', 'max'],
-            'FreeMem': 'mean',
-            'RealMemory': 'first'
-        }).reset_index()
+        cpu_x, cpu_y = node_history['timestamp'], node_history['CPULoad']
+        memory_x, memory_y = node_history['timestamp'], memory_usage
+        if max_points:
+            cpu_x, cpu_y = downsample_series(cpu_x, cpu_y, max_points, x_range)
+            memory_x, memory_y = downsample_series(memory_x, memory_y, max_points, x_range)
         
-        daily_stats['MemoryUsage'] = ((daily_stats['RealMemory']['first'] - 
-                                      daily_stats['FreeMem']['mean']) / 
-                                     daily_stats['RealMemory']['first'] * 100)
+        daily_stats, daily_memory_usage = GraphGenerator._daily_points(node_history, daily_stats)
         
         return {
             "data": [
                 go.Scatter(
-                    x=node_history['timestamp'],
-                    y=node_history['CPULoad'],
+                    x=cpu_x,
+                    y=cpu_y,
                     name='CPU Load',
                     line=dict(color='blue'),
                     hovertemplate='CPU Load: %{y:.1f}%<br>Time: %{x}<extra></extra>'
                 ),
                 go.Scatter(
-                    x=node_history['timestamp'],
-                    y=memory_usage,
+                    x=memory_x,
+                    y=memory_y,
                     name='Memory Usage',
                     line=dict(color='red'),
                     hovertemplate='Memory Usage: %{y:.1f}%<br>Time: %{x}<extra></extra>'
                 ),
                 go.Scatter(
                     x=daily_stats['timestamp'],
-                    y=daily_stats['CPULoad']['mean'],
+                    y=daily_stats['CPULoad_mean'],
                     name='Daily Avg CPU',
                     mode='markers',
                     marker=dict(size=10, symbol='star', color='blue'),
@@ -44,7 +53,7 @@ class GraphGenerator:
                 ),
                 go.Scatter(
                     x=daily_stats['timestamp'],
-                    y=daily_stats['MemoryUsage'],
+                    y=daily_memory_usage,
                     name='Daily Avg Memory',
                     mode='markers',
                     marker=dict(size=10, symbol='star', color='red'),
@@ -77,6 +86,7 @@ class GraphGenerator:
                 },
                 "height": 600,
                 "hovermode": "x unified",
+                "uirevision": ui_revision,
                 "showlegend": True,
                 "legend": {
                     "orientation": "h",
@@ -104,4 +114,117 @@ class GraphGenerator:
                     "font": {"size": 10, "color": "gray"}
                 }]
             }
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def create_node_history_patch(node_history, new_samples, daily_stats=None):
+        """Appends `new_samples` to a figure from create_node_history_graph.
+
+        Only the new points and the (few) daily markers are sent; the
+        downsampled series already on the client is left as it is.
+        """
+        memory_usage = ((new_samples['RealMemory'] - new_samples['FreeMem']) /
+                        new_samples['RealMemory'] * 100)
+        daily_stats, daily_memory_usage = GraphGenerator._daily_points(node_history, daily_stats)
+
+        patch = Patch()
+        timestamps = new_samples['timestamp'].dt.strftime('%Y-%m-%dT%H:%M:%S.%f').tolist()
+        patch['data'][0]['x'].extend(timestamps)
+        patch['data'][0]['y'].extend(new_samples['CPULoad'].tolist())
+        patch['data'][1]['x'].extend(timestamps)
+        patch['data'][1]['y'].extend(memory_usage.tolist())
+        daily_timestamps = daily_stats['timestamp'].dt.strftime('%Y-%m-%d').tolist()
+        patch['data'][2]['x'] = daily_timestamps
+        patch['data'][2]['y'] = daily_stats['CPULoad_mean'].tolist()
+        patch['data'][3]['x'] = daily_timestamps
+        patch['data'][3]['y'] = daily_memory_usage.tolist()
+        return patch
+
+    @staticmethod
+    def create_cpu_heatmap(timestamps, labels, values):
+        """Creates a node group x time heatmap of CPU load from binned ring buffer data.
+
+        Values are rounded to one decimal and gaps sent as nulls, which
+        keeps the figure compact.
+        """
+        values = np.round(values, 1)
+        return {
+            "data": [{
+                "type": "heatmap",
+                "x": pd.DatetimeIndex(timestamps).strftime('%Y-%m-%dT%H:%M:%S').tolist(),
+                "y": labels,
+                "z": np.where(np.isnan(values), None, values).tolist(),
+                "colorscale": "YlOrRd",
+                "zmin": 0,
+                "colorbar": {"title": "CPU Load"},
+                "hovertemplate": "%{y}<br>%{x}<br>Mean CPU Load: %{z:.1f}<extra></extra>"
+            }],
+            "layout": {
+                "title": "CPU Load over Time (mean per node group)",
+                "xaxis": {"title": "Time", "type": "date"},
+                "yaxis": {"title": "Nodes", "autorange": "reversed", "showticklabels": len(labels) <= 40},
+                "margin": {"t": 40, "b": 60, "l": 60, "r": 20},
+                "height": 500
+            }
+        }
+
+    @staticmethod
+    def create_partition_graph(partitions):
+        """Creates grouped bars of mean CPU load and memory use per partition."""
+        return {
+            "data": [
+                {
+                    "x": partitions['Partition'].tolist(),
+                    "y": partitions['CPULoad'].round(1).tolist(),
+                    "type": "bar",
+                    "name": "Mean CPU Load",
+                    "customdata": partitions['Nodes'].tolist(),
+                    "hovertemplate": "%{x}: %{y:.1f} (%{customdata} nodes)<extra>Mean CPU Load</extra>"
+                },
+                {
+                    "x": partitions['Partition'].tolist(),
+                    "y": partitions['MemoryUsage'].round(1).tolist(),
+                    "type": "bar",
+                    "name": "Memory Used (%)",
+                    "marker": {"color": "rgba(31, 119, 180, 0.9)"},
+                    "customdata": partitions['Nodes'].tolist(),
+                    "hovertemplate": "%{x}: %{y:.1f}% (%{customdata} nodes)<extra>Memory Used</extra>"
+                }
+            ],
+            "layout": {
+                "title": "Resource Usage per Partition",
+                "barmode": "group",
+                "xaxis": {"title": "Partitions"},
+                "yaxis": {"title": "CPU Load / Memory Used (%)"},
+                "showlegend": True,
+                "legend": {"orientation": "h", "y": -0.15},
+                "margin": {"t": 40, "b": 100, "l": 60, "r": 20},
+                "height": 500
+            }
+        }
+
+    @staticmethod
+    def _daily_points(node_history, daily_stats):
+        """Returns the daily stats covering `node_history` and their memory usage."""
+        if daily_stats is None:
+            daily_stats = GraphGenerator._resample_daily_stats(node_history)
+        else:
+            first_sample = node_history['timestamp'].min()
+            if pd.notna(first_sample):
+                daily_stats = daily_stats[daily_stats['timestamp'] >= first_sample.floor('D')]
+        
+        daily_memory_usage = ((daily_stats['RealMemory_first'] - 
+                              daily_stats['FreeMem_mean']) / 
+                             daily_stats['RealMemory_first'] * 100)
+        return daily_stats, daily_memory_usage
+
+    @staticmethod
+    def _resample_daily_stats(node_history):
+        """Computes daily aggregates from raw samples when no rollups are available."""
+        daily_stats = node_history.resample('D', on='timestamp').agg({
+            'CPULoad': ['mean', 'max'],
+            'FreeMem': 'mean',
+            'RealMemory': 'first'
+        })
+        daily_stats.columns = ['CPULoad_mean', 'CPULoad_max', 'FreeMem_mean', 'RealMemory_first']
+        return daily_stats.reset_index()